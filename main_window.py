@@ -5,7 +5,7 @@ import sys
 import time
 from PyQt5.QtCore import Qt, QTranslator, QTimer, QLocale, QUrl, QEvent, pyqtSignal
 from PyQt5.QtGui import QPixmap, QPainter, QDesktopServices, QIcon
-from PyQt5.QtWidgets import QApplication, QStackedWidget, QHBoxLayout, QWidget, QMessageBox, QSplitter, QLabel
+from PyQt5.QtWidgets import QApplication, QStackedWidget, QHBoxLayout, QWidget, QMessageBox, QSplitter, QLabel, QFileDialog
 from widgets.editor_widget import EditorWidget
 from qfluentwidgets import (NavigationInterface,  NavigationItemPosition, InfoBar,
                             isDarkTheme, setTheme, Theme, InfoBarPosition, FluentIcon as FIF, FluentTranslator, IconWidget, NavigationAvatarWidget, MessageBoxBase, SubtitleLabel, CheckBox, Dialog)
@@ -19,6 +19,7 @@ from tools.session_manager import SessionManager
 from tools.logger import setup_global_logging, main_logger
 from tools.ssh import SSHWorker
 from tools.remote_file_manage import RemoteFileManager, FileManagerHandler
+from tools.metrics_store import MetricsStore
 from widgets.sync_widget import SycnWidget
 import os
 import shutil
@@ -211,6 +212,42 @@ class PermissionDialog(MessageBoxBase):
             self.activateWindow()
 
 
+class SyncPreviewDialog(MessageBoxBase):
+    """Dry-run result of a directory sync, confirmed before anything is changed."""
+    PREVIEW_LINES = 15
+
+    def __init__(self, plan, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.Tool | Qt.FramelessWindowHint)
+        if plan.direction == "upload":
+            title = self.tr(f"Sync {plan.local_root} -> {plan.remote_root}")
+        else:
+            title = self.tr(f"Sync {plan.remote_root} -> {plan.local_root}")
+        self.titleLabel = SubtitleLabel(title)
+        self.yesButton.setText(self.tr("Sync"))
+        self.cancelButton.setText(self.tr("Cancel"))
+
+        lines = [f"+ {rel}/" for rel in plan.mkdirs]
+        lines += [f"> {rel}" for rel, _, _ in plan.transfers]
+        lines += [f"- {rel}" for rel, _ in plan.deletes]
+        lines += [f"! {rel}" for rel in plan.conflicts]
+        if len(lines) > self.PREVIEW_LINES:
+            lines = lines[:self.PREVIEW_LINES] + \
+                [f"... ({len(lines) - self.PREVIEW_LINES} more)"]
+        self.summary_label = QLabel(self.tr(
+            f"{len(plan.transfers)} files to transfer ({plan.transfer_bytes / 1024 / 1024:.2f} MB), "
+            f"{len(plan.mkdirs)} new folders, {plan.unchanged} unchanged"))
+        self.preview_label = QLabel("\n".join(lines))
+        self.delete_box = CheckBox(self.tr(
+            f"Delete {len(plan.deletes)} items missing from the source"))
+        self.delete_box.setEnabled(bool(plan.deletes))
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.summary_label)
+        self.viewLayout.addWidget(self.preview_label)
+        self.viewLayout.addWidget(self.delete_box)
+
+
 class Window(FramelessWindow):
     windowResized = pyqtSignal()
 
@@ -250,6 +287,7 @@ class Window(FramelessWindow):
         self.titleBar.raise_()
         self.connect_status_dict = {}
         self.ssh_session = {}
+        self.metrics_stores = {}
         self.sessionmanager = SessionManager()
         self.session_widgets = {}
         self.file_tree_object = {}
@@ -305,6 +343,8 @@ class Window(FramelessWindow):
         #     self.tr('No conversation selected yet'), True, self)
         self.ssh_page = SSHPage()
         self.ssh_page.menuActionTriggered.connect(self._handle_action)
+        self.ssh_page.sshStack.currentChanged.connect(
+            lambda _: self._update_monitor_subscriptions())
 
         self.navigationInterface.setStyleSheet("background: transparent;")
         self.navigationInterface.setCollapsible(True)
@@ -381,6 +421,9 @@ class Window(FramelessWindow):
             widget = self.session_widgets[widget_key]
             if widget:
                 if result["type"] == "info":
+                    store = self.metrics_stores.get(widget_key)
+                    if store:
+                        store.record(result)
                     widget.start_loading_animation("task")
                     widget.start_loading_animation("net")
                     connections = result["connections"]
@@ -412,6 +455,8 @@ class Window(FramelessWindow):
 
                         if net_usage:
                             current_interface = widget.task.netmonitor.interface_combo.currentText()
+                            widget.monitorbar.set_net_interface(
+                                current_interface)
 
                             target_dict = next((item for item in net_usage if item.get(
                                 'iface') == current_interface), None)
@@ -664,7 +709,13 @@ class Window(FramelessWindow):
             self._refresh_paths(widget_key)
             print(f"刷新路径: {widget_key}")
 
-    def _show_progresses(self, path, percentage, bytes_so_far, total_bytes, widget_key, transfer_type):
+    def _show_progress_batch(self, batch, widget_key):
+        """One UI tick of TransferTelemetry: every transfer that moved since the last one."""
+        for identifier, mode, percentage, bytes_so_far, total_bytes, speed, eta in batch:
+            self._show_progresses(identifier, percentage, bytes_so_far, total_bytes,
+                                  widget_key, mode, speed=speed, eta=eta)
+
+    def _show_progresses(self, path, percentage, bytes_so_far, total_bytes, widget_key, transfer_type, speed=None, eta=None):
         """Handles progress updates for both uploads and downloads."""
         session_widget = self.session_widgets[widget_key]
         if not session_widget:
@@ -681,6 +732,9 @@ class Window(FramelessWindow):
             data["progress"] = percentage
             data["bytes_so_far"] = bytes_so_far
             data["total_bytes"] = total_bytes
+            if speed is not None:
+                data["speed"] = speed
+                data["eta"] = eta
             if percentage >= 100:
                 data["type"] = "completed"
             session_widget.transfer_progress.update_transfer_item(
@@ -865,7 +919,8 @@ class Window(FramelessWindow):
 
         if file_manager:
             self._handle_upload_request(widget_key=widget_name, local_path=local_path,
-                                        remote_path=remote_path, compression=False, file_manager=file_manager)
+                                        remote_path=remote_path, compression=False, file_manager=file_manager,
+                                        delta=True)
 
     def _start_ssh_connect(self, widget_key):
         parent_key = widget_key.split("-")[0].strip()
@@ -920,10 +975,18 @@ class Window(FramelessWindow):
 
             # processes = SSHWorker(session, for_resources=True)
             # processes.key_verification.connect(key_verification)
+            if widget_key not in self.metrics_stores:
+                store = MetricsStore.acquire(
+                    f"{session.username}@{session.host}:{session.port}",
+                    persist=setting_.read_config().get("metrics_persist", False))
+                self.metrics_stores[widget_key] = store
+                session_widget.task.netmonitor.set_history_source(
+                    store.history)
+                session_widget.monitorbar.set_history_source(store.history)
             worker.sys_resource.connect(
                 lambda usage, key=widget_key: self._set_usage(key, usage))
 
-            file_manager = RemoteFileManager(session)
+            file_manager = RemoteFileManager(session, jumpbox=jumpbox)
             handler = FileManagerHandler(
                 file_manager, session_widget, widget_key, self)
 
@@ -996,6 +1059,9 @@ class Window(FramelessWindow):
             )
             self.ssh_session[widget_key] = worker
             worker.key_verification.connect(key_verification)
+            self._update_monitor_subscriptions()
+            worker.bootstrap_finished.connect(
+                lambda timings, key=widget_key: print(f"⏱️ {key} startup phases (ms): {timings}"))
             worker.start()
 
         start_processes()
@@ -1149,6 +1215,59 @@ class Window(FramelessWindow):
             print(f"mkfile", full_path)
             if full_path:
                 file_manager.mkfile(full_path)
+        elif action_type in ("sync_upload", "sync_download"):
+            if action_type == "sync_upload":
+                caption = self.tr(f"Local folder to upload into {full_path}")
+            else:
+                caption = self.tr(f"Local folder to mirror {full_path} into")
+            local_dir = QFileDialog.getExistingDirectory(self, caption)
+            if local_dir:
+                # dry run first, _on_sync_plan_ready asks for confirmation
+                file_manager.sync_directory(
+                    local_dir, full_path, action_type[len("sync_"):],
+                    use_hash=setting_.read_config().get("sync_compare_hash", False), dry_run=True)
+
+    def _on_sync_plan_ready(self, plan, widget_key):
+        if not plan.dry_run:
+            return
+        if plan.is_empty(delete=True) and not plan.conflicts:
+            InfoBar.success(
+                title=self.tr("Already in sync"),
+                content=plan.remote_root,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.BOTTOM_RIGHT,
+                duration=3000,
+                parent=self.window()
+            )
+            return
+        dialog = SyncPreviewDialog(plan, self)
+        if dialog.exec_():
+            file_manager: RemoteFileManager = self.file_tree_object[widget_key]
+            # the previewed plan, not a new scan: only what was shown is changed
+            file_manager.apply_sync_plan(plan, delete=dialog.delete_box.isChecked())
+
+    def _on_sync_finished(self, remote_dir, status, msg, widget_key):
+        if status:
+            InfoBar.info(
+                title=self.tr(f"Sync of {remote_dir} completed"),
+                content=msg,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.BOTTOM_RIGHT,
+                duration=3000,
+                parent=self.window()
+            )
+        else:
+            InfoBar.error(
+                title=self.tr(f"Sync of {remote_dir} failed"),
+                content=msg,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.BOTTOM_RIGHT,
+                duration=-1,
+                parent=self.window()
+            )
 
     def _process_pending_downloads(self):
         """Process the accumulated download paths after the debounce delay."""
@@ -1351,6 +1470,8 @@ class Window(FramelessWindow):
         _connect_file_explorer_signals(self, widget, widget_key)
 
         self.session_widgets[widget_key] = widget
+        widget.panelChanged.connect(
+            lambda _: self._update_monitor_subscriptions())
 
         self._start_ssh_connect(widget_key)
         self.switchTo(self.ssh_page, widget_key)
@@ -1534,6 +1655,9 @@ class Window(FramelessWindow):
             worker_processes = self.ssh_session.pop(
                 f'{widget_name}-processes', None)
             watching_dogs = self.watching_dogs.pop(widget_name, None)
+            store = self.metrics_stores.pop(widget_name, None)
+            if store:
+                MetricsStore.release(store)
             if worker:
                 worker.close()
             if worker_processes:
@@ -1648,8 +1772,27 @@ class Window(FramelessWindow):
             self.sidePanel.hide()
             if hasattr(self, 'expanderBar'):
                 self.expanderBar.hide()
+        self._update_monitor_subscriptions()
+
+    def _update_monitor_subscriptions(self):
+        """
+        The visible SSH tab monitors what its panels show at the normal rate;
+        background tabs and a minimized window only keep a slow heartbeat.
+        """
+        config = setting_.read_config()
+        interval = config.get("monitor_interval", 2)
+        background_interval = config.get("monitor_background_interval", 30)
+        active = None if self.isMinimized() else self.get_active_ssh_widget()
+        for widget_key, worker in list(self.ssh_session.items()):
+            widget = self.session_widgets.get(widget_key)
+            if widget is None or not hasattr(worker, "set_monitoring"):
+                continue
+            if widget is active:
+                worker.set_monitoring(widget.monitor_categories(), interval)
+            else:
+                worker.set_monitoring((), background_interval)
 
-    def _handle_upload_request(self, widget_key, local_path, remote_path, compression, file_manager):
+    def _handle_upload_request(self, widget_key, local_path, remote_path, compression, file_manager, delta=False):
         """Pre-handles upload requests to determine if UI items should be pre-created."""
         # If compression is on and we have a list, create a single UI item for the batch.
         if compression and isinstance(local_path, list):
@@ -1669,7 +1812,7 @@ class Window(FramelessWindow):
             if not (os.path.isdir(p) and not compression):
                 self._add_transfer_item_if_not_exists(
                     widget_key, p, 'upload')
-            file_manager.upload_file(p, remote_path, compression)
+            file_manager.upload_file(p, remote_path, compression, delta=delta)
 
     def _add_transfer_item_if_not_exists(self, widget_key, path, transfer_type, task_id=None, open_it=False):
         """Helper to add a transfer item to the UI if it doesn't exist."""
@@ -1982,6 +2125,7 @@ class Window(FramelessWindow):
                 setting_.revise_config("maximized", True)
             else:
                 setting_.revise_config("maximized", False)
+            self._update_monitor_subscriptions()
         super().changeEvent(event)
 
     def get_active_ssh_widget(self):
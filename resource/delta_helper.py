@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Remote side of the delta upload (rsync algorithm), deployed next to
+processes.sh.
+
+    delta_helper.py sig <path> <block_size>
+        prints "<size> <block_size>" and then "<adler32> <md5>" per block
+
+    delta_helper.py patch <path>
+        reads instructions from stdin and rebuilds <path>:
+            b"C" + >QI (first block, block count)   copy blocks of the old file
+            b"D" + >I (length) + data                literal data
+            b"E" + md5 hex of the result (32 bytes)  end, verify and write
+        prints "OK" on success. The result is assembled in a temporary file
+        (in memory while small) and then written over the original inode, so
+        symlinks, hard links, owner and mode stay as they are and the
+        directory does not need to be writable.
+"""
+import hashlib
+import os
+import struct
+import sys
+import shutil
+import tempfile
+import zlib
+
+# results up to this size are assembled in memory
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def signature(path, block_size):
+    out = sys.stdout
+    size = os.path.getsize(path)
+    out.write("%d %d\n" % (size, block_size))
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            out.write("%08x %s\n" % (zlib.adler32(block) & 0xffffffff,
+                                     hashlib.md5(block).hexdigest()))
+    out.flush()
+
+
+def read_exact(stream, n):
+    data = b""
+    while len(data) < n:
+        chunk = stream.read(n - len(data))
+        if not chunk:
+            raise EOFError("truncated delta stream")
+        data += chunk
+    return data
+
+
+def patch(path):
+    stdin = sys.stdin.buffer
+    path = os.path.realpath(path)
+    block_size = struct.unpack(">I", read_exact(stdin, 4))[0]
+    md5 = hashlib.md5()
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as new:
+        with open(path, "rb") as old:
+            while True:
+                op = read_exact(stdin, 1)
+                if op == b"C":
+                    first, count = struct.unpack(">QI", read_exact(stdin, 12))
+                    old.seek(first * block_size)
+                    remaining = count * block_size
+                    while remaining > 0:
+                        data = old.read(min(remaining, 1 << 20))
+                        if not data:
+                            break
+                        new.write(data)
+                        md5.update(data)
+                        remaining -= len(data)
+                elif op == b"D":
+                    length = struct.unpack(">I", read_exact(stdin, 4))[0]
+                    data = read_exact(stdin, length)
+                    new.write(data)
+                    md5.update(data)
+                elif op == b"E":
+                    expected = read_exact(stdin, 32).decode()
+                    break
+                else:
+                    raise ValueError("bad delta op %r" % op)
+        if md5.hexdigest() != expected:
+            raise ValueError("checksum mismatch")
+        # rewrite the original inode in place
+        new.seek(0)
+        with open(path, "r+b") as target:
+            shutil.copyfileobj(new, target, 1 << 20)
+            target.truncate()
+    sys.stdout.write("OK\n")
+    sys.stdout.flush()
+
+
+def main():
+    if len(sys.argv) >= 4 and sys.argv[1] == "sig":
+        signature(sys.argv[2], int(sys.argv[3]))
+    elif len(sys.argv) >= 3 and sys.argv[1] == "patch":
+        patch(sys.argv[2])
+    else:
+        sys.stderr.write(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
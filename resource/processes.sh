@@ -1,6 +1,8 @@
 #!/bin/bash
 TOP_N=4
 INTERVAL=2
+# 每隔多少个采样发送一次完整关键帧（其余为增量帧）
+KEYFRAME_EVERY=15
 
 # --- 自动检测包管理器并安装依赖 ---
 install_pkg() {
@@ -33,6 +35,14 @@ check_and_install() {
     done
 }
 
+# --- 优先使用单进程 Python 采集代理（直接读取 /proc，不再每轮 fork） ---
+# 传入 --shell 时强制使用本脚本；代理异常退出时回退到脚本
+AGENT="$(dirname "$0")/processes_agent.py"
+if [[ "$1" != "--shell" && -r "$AGENT" ]] && command -v python3 >/dev/null 2>&1; then
+    python3 "$AGENT" && exit 0
+    echo "⚠️ processes_agent 退出，回退到 shell 采集" >&2
+fi
+
 # 检查并安装必要命令
 check_and_install ss lsblk iostat
 
@@ -49,8 +59,53 @@ print_system_info() {
     mem_total=$(awk '/MemTotal/ {printf "%.0f",$2/1024}' /proc/meminfo)MB
     ip_addr=$(hostname -I 2>/dev/null | awk '{print $1}')   # 取第一个 IPv4
 
-    printf '///SysInfo{"system":"%s","kernel":"%s","arch":"%s","hostname":"%s","cpu_model":"%s","cpu_cores":%s,"cpu_freq":"%s","cpu_cache":"%s","mem_total":"%s","ip":"%s"}End///\n' \
+    local payload
+    printf -v payload '{"system":"%s","kernel":"%s","arch":"%s","hostname":"%s","cpu_model":"%s","cpu_cores":%s,"cpu_freq":"%s","cpu_cache":"%s","mem_total":"%s","ip":"%s"}' \
         "$sys_name" "$kernel" "$arch" "$hostname" "$cpu_model" "$cpu_cores" "$cpu_freq" "$cpu_cache" "$mem_total" "$ip_addr"
+    emit_frame S "$payload"
+}
+
+# ================== 帧协议 ==================
+# 每帧一行: @@T1 <类型> <字节长度> <json>
+emit_frame() {
+    local LC_ALL=C    # ${#} 按字节计算长度
+    local payload="$2"
+    printf '@@T1 %s %d %s\n' "$1" "${#payload}" "$payload"
+}
+
+# 增量列表: 当前采样填充 cur_keys/cur_json(/cur_sig/cur_dyn)，build_delta 生成
+# {"keys":[...],"upsert":{key:字段}}，只包含新增或变化的条目
+declare -A prev_items next_items cur_json cur_sig cur_dyn
+cur_keys=()
+
+reset_list() {
+    cur_keys=()
+    cur_json=()
+    cur_sig=()
+    cur_dyn=()
+}
+
+add_item() {    # add_item <key> <json> [静态签名] [动态字段json]
+    cur_keys+=("$1")
+    cur_json["$1"]="$2"
+    [[ -n "$3" ]] && cur_sig["$1"]="$3"
+    [[ -n "$4" ]] && cur_dyn["$1"]="$4"
+}
+
+build_delta() {    # build_delta <列表名>，结果写入 $delta
+    local name="$1" keys="" upsert="" k sig
+    for k in "${cur_keys[@]}"; do
+        sig="${cur_sig[$k]:-${cur_json[$k]}}"
+        keys+="\"$k\","
+        if [[ $full -eq 1 || "${prev_items[$name|$k]}" != "$sig" ]]; then
+            upsert+="\"$k\":${cur_json[$k]},"
+        elif [[ -n "${cur_dyn[$k]}" ]]; then
+            # 静态字段未变，只发送变化的数值
+            upsert+="\"$k\":${cur_dyn[$k]},"
+        fi
+        next_items["$name|$k"]="$sig"
+    done
+    delta="{\"keys\":[${keys%,}],\"upsert\":{${upsert%,}}}"
 }
 
 # --- 首次输出系统信息 ---
@@ -79,7 +134,83 @@ escape_json() {
     echo "$str"
 }
 
+# ================== 客户端命令 ==================
+# 客户端通过终端发送一行命令:
+#   @@C sub top,processes,disks,net,connections   只采集订阅的类别
+#   @@C interval <秒>                               采样间隔
+#   @@C keyframe                                    下一帧发送完整关键帧
+SUB_TOP=1 SUB_PROCESSES=1 SUB_DISKS=1 SUB_NET=1 SUB_CONNECTIONS=1
+force_full=0
+# sudo 下 stdin 是密码管道，命令从控制终端读取
+if { exec 3</dev/tty; } 2>/dev/null; then
+    stty -echo <&3 2>/dev/null
+else
+    exec 3</dev/null
+fi
+
+handle_command() {
+    local tag cmd arg c
+    read -r tag cmd arg <<< "$1"
+    [[ "$tag" == "@@C" ]] || return
+    case "$cmd" in
+        sub)
+            local top=0 procs=0 dsk=0 net=0 conns=0
+            for c in ${arg//,/ }; do
+                case "$c" in
+                    top) top=1 ;;
+                    processes) procs=1 ;;
+                    disks) dsk=1 ;;
+                    net) net=1 ;;
+                    connections) conns=1 ;;
+                esac
+            done
+            # 重新订阅时旧计数器已过期，丢弃以免速率出现尖峰
+            (( dsk && ! SUB_DISKS )) && { disk_read_old=(); disk_write_old=(); }
+            (( net && ! SUB_NET )) && { rx_old=(); tx_old=(); }
+            (( conns && ! SUB_CONNECTIONS )) && { proc_rx_old=(); proc_tx_old=(); }
+            SUB_TOP=$top SUB_PROCESSES=$procs SUB_DISKS=$dsk SUB_NET=$net SUB_CONNECTIONS=$conns
+            wake=1
+            ;;
+        interval)
+            [[ "$arg" =~ ^[0-9]+$ ]] && (( arg > 0 )) && INTERVAL=$arg
+            wake=1
+            ;;
+        keyframe)
+            force_full=1
+            wake=1
+            ;;
+    esac
+}
+
+# 等待 $INTERVAL 秒，期间处理客户端命令；订阅变化时立即采样
+wait_for_commands() {
+    local deadline=$((SECONDS + INTERVAL)) line rc
+    wake=0
+    while (( SECONDS < deadline && ! wake )); do
+        IFS= read -r -t $((deadline - SECONDS)) line <&3
+        rc=$?
+        if (( rc == 0 )); then
+            handle_command "$line"
+        elif (( rc <= 128 )); then
+            # 没有可读的终端
+            sleep $((deadline - SECONDS))
+            break
+        fi
+    done
+}
+
+seq=0
+last_sample=$SECONDS
 while true; do
+    full=0
+    (( seq % KEYFRAME_EVERY == 0 || force_full )) && full=1
+    force_full=0
+    next_items=()
+    # 距上次采样的秒数，用于计算速率
+    ELAPSED=$((SECONDS - last_sample))
+    (( ELAPSED < 1 )) && ELAPSED=1
+    last_sample=$SECONDS
+
     # --- CPU 使用率 ---
     cpu_percent=$(LC_ALL=C top -bn2 -d0.2 | grep "Cpu(s)" | tail -n1 | awk '{print 100 - $8}')
 
@@ -89,180 +220,170 @@ while true; do
     mem_used=$(free -m | awk 'NR==2{print $3}')
 
     # --- 前 N 个进程 ---
-    processes=$(ps -eo pid,comm,%cpu,%mem --sort=-%cpu \
-        | awk -v top_n="$TOP_N" '
-        NR>1 && $2 !~ /^kworker/ && $2 !~ /^rcu_/ {
-            count++
-            if (count <= top_n) {
-                printf "{\"pid\":%s,\"name\":\"%s\",\"cpu\":%s,\"mem\":%s},",$1,$2,$3,$4
-            }
-        }' \
-        | sed 's/,$//')
-    processes="[$processes]"
-
-    processes=$(ps -eo pid,comm,%cpu,rss --sort=-%cpu \
+    if (( SUB_TOP )); then
+        processes=$(ps -eo pid,comm,%cpu,rss --sort=-%cpu \
         | awk -v top_n="$TOP_N" '
         NR>1 && $2 !~ /^kworker/ && $2 !~ /^rcu_/ {
             count++
             if (count <= top_n) {
-                # 将 RSS 从 KB 转换为 MB，保留1位小数，确保有前导零
-                mem_mb = $4 / 1024
-                if (mem_mb < 1 && mem_mb > 0) {
-                    mem_mb = "0" mem_mb
-                }
+                # 将 RSS 从 KB 转换为 MB，保留1位小数
+                mem_mb = sprintf("%.1f", $4 / 1024)
                 printf "{\"pid\":%s,\"name\":\"%s\",\"cpu\":%s,\"mem_mb\":%s},",$1,$2,$3,mem_mb
             }
         }' \
         | sed 's/,$//')
-    processes="[$processes]"
+        processes="[$processes]"
+    fi
 
     # --- 全部进程 ---
-    processes=$(ps -eo pid,comm,%cpu,rss --sort=-%cpu \
-    | awk -v top_n="$TOP_N" '
-    NR>1 && $2 !~ /^kworker/ && $2 !~ /^rcu_/ {
-        count++
-        if (count <= top_n) {
-            # 将 RSS 从 KB 转换为 MB，保留1位小数
-            mem_mb = sprintf("%.1f", $4 / 1024)
-            printf "{\"pid\":%s,\"name\":\"%s\",\"cpu\":%s,\"mem_mb\":%s},",$1,$2,$3,mem_mb
-        }
-    }' \
-    | sed 's/,$//')
-    processes="[$processes]"
+    if (( SUB_PROCESSES )); then
+        reset_list
+        temp_file=$(mktemp)
+        ps -eo user,pid,%cpu,rss,comm,cmd --no-headers --sort=-%cpu | head -50 > "$temp_file"
 
-    # --- 全部进程 ---
-    all_processes="["
-    temp_file=$(mktemp)
-    ps -eo user,pid,%cpu,rss,comm,cmd --no-headers --sort=-%cpu | head -50 > "$temp_file"
-
-    while IFS= read -r line; do
-        [[ -z "$line" ]] && continue
-        
-        if [[ $line =~ ^([[:alnum:]]+)[[:space:]]+([0-9]+)[[:space:]]+([0-9.]+)[[:space:]]+([0-9]+)[[:space:]]+([^[:space:]]+)[[:space:]]+(.*)$ ]]; then
-            user="${BASH_REMATCH[1]}"
-            pid="${BASH_REMATCH[2]}"
-            cpu="${BASH_REMATCH[3]}"
-            rss_kb="${BASH_REMATCH[4]}"
-            comm="${BASH_REMATCH[5]}"
-            cmd="${BASH_REMATCH[6]}"
+        while IFS= read -r line; do
+            [[ -z "$line" ]] && continue
             
-            # 统一内存格式为1位小数
-            mem_mb=$(echo "scale=1; $rss_kb / 1024" | bc | awk '{printf "%.1f", $1}')
-            
-            # 转义 JSON 特殊字符
-            cmd_escaped=$(escape_json "$cmd")
-            comm_escaped=$(escape_json "$comm")
-            user_escaped=$(escape_json "$user")
-            
-            all_processes+="{\"user\":\"$user_escaped\",\"pid\":$pid,\"name\":\"$comm_escaped\",\"cpu\":$cpu,\"mem_mb\":$mem_mb,\"command\":\"$cmd_escaped\"},"
-        else
-            echo "无法解析行: $line" >&2
-        fi
-    done < "$temp_file"
-    rm -f "$temp_file"
-
-    all_processes=$(echo "$all_processes" | sed 's/,$//')"]"
+            if [[ $line =~ ^([[:alnum:]]+)[[:space:]]+([0-9]+)[[:space:]]+([0-9.]+)[[:space:]]+([0-9]+)[[:space:]]+([^[:space:]]+)[[:space:]]+(.*)$ ]]; then
+                user="${BASH_REMATCH[1]}"
+                pid="${BASH_REMATCH[2]}"
+                cpu="${BASH_REMATCH[3]}"
+                rss_kb="${BASH_REMATCH[4]}"
+                comm="${BASH_REMATCH[5]}"
+                cmd="${BASH_REMATCH[6]}"
+                
+                # 统一内存格式为1位小数
+                mem_mb=$(echo "scale=1; $rss_kb / 1024" | bc | awk '{printf "%.1f", $1}')
+                
+                # 转义 JSON 特殊字符
+                cmd_escaped=$(escape_json "$cmd")
+                comm_escaped=$(escape_json "$comm")
+                user_escaped=$(escape_json "$user")
+                
+                add_item "$pid" \
+                    "{\"user\":\"$user_escaped\",\"pid\":$pid,\"name\":\"$comm_escaped\",\"cpu\":$cpu,\"mem_mb\":$mem_mb,\"command\":\"$cmd_escaped\"}" \
+                    "$user_escaped|$comm_escaped|$cmd_escaped" \
+                    "{\"cpu\":$cpu,\"mem_mb\":$mem_mb}"
+            else
+                echo "无法解析行: $line" >&2
+            fi
+        done < "$temp_file"
+        rm -f "$temp_file"
+
+        build_delta all_processes
+        all_processes="$delta"
+    fi
 
     # --- 磁盘使用情况 + 读写速率 ---
-    disks="["
-    while read -r filesystem size used avail usep mount; do
-        # 过滤掉不需要的文件系统类型，但保留 merged
-        [[ "$filesystem" == "tmpfs" || "$filesystem" == "udev" ]] && continue
-        
-        # 为 merged 文件系统添加特殊标识
-        device_type="physical"
-        if [[ "$filesystem" == *"merged"* ]]; then
-            device_type="docker_overlay"
-        fi
+    if (( SUB_DISKS )); then
+        reset_list
+        while read -r filesystem size used avail usep mount; do
+            # 过滤掉不需要的文件系统类型，但保留 merged
+            [[ "$filesystem" == "tmpfs" || "$filesystem" == "udev" ]] && continue
+            
+            # 为 merged 文件系统添加特殊标识
+            device_type="physical"
+            if [[ "$filesystem" == *"merged"* ]]; then
+                device_type="docker_overlay"
+            fi
 
-        dev=$(basename "$filesystem")
+            dev=$(basename "$filesystem")
 
-        read_sectors=$(awk -v d="$dev" '$3==d {print $6}' /proc/diskstats 2>/dev/null)
-        write_sectors=$(awk -v d="$dev" '$3==d {print $10}' /proc/diskstats 2>/dev/null)
+            read_sectors=$(awk -v d="$dev" '$3==d {print $6}' /proc/diskstats 2>/dev/null)
+            write_sectors=$(awk -v d="$dev" '$3==d {print $10}' /proc/diskstats 2>/dev/null)
 
-        [[ -z "$read_sectors" ]] && read_sectors=0
-        [[ -z "$write_sectors" ]] && write_sectors=0
+            [[ -z "$read_sectors" ]] && read_sectors=0
+            [[ -z "$write_sectors" ]] && write_sectors=0
 
-        if [[ -n ${disk_read_old[$dev]} ]]; then
-            read_kbps=$(( (read_sectors - disk_read_old[$dev]) * 512 / 1024 / INTERVAL ))
-            write_kbps=$(( (write_sectors - disk_write_old[$dev]) * 512 / 1024 / INTERVAL ))
-        else
-            read_kbps=0
-            write_kbps=0
-        fi
+            if [[ -n ${disk_read_old[$dev]} ]]; then
+                read_kbps=$(( (read_sectors - disk_read_old[$dev]) * 512 / 1024 / ELAPSED ))
+                write_kbps=$(( (write_sectors - disk_write_old[$dev]) * 512 / 1024 / ELAPSED ))
+            else
+                read_kbps=0
+                write_kbps=0
+            fi
 
-        disk_read_old[$dev]=$read_sectors
-        disk_write_old[$dev]=$write_sectors
+            disk_read_old[$dev]=$read_sectors
+            disk_write_old[$dev]=$write_sectors
 
-        disks+="{\"device\":\"$filesystem\",\"mount\":\"$mount\",\"type\":\"$device_type\",\"size_kb\":$size,\"used_kb\":$used,\"avail_kb\":$avail,\"used_percent\":\"$usep\",\"read_kbps\":$read_kbps,\"write_kbps\":$write_kbps},"
-    done < <(df -k --output=source,size,used,avail,pcent,target | tail -n +2 | head -15)  # 增加限制数量
+            mount_escaped=$(escape_json "$mount")
+            add_item "$mount_escaped" "{\"device\":\"$filesystem\",\"mount\":\"$mount_escaped\",\"type\":\"$device_type\",\"size_kb\":$size,\"used_kb\":$used,\"avail_kb\":$avail,\"used_percent\":\"$usep\",\"read_kbps\":$read_kbps,\"write_kbps\":$write_kbps}"
+        done < <(df -k --output=source,size,used,avail,pcent,target | tail -n +2 | head -15)  # 增加限制数量
 
-    disks=$(echo "$disks" | sed 's/,$//')"]"
+        build_delta disk_usage
+        disks="$delta"
+    fi
 
     # --- 网卡流量（KB/s） ---
-    net_devs="["
-    while read iface rx tx rest; do
-        [[ $iface == Inter* || $iface == face ]] && continue
-        iface=${iface%:}
-        rx_cur=$rx
-        tx_cur=$tx
-        if [[ -n ${rx_old[$iface]} ]]; then
-            rx_rate=$(( (rx_cur - rx_old[$iface]) / INTERVAL / 1024 ))
-            tx_rate=$(( (tx_cur - tx_old[$iface]) / INTERVAL / 1024 ))
-        else
-            rx_rate=0
-            tx_rate=0
-        fi
-        net_devs+="{\"iface\":\"$iface\",\"rx_kbps\":$rx_rate,\"tx_kbps\":$tx_rate},"
-        rx_old[$iface]=$rx_cur
-        tx_old[$iface]=$tx_cur
-    done < <(grep -v lo /proc/net/dev)  # 排除回环接口
-    net_devs=$(echo "$net_devs" | sed 's/,$//')"]"
+    if (( SUB_NET )); then
+        reset_list
+        while read iface rx tx rest; do
+            [[ $iface == Inter* || $iface == face ]] && continue
+            iface=${iface%:}
+            rx_cur=$rx
+            tx_cur=$tx
+            if [[ -n ${rx_old[$iface]} ]]; then
+                rx_rate=$(( (rx_cur - rx_old[$iface]) / ELAPSED / 1024 ))
+                tx_rate=$(( (tx_cur - tx_old[$iface]) / ELAPSED / 1024 ))
+            else
+                rx_rate=0
+                tx_rate=0
+            fi
+            add_item "$iface" "{\"iface\":\"$iface\",\"rx_kbps\":$rx_rate,\"tx_kbps\":$tx_rate}"
+            rx_old[$iface]=$rx_cur
+            tx_old[$iface]=$tx_cur
+        done < <(grep -v lo /proc/net/dev)  # 排除回环接口
+        build_delta net_usage
+        net_devs="$delta"
+    fi
 
     # --- 网络进程信息 ---
-    connections="["
-    while read -r line; do
-        proto=$(echo "$line" | awk '{print $1}')
-        state=$(echo "$line" | awk '{print $2}')
-        local=$(echo "$line" | awk '{print $5}')
-        remote=$(echo "$line" | awk '{print $6}')
-        users=$(echo "$line" | awk '{print $7}')
-        pid=$(echo "$users" | grep -o 'pid=[0-9]\+' | cut -d= -f2 | head -n1)
-        pname=$(echo "$users" | grep -o '"[^"]\+"' | tr -d '"' | head -n1)
-        [[ -z "$pid" ]] && continue
-        [[ -z "$pname" ]] && pname="unknown"
-
-        local_ip=$(echo "$local" | rev | cut -d: -f2- | rev)
-        local_port=$(echo "$local" | rev | cut -d: -f1 | rev)
-        remote_ip=$(echo "$remote" | rev | cut -d: -f2- | rev)
-        remote_port=$(echo "$remote" | rev | cut -d: -f1 | rev)
-
-        conn_count=$(ss -tunp | grep "pid=$pid" | wc -l)
-
-        proc_rx=0
-        proc_tx=0
-        if [[ -r /proc/$pid/net/dev ]]; then
-            while read iface rx tx; do
-                [[ $iface == Inter* || $iface == face ]] && continue
-                iface=${iface%:}
-                proc_rx=$((proc_rx + rx))
-                proc_tx=$((proc_tx + tx))
-            done < <(awk 'NR>2 {print $1, $2, $10}' /proc/$pid/net/dev 2>/dev/null)
-        fi
-        if [[ -n ${proc_rx_old[$pid]} ]]; then
-            rx_rate=$(( (proc_rx - proc_rx_old[$pid]) / INTERVAL / 1024 ))
-            tx_rate=$(( (proc_tx - proc_tx_old[$pid]) / INTERVAL / 1024 ))
-        else
-            rx_rate=0
-            tx_rate=0
-        fi
-        proc_rx_old[$pid]=$proc_rx
-        proc_tx_old[$pid]=$proc_tx
-
-        connections+="{\"pid\":$pid,\"name\":\"$pname\",\"local_ip\":\"$local_ip\",\"local_port\":\"$local_port\",\"remote_ip\":\"$remote_ip\",\"remote_port\":\"$remote_port\",\"connections\":$conn_count,\"upload_kbps\":$tx_rate,\"download_kbps\":$rx_rate},"
-    done < <(ss -tunp -H | head -20)  # 限制连接数量
-
-    connections=$(echo "$connections" | sed 's/,$//')"]"
+    if (( SUB_CONNECTIONS )); then
+        reset_list
+        while read -r line; do
+            proto=$(echo "$line" | awk '{print $1}')
+            state=$(echo "$line" | awk '{print $2}')
+            local=$(echo "$line" | awk '{print $5}')
+            remote=$(echo "$line" | awk '{print $6}')
+            users=$(echo "$line" | awk '{print $7}')
+            pid=$(echo "$users" | grep -o 'pid=[0-9]\+' | cut -d= -f2 | head -n1)
+            pname=$(echo "$users" | grep -o '"[^"]\+"' | tr -d '"' | head -n1)
+            [[ -z "$pid" ]] && continue
+            [[ -z "$pname" ]] && pname="unknown"
+
+            local_ip=$(echo "$local" | rev | cut -d: -f2- | rev)
+            local_port=$(echo "$local" | rev | cut -d: -f1 | rev)
+            remote_ip=$(echo "$remote" | rev | cut -d: -f2- | rev)
+            remote_port=$(echo "$remote" | rev | cut -d: -f1 | rev)
+
+            conn_count=$(ss -tunp | grep "pid=$pid" | wc -l)
+
+            proc_rx=0
+            proc_tx=0
+            if [[ -r /proc/$pid/net/dev ]]; then
+                while read iface rx tx; do
+                    [[ $iface == Inter* || $iface == face ]] && continue
+                    iface=${iface%:}
+                    proc_rx=$((proc_rx + rx))
+                    proc_tx=$((proc_tx + tx))
+                done < <(awk 'NR>2 {print $1, $2, $10}' /proc/$pid/net/dev 2>/dev/null)
+            fi
+            if [[ -n ${proc_rx_old[$pid]} ]]; then
+                rx_rate=$(( (proc_rx - proc_rx_old[$pid]) / ELAPSED / 1024 ))
+                tx_rate=$(( (proc_tx - proc_tx_old[$pid]) / ELAPSED / 1024 ))
+            else
+                rx_rate=0
+                tx_rate=0
+            fi
+            proc_rx_old[$pid]=$proc_rx
+            proc_tx_old[$pid]=$proc_tx
+
+            add_item "$proto|$local|$remote|$pid" "{\"pid\":$pid,\"name\":\"$pname\",\"local_ip\":\"$local_ip\",\"local_port\":\"$local_port\",\"remote_ip\":\"$remote_ip\",\"remote_port\":\"$remote_port\",\"connections\":$conn_count,\"upload_kbps\":$tx_rate,\"download_kbps\":$rx_rate}"
+        done < <(ss -tunp -H | head -20)  # 限制连接数量
+
+        build_delta connections
+        connections="$delta"
+    fi
     
     if [[ -r /proc/uptime ]]; then
         uptime_seconds=$(awk '{print int($1)}' /proc/uptime)
@@ -279,9 +400,22 @@ while true; do
     fi
     load_json="[$la1,$la5,$la15]"
 
-    # --- 输出 JSON ---
-    printf '///Start{"uptime_seconds":%d,"load":%s,"cpu_percent":%.1f,"mem_percent":%.1f,"mem_used":%s,"top_processes":%s,"all_processes":%s,"disk_usage":%s,"net_usage":%s,"connections":%s}End///\n' \
-        "$uptime_seconds" "$load_json" "$cpu_percent" "$mem_percent" "$mem_used" "$processes" "$all_processes" "$disks" "$net_devs" "$connections"
+    # --- 输出数据帧（只包含订阅的类别） ---
+    printf -v payload '{"seq":%d,"full":%d,"uptime_seconds":%d,"load":%s,"cpu_percent":%.1f,"mem_percent":%.1f,"mem_used":%s' \
+        "$seq" "$full" "$uptime_seconds" "$load_json" "$cpu_percent" "$mem_percent" "$mem_used"
+    (( SUB_TOP )) && payload+=",\"top_processes\":$processes"
+    (( SUB_PROCESSES )) && payload+=",\"all_processes\":$all_processes"
+    (( SUB_DISKS )) && payload+=",\"disk_usage\":$disks"
+    (( SUB_NET )) && payload+=",\"net_usage\":$net_devs"
+    (( SUB_CONNECTIONS )) && payload+=",\"connections\":$connections"
+    emit_frame D "$payload}"
+
+    # 本次采样成为下一次增量的基准
+    prev_items=()
+    for k in "${!next_items[@]}"; do
+        prev_items["$k"]="${next_items[$k]}"
+    done
+    seq=$((seq + 1))
 
-    sleep $INTERVAL
+    wait_for_commands
 done
\ No newline at end of file
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AuraShell resource monitor agent.
+
+Single process replacement for processes.sh: reads /proc directly, keeps the
+previous counters in memory and writes the same telemetry frames
+(@@T1 <kind> <byte length> <json>) with the same data model. Started by
+processes.sh when a python3 interpreter is available.
+"""
+import json
+import os
+import platform
+import pwd
+import select
+import socket
+import struct
+import sys
+import termios
+import time
+
+TOP_N = 4
+ALL_N = 50
+DISK_N = 15
+CONN_N = 20
+INTERVAL = 2
+KEYFRAME_EVERY = 15
+CATEGORIES = ("top", "processes", "disks", "net", "connections")
+SKIP_PREFIXES = ("kworker", "rcu_")
+HZ = os.sysconf("SC_CLK_TCK")
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+out = getattr(sys.stdout, "buffer", sys.stdout)
+
+
+def emit_frame(kind, data):
+    payload = json.dumps(data, ensure_ascii=False,
+                         separators=(",", ":")).encode("utf-8")
+    out.write(b"@@T1 " + kind.encode() + b" " +
+              str(len(payload)).encode() + b" " + payload + b"\n")
+    out.flush()
+
+
+def read_file(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8", "replace")
+    except (IOError, OSError):
+        return ""
+
+
+# ================== 系统信息 ==================
+def system_info():
+    cpuinfo = {}
+    for line in read_file("/proc/cpuinfo").splitlines():
+        key, _, value = line.partition(":")
+        cpuinfo.setdefault(key.strip(), value.strip())
+    mem_total = meminfo().get("MemTotal", 0) // 1024
+    uname = platform.uname()
+    freq = cpuinfo.get("cpu MHz", "")
+    try:
+        freq = "%.0fMHz" % float(freq)
+    except ValueError:
+        freq = "MHz"
+    return {
+        "system": uname[0], "kernel": uname[2], "arch": uname[4],
+        "hostname": socket.gethostname(),
+        "cpu_model": cpuinfo.get("model name", ""),
+        "cpu_cores": os.sysconf("SC_NPROCESSORS_ONLN"),
+        "cpu_freq": freq,
+        "cpu_cache": cpuinfo.get("cache size", ""),
+        "mem_total": "%dMB" % mem_total,
+        "ip": primary_ip(),
+    }
+
+
+def primary_ip():
+    # connect() on UDP only selects the route, nothing is sent
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("10.255.255.255", 1))
+        return s.getsockname()[0]
+    except (OSError, socket.error):
+        return ""
+    finally:
+        s.close()
+
+
+def meminfo():
+    result = {}
+    for line in read_file("/proc/meminfo").splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            result[parts[0].rstrip(":")] = int(parts[1])
+    return result
+
+
+# ================== 采样 ==================
+class Monitor:
+    def __init__(self):
+        self.last_time = None
+        self.last_cpu = None
+        self.last_proc = {}    # pid -> utime+stime
+        self.last_disk = {}    # dev -> (read_sectors, write_sectors)
+        self.last_net = {}     # iface -> (rx, tx)
+        self.last_proc_net = {}  # pid -> (rx, tx)
+        self.users = {}
+        self.prev_items = {}
+        self.seq = 0
+        self.interval = INTERVAL
+        self.subscribed = set(CATEGORIES)
+        self.force_full = False
+
+    def username(self, uid):
+        name = self.users.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                name = str(uid)
+            self.users[uid] = name
+        return name
+
+    # --- CPU ---
+    def cpu_percent(self):
+        fields = read_file("/proc/stat").split("\n", 1)[0].split()[1:]
+        values = [int(v) for v in fields]
+        idle = values[3]
+        total = sum(values[:8])
+        percent = 0.0
+        if self.last_cpu:
+            d_total = total - self.last_cpu[0]
+            d_idle = idle - self.last_cpu[1]
+            if d_total > 0:
+                percent = 100.0 * (d_total - d_idle) / d_total
+        self.last_cpu = (total, idle)
+        return round(percent, 1)
+
+    # --- 进程 ---
+    def processes(self, elapsed):
+        procs = []
+        current = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            stat = read_file("/proc/%d/stat" % pid)
+            if not stat:
+                continue
+            # comm may contain spaces and parentheses
+            lpar, rpar = stat.find("("), stat.rfind(")")
+            comm = stat[lpar + 1:rpar]
+            rest = stat[rpar + 2:].split()
+            ticks = int(rest[11]) + int(rest[12])
+            rss_kb = int(rest[21]) * PAGE_KB
+            current[pid] = ticks
+            cpu = 0.0
+            if elapsed and pid in self.last_proc:
+                cpu = 100.0 * (ticks - self.last_proc[pid]) / HZ / elapsed
+            procs.append((round(cpu, 1), pid, comm, rss_kb))
+        self.last_proc = current
+        procs.sort(key=lambda p: (-p[0], -p[3]))
+        return procs
+
+    def process_details(self, pid, comm):
+        try:
+            uid = os.stat("/proc/%d" % pid).st_uid
+        except OSError:
+            uid = -1
+        cmd = read_file("/proc/%d/cmdline" % pid).replace("\0", " ").strip()
+        return self.username(uid), cmd or "[%s]" % comm
+
+    # --- 磁盘 ---
+    def disks(self, elapsed):
+        stats = {}
+        for line in read_file("/proc/diskstats").splitlines():
+            parts = line.split()
+            if len(parts) >= 10:
+                stats[parts[2]] = (int(parts[5]), int(parts[9]))
+        result = []
+        seen = set()
+        for line in read_file("/proc/mounts").splitlines():
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            source, mount = parts[0], parts[1].replace("\\040", " ")
+            if source in ("tmpfs", "udev") or mount in seen:
+                continue
+            try:
+                st = os.statvfs(mount)
+            except OSError:
+                continue
+            if st.f_blocks == 0:
+                continue  # pseudo file systems, df hides them too
+            seen.add(mount)
+            size = st.f_blocks * st.f_frsize // 1024
+            used = (st.f_blocks - st.f_bfree) * st.f_frsize // 1024
+            avail = st.f_bavail * st.f_frsize // 1024
+            percent = -(-used * 100 // (used + avail)) if used + avail else 0
+            dev = os.path.basename(source)
+            read_s, write_s = stats.get(dev, (0, 0))
+            read_kbps = write_kbps = 0
+            if elapsed and dev in self.last_disk:
+                old_r, old_w = self.last_disk[dev]
+                read_kbps = int((read_s - old_r) * 512 / 1024 / elapsed)
+                write_kbps = int((write_s - old_w) * 512 / 1024 / elapsed)
+            self.last_disk[dev] = (read_s, write_s)
+            result.append({
+                "device": source, "mount": mount,
+                "type": "docker_overlay" if "merged" in source else "physical",
+                "size_kb": size, "used_kb": used, "avail_kb": avail,
+                "used_percent": "%d%%" % percent,
+                "read_kbps": read_kbps, "write_kbps": write_kbps,
+            })
+            if len(result) >= DISK_N:
+                break
+        return result
+
+    # --- 网卡 ---
+    @staticmethod
+    def net_counters(path):
+        counters = {}
+        for line in read_file(path).splitlines()[2:]:
+            iface, _, data = line.partition(":")
+            fields = data.split()
+            if len(fields) >= 9:
+                counters[iface.strip()] = (int(fields[0]), int(fields[8]))
+        return counters
+
+    def net_usage(self, elapsed):
+        result = []
+        for iface, (rx, tx) in self.net_counters("/proc/net/dev").items():
+            if "lo" in iface:
+                continue
+            rx_rate = tx_rate = 0
+            if elapsed and iface in self.last_net:
+                rx_rate = int((rx - self.last_net[iface][0]) / elapsed / 1024)
+                tx_rate = int((tx - self.last_net[iface][1]) / elapsed / 1024)
+            self.last_net[iface] = (rx, tx)
+            result.append({"iface": iface, "rx_kbps": rx_rate, "tx_kbps": tx_rate})
+        return result
+
+    # --- 网络连接 ---
+    @staticmethod
+    def decode_addr(addr, family):
+        host, port = addr.split(":")
+        raw = bytes(bytearray.fromhex(host))
+        if family == socket.AF_INET:
+            ip = socket.inet_ntop(family, struct.pack("<I", struct.unpack(">I", raw)[0]))
+        else:
+            raw = b"".join(struct.pack("<I", struct.unpack(">I", raw[i:i + 4])[0])
+                           for i in range(0, 16, 4))
+            ip = "[%s]" % socket.inet_ntop(family, raw)
+        return ip, str(int(port, 16))
+
+    def connections(self, elapsed):
+        sockets = []
+        for proto, path, family in (("tcp", "/proc/net/tcp", socket.AF_INET),
+                                    ("tcp", "/proc/net/tcp6", socket.AF_INET6),
+                                    ("udp", "/proc/net/udp", socket.AF_INET),
+                                    ("udp", "/proc/net/udp6", socket.AF_INET6)):
+            for line in read_file(path).splitlines()[1:]:
+                parts = line.split()
+                if len(parts) < 10:
+                    continue
+                state = parts[3]
+                # like `ss -tun`: no listening tcp, only connected udp
+                if (proto == "tcp" and state == "0A") or (proto == "udp" and state != "01"):
+                    continue
+                sockets.append((proto, parts[1], parts[2], parts[9], family))
+        if not sockets:
+            self.last_proc_net = {}
+            return []
+
+        # socket inode -> pid, and sockets per pid
+        inode_pid, pid_count = {}, {}
+        wanted = set(s[3] for s in sockets)
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            fd_dir = "/proc/%s/fd" % entry
+            try:
+                fds = os.listdir(fd_dir)
+            except OSError:
+                continue
+            for fd in fds:
+                try:
+                    link = os.readlink(fd_dir + "/" + fd)
+                except OSError:
+                    continue
+                if link.startswith("socket:["):
+                    inode = link[8:-1]
+                    if inode in wanted:
+                        pid = int(entry)
+                        inode_pid.setdefault(inode, pid)
+                        pid_count[pid] = pid_count.get(pid, 0) + 1
+
+        result, proc_net = [], {}
+        for proto, local, remote, inode, family in sockets:
+            pid = inode_pid.get(inode)
+            if pid is None:
+                continue
+            local_ip, local_port = self.decode_addr(local, family)
+            remote_ip, remote_port = self.decode_addr(remote, family)
+            if pid not in proc_net:
+                counters = self.net_counters("/proc/%d/net/dev" % pid)
+                proc_net[pid] = (sum(c[0] for c in counters.values()),
+                                 sum(c[1] for c in counters.values()))
+            rx, tx = proc_net[pid]
+            rx_rate = tx_rate = 0
+            if elapsed and pid in self.last_proc_net:
+                rx_rate = int((rx - self.last_proc_net[pid][0]) / elapsed / 1024)
+                tx_rate = int((tx - self.last_proc_net[pid][1]) / elapsed / 1024)
+            name = read_file("/proc/%d/comm" % pid).strip() or "unknown"
+            result.append(("%s|%s:%s|%s:%s|%d" % (proto, local_ip, local_port, remote_ip, remote_port, pid), {
+                "pid": pid, "name": name,
+                "local_ip": local_ip, "local_port": local_port,
+                "remote_ip": remote_ip, "remote_port": remote_port,
+                "connections": pid_count.get(pid, 0),
+                "upload_kbps": tx_rate, "download_kbps": rx_rate,
+            }))
+            if len(result) >= CONN_N:
+                break
+        self.last_proc_net = proc_net
+        return result
+
+    # --- 增量编码 ---
+    def delta(self, name, items, full, next_items):
+        """items: [(key, item, static signature or None, dynamic fields or None)]"""
+        keys, upsert = [], {}
+        for key, item, sig, dyn in items:
+            key = str(key)
+            if sig is None:
+                sig = item
+            keys.append(key)
+            if full or self.prev_items.get((name, key)) != sig:
+                upsert[key] = item
+            elif dyn is not None:
+                upsert[key] = dyn
+            next_items[(name, key)] = sig
+        return {"keys": keys, "upsert": upsert}
+
+    # --- 客户端命令 ---
+    def handle_command(self, line):
+        """@@C sub <类别,...> | @@C interval <秒> | @@C keyframe"""
+        parts = line.strip().split()
+        if len(parts) < 2 or parts[0] != "@@C":
+            return
+        if parts[1] == "sub":
+            wanted = set(parts[2].split(",")) if len(parts) > 2 else set()
+            wanted &= set(CATEGORIES)
+            # 重新订阅时旧计数器已过期，丢弃以免速率出现尖峰
+            if "disks" in wanted - self.subscribed:
+                self.last_disk = {}
+            if "net" in wanted - self.subscribed:
+                self.last_net = {}
+            if "connections" in wanted - self.subscribed:
+                self.last_proc_net = {}
+            self.subscribed = wanted
+        elif parts[1] == "interval" and len(parts) > 2:
+            try:
+                self.interval = max(1.0, float(parts[2]))
+            except ValueError:
+                pass
+        elif parts[1] == "keyframe":
+            self.force_full = True
+
+    def sample(self):
+        now = time.time()
+        elapsed = now - self.last_time if self.last_time else 0
+        self.last_time = now
+        full = 1 if self.seq % KEYFRAME_EVERY == 0 or self.force_full else 0
+        self.force_full = False
+        next_items = {}
+        sub = self.subscribed
+
+        # CPU 占用按进程计算，需要每次采样都更新计数器
+        procs = self.processes(elapsed) if sub & {"top", "processes"} else []
+        if not procs:
+            self.last_proc = {}
+
+        mem = meminfo()
+        total = mem.get("MemTotal", 0)
+        used = total - mem.get("MemFree", 0) - mem.get("Buffers", 0) - \
+            mem.get("Cached", 0) - mem.get("SReclaimable", 0)
+        load = read_file("/proc/loadavg").split()[:3] or ["0", "0", "0"]
+
+        data = {
+            "seq": self.seq, "full": full,
+            "uptime_seconds": int(float(read_file("/proc/uptime").split()[0] or 0)),
+            "load": [round(float(v), 2) for v in load],
+            "cpu_percent": self.cpu_percent(),
+            "mem_percent": round(100.0 * used / total, 1) if total else 0.0,
+            "mem_used": used // 1024,
+        }
+        if "top" in sub:
+            visible = [p for p in procs if not p[2].startswith(SKIP_PREFIXES)]
+            data["top_processes"] = [
+                {"pid": pid, "name": comm, "cpu": cpu, "mem_mb": round(rss / 1024.0, 1)}
+                for cpu, pid, comm, rss in visible[:TOP_N]]
+        if "processes" in sub:
+            all_items = []
+            for cpu, pid, comm, rss in procs[:ALL_N]:
+                user, cmd = self.process_details(pid, comm)
+                mem_mb = round(rss / 1024.0, 1)
+                item = {"user": user, "pid": pid, "name": comm,
+                        "cpu": cpu, "mem_mb": mem_mb, "command": cmd}
+                all_items.append((pid, item, (user, comm, cmd), {"cpu": cpu, "mem_mb": mem_mb}))
+            data["all_processes"] = self.delta(
+                "all_processes", all_items, full, next_items)
+        if "disks" in sub:
+            data["disk_usage"] = self.delta("disk_usage", [(d["mount"], d, None, None)
+                                                           for d in self.disks(elapsed)], full, next_items)
+        if "net" in sub:
+            data["net_usage"] = self.delta("net_usage", [(n["iface"], n, None, None)
+                                                         for n in self.net_usage(elapsed)], full, next_items)
+        if "connections" in sub:
+            data["connections"] = self.delta("connections", [(k, c, None, None)
+                                                             for k, c in self.connections(elapsed)], full, next_items)
+        self.prev_items = next_items
+        self.seq += 1
+        return data
+
+
+def open_command_tty():
+    """
+    Commands arrive on the controlling terminal (under sudo stdin is the
+    password pipe). Echo is switched off so they do not show up in the output.
+    """
+    try:
+        fd = os.open("/dev/tty", os.O_RDONLY | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        attrs = termios.tcgetattr(fd)
+        attrs[3] &= ~termios.ECHO
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    except termios.error:
+        pass
+    return fd
+
+
+def wait_for_commands(monitor, fd, pending):
+    """Sleep for the sampling interval, handling commands; return early when one arrives."""
+    deadline = time.time() + monitor.interval
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return pending
+        if fd is None:
+            time.sleep(remaining)
+            return pending
+        readable, _, _ = select.select([fd], [], [], remaining)
+        if not readable:
+            return pending
+        try:
+            data = os.read(fd, 4096)
+        except OSError:
+            data = b""
+        if not data:
+            fd = None
+            continue
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            monitor.handle_command(line.decode("utf-8", "replace"))
+        if lines:
+            return pending
+
+
+def main():
+    emit_frame("S", system_info())
+    monitor = Monitor()
+    fd = open_command_tty()
+    pending = b""
+    # prime the counters so the first frame already carries rates
+    monitor.processes(0)
+    monitor.cpu_percent()
+    monitor.last_time = time.time()
+    time.sleep(0.2)
+    while True:
+        emit_frame("D", monitor.sample())
+        pending = wait_for_commands(monitor, fd, pending)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
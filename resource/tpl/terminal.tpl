@@ -246,8 +246,11 @@ document.addEventListener('drop', e => e.preventDefault());
       if (bridge && bridge.output) {
         bridge.output.connect(function(b64) {
           try {
-            var text = base64ToUtf8(b64);
-            term.write(text);
+            // Raw bytes keep multi-byte UTF-8 sequences intact across frames
+            var bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+            term.write(bytes, function() {
+              if (bridge.ackOutput) bridge.ackOutput(bytes.length);
+            });
           } catch (e) {
             console.error('bridge.output write error', e);
           }
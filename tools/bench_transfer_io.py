@@ -0,0 +1,127 @@
+# bench_transfer_io.py
+"""
+Local side I/O benchmark of the transfer engine, no server needed.
+
+    python -m tools.bench_transfer_io --size-mb 512 --block-kb 32 --buffer-kb 1024
+
+upload:   old  f.read(block) per SFTP request
+          new  mmap + memoryview slices written to the unbuffered remote file
+               (PipelinedSFTP.put): the packet copy is the only one
+download: old  one unbuffered-sized write() per SFTP block into a default-buffered file
+          new  preallocated target written through an io_buffer sized buffer (PipelinedSFTP.get)
+
+Every block is handed to a sink that does what paramiko does with request
+data (append it to an outgoing packet buffer), so the numbers show the Python
+side copy cost that limits fast (10 GbE) links.
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from tools.sftp_engine import IO_ALIGN, mapped_file, preallocate
+
+
+class _PacketSink:
+    """Stand-in for paramiko's Message: copies request data into a packet buffer."""
+
+    def __init__(self, packet_size: int):
+        self.packet = io.BytesIO()
+        self.packet_size = packet_size
+
+    def write(self, data):
+        self.packet.write(data)
+        if self.packet.tell() >= self.packet_size:
+            self.packet.seek(0)
+            self.packet.truncate()
+
+
+def _timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def upload_old(path: str, block: int):
+    sink = _PacketSink(block * 4)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(block)
+            if not data:
+                break
+            sink.write(data)
+
+
+def upload_new(path: str, block: int):
+    # unbuffered SFTPFile: the slice goes straight into the request packet
+    sink = _PacketSink(block * 4)
+    with mapped_file(path) as source:
+        size = len(source)
+        pos = 0
+        while pos < size:
+            data = source[pos:pos + block]
+            sink.write(data)
+            pos += len(data)
+        del data
+
+
+def download_old(path: str, size: int, block: int):
+    chunk = os.urandom(block)
+    with open(path, "wb") as f:
+        for _ in range(size // block):
+            f.write(chunk)
+
+
+def download_new(path: str, size: int, block: int, buffer: int):
+    chunk = os.urandom(block)
+    with open(path, "wb", buffering=buffer) as f:
+        preallocate(f, size)
+        for _ in range(size // block):
+            f.write(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--block-kb", type=int, default=32,
+                        help="SFTP request size (sftp_block_size)")
+    parser.add_argument("--buffer-kb", type=int, default=1024,
+                        help="local write buffer (transfer_io_buffer_kb)")
+    parser.add_argument("--dir", default=None,
+                        help="directory for the test files (default: temp dir)")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    block = args.block_kb * 1024
+    size = args.size_mb * 1024 * 1024 // block * block
+    buffer = max(IO_ALIGN, args.buffer_kb * 1024 // IO_ALIGN * IO_ALIGN)
+    workdir = tempfile.mkdtemp(prefix="aurashell-bench-", dir=args.dir)
+    source = os.path.join(workdir, "source.bin")
+    target = os.path.join(workdir, "target.bin")
+    with open(source, "wb") as f:
+        for _ in range(size // (1024 * 1024) or 1):
+            f.write(os.urandom(1024 * 1024))
+
+    cases = [
+        ("upload   read()", lambda: upload_old(source, block)),
+        ("upload   mmap", lambda: upload_new(source, block)),
+        ("download write()", lambda: download_old(target, size, block)),
+        ("download prealloc+buf", lambda: download_new(target, size, block, buffer)),
+    ]
+    print(f"{size / 1024 / 1024:.0f} MB, block {block // 1024} KB, "
+          f"buffer {buffer // 1024} KB, best of {args.rounds}")
+    try:
+        for name, case in cases:
+            best = min(_timed(case) for _ in range(args.rounds))
+            print(f"{name:<24}{size / best / 1024 / 1024:>10.1f} MB/s")
+    finally:
+        for path in (source, target):
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# connection_bootstrap.py
+import binascii
+import os
+import shlex
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import paramiko
+
+from tools.atool import resource_path
+from tools.connection_pool import SSHConnectionPool
+from tools.deploy_cache import ScriptDeployCache
+
+REMOTE_PROC_PATH = "./.ssh/processes.sh"
+# processes.sh runs this next to itself when python3 is available
+REMOTE_AGENT_PATH = "./.ssh/processes_agent.py"
+
+
+def _exec(conn: paramiko.SSHClient, cmd: str, timeout: int = 10) -> str:
+    stdin, stdout, stderr = conn.exec_command(cmd, timeout=timeout)
+    return stdout.read().decode('utf-8', errors='ignore')
+
+
+def parse_id_map(content: str) -> Dict[int, str]:
+    """name:x:id:... lines (/etc/passwd, /etc/group) -> {id: name}"""
+    result = {}
+    for line in content.strip().split('\n'):
+        parts = line.split(':')
+        if len(parts) >= 3 and parts[2].isdigit():
+            result[int(parts[2])] = parts[0]
+    return result
+
+
+class BootstrapResult:
+    """
+    Outcome of a ConnectionBootstrap run, kept in the pooled connection's
+    shared_state so later consumers of the same transport (file manager, new
+    tabs) can reuse it instead of asking the server again.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.values: Dict[str, object] = {}
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}  # phase -> milliseconds
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+
+class ConnectionBootstrap:
+    """
+    Runs the per-connection startup steps concurrently on one shared transport.
+
+    Every phase opens its own channel (exec / session), so they only cost
+    one round trip of latency together instead of one each. Phases:
+        deploy      make sure processes.sh is current, return its md5
+        deploy_agent  same for the python monitor agent (if enabled)
+        home        resolve the file manager start directory
+        id_maps     uid -> user / gid -> group maps
+        host_key    fingerprint of the server host key
+    Callers can add their own phases (e.g. opening the monitor shell).
+    """
+    SHARED_KEY = "bootstrap"
+
+    def __init__(self, conn: paramiko.SSHClient, session_info, use_agent: bool = True):
+        self.conn = conn
+        self.session_info = session_info
+        self.use_agent = use_agent
+        self.local_proc = resource_path(
+            os.path.join("resource", "processes.sh"))
+        self.remote_proc = REMOTE_PROC_PATH
+        self.local_agent = resource_path(
+            os.path.join("resource", "processes_agent.py"))
+
+    # ---------------------------
+    # Shared state
+    # ---------------------------
+    @classmethod
+    def cached(cls, conn) -> Optional[BootstrapResult]:
+        """Bootstrap result of the pooled connection (may still be running)."""
+        return SSHConnectionPool.instance().get_shared_state(conn).get(cls.SHARED_KEY)
+
+    # ---------------------------
+    # Run
+    # ---------------------------
+    def run(self, extra_phases: Optional[Dict[str, Callable[[], object]]] = None) -> BootstrapResult:
+        result = BootstrapResult()
+        shared = SSHConnectionPool.instance().get_shared_state(self.conn)
+        shared[self.SHARED_KEY] = result
+
+        phases = {
+            "deploy": self._phase_deploy,
+            "home": self._phase_home,
+            "id_maps": self._phase_id_maps,
+            "host_key": self._phase_host_key,
+        }
+        if self.use_agent:
+            phases["deploy_agent"] = self._phase_deploy_agent
+        if extra_phases:
+            phases.update(extra_phases)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(phases), thread_name_prefix="ssh-bootstrap") as pool:
+            futures = {name: pool.submit(self._timed, name, func, result)
+                       for name, func in phases.items()}
+            for name, future in futures.items():
+                try:
+                    result.values[name] = future.result()
+                except Exception as e:
+                    result.errors[name] = f"{e}\n{traceback.format_exc()}"
+                    print(f"⚠️ bootstrap 阶段 {name} 失败: {e}")
+        result.timings["total"] = (time.perf_counter() - started) * 1000
+        result.done.set()
+        print("⏱️ bootstrap 耗时: " + ", ".join(
+            f"{k}={v:.0f}ms" for k, v in result.timings.items()))
+        return result
+
+    @staticmethod
+    def _timed(name, func, result: BootstrapResult):
+        t0 = time.perf_counter()
+        try:
+            return func()
+        finally:
+            result.timings[name] = (time.perf_counter() - t0) * 1000
+
+    # ---------------------------
+    # Phases
+    # ---------------------------
+    def _phase_deploy(self) -> Optional[str]:
+        """Deploy processes.sh if its content hash changed, return its md5."""
+        if not os.path.exists(self.local_proc):
+            raise FileNotFoundError(f"本地 processes 文件不存在: {self.local_proc}")
+        return ScriptDeployCache.ensure(self.conn, self.local_proc, self.remote_proc)
+
+    def _phase_deploy_agent(self) -> str:
+        return ScriptDeployCache.ensure(self.conn, self.local_agent, REMOTE_AGENT_PATH)
+
+    def _phase_home(self) -> Optional[str]:
+        """Configured default path if it exists, otherwise the login directory."""
+        default_path = getattr(self.session_info, 'file_manager_default_path', None)
+        if default_path:
+            quoted = shlex.quote(default_path)
+            cmd = f'if [ -d {quoted} ]; then printf "%s\\n" {quoted}; else pwd; fi'
+        else:
+            cmd = "pwd"
+        path = _exec(self.conn, cmd).strip()
+        return path or None
+
+    def _phase_id_maps(self) -> Dict[str, Dict[int, str]]:
+        content = _exec(self.conn, "cat /etc/passwd; echo '\x1e'; cat /etc/group")
+        passwd, _, group = content.partition('\x1e')
+        return {"uid": parse_id_map(passwd), "gid": parse_id_map(group)}
+
+    def _phase_host_key(self) -> Optional[str]:
+        transport = self.conn.get_transport()
+        host_key = transport.get_remote_server_key() if transport else None
+        if host_key is None:
+            return None
+        return binascii.hexlify(host_key.get_fingerprint()).decode().lower()
@@ -0,0 +1,311 @@
+# connection_pool.py
+import threading
+import time
+import paramiko
+import socks
+from typing import Dict, Optional, Tuple
+from tools.session_manager import Session
+from tools.setting_config import SCM
+
+
+class PooledConnection:
+    """
+    One authenticated SSH transport shared by every consumer of the same host.
+    """
+
+    def __init__(self, key: Tuple, client: paramiko.SSHClient, jumpbox_client: Optional[paramiko.SSHClient] = None):
+        self.key = key
+        self.client = client
+        self.jumpbox_client = jumpbox_client
+        self.refcount = 0
+        self.last_release = time.monotonic()
+        # Free-form per-connection cache (bootstrap results, capabilities...)
+        self.shared_state: Dict = {}
+
+    def is_active(self) -> bool:
+        try:
+            transport = self.client.get_transport()
+            return transport is not None and transport.is_active()
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            transport = self.client.get_transport()
+            if transport:
+                transport.set_keepalive(0)
+            self.client.close()
+        except Exception:
+            pass
+        if self.jumpbox_client:
+            try:
+                self.jumpbox_client.close()
+            except Exception:
+                pass
+
+
+class _KeyLock:
+    """Handshake lock of one pool key and the number of acquire() calls using it."""
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class SSHConnectionPool:
+    """
+    Process wide pool of SSH connections keyed by (host, port, user, jumpbox, proxy).
+
+    The terminal, the monitor shell, SFTP and exec_command callers all borrow the
+    same paramiko.SSHClient and open their own channels on its Transport.
+    Connections are reference counted and closed once they stay idle longer than
+    `ssh_pool_idle_timeout` seconds.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections: Dict[Tuple, PooledConnection] = {}
+        # Per-key locks so that concurrent tabs to the same host share one handshake;
+        # dropped once the key has no connection and no acquire() in progress
+        self._key_locks: Dict[Tuple, _KeyLock] = {}
+        self._by_client: Dict[int, PooledConnection] = {}
+        self._evict_timer: Optional[threading.Timer] = None
+        config = SCM().read_config()
+        self.idle_timeout = config.get("ssh_pool_idle_timeout", 60)
+
+    @classmethod
+    def instance(cls) -> "SSHConnectionPool":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = SSHConnectionPool()
+            return cls._instance
+
+    # ---------------------------
+    # Keys
+    # ---------------------------
+    @staticmethod
+    def make_key(session_info, jumpbox=None) -> Tuple:
+        jump_key = None
+        if isinstance(jumpbox, Session):
+            jump_key = (jumpbox.host, int(jumpbox.port), jumpbox.username)
+        proxy_key = (
+            getattr(session_info, 'proxy_type', 'None'),
+            getattr(session_info, 'proxy_host', ''),
+            getattr(session_info, 'proxy_port', 0),
+            getattr(session_info, 'proxy_username', ''),
+        )
+        return (session_info.host, int(session_info.port), session_info.username, jump_key, proxy_key)
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def acquire(self, session_info, jumpbox=None, timeout=10, banner_timeout=30) -> paramiko.SSHClient:
+        """
+        Return a connected SSHClient for the session, creating it if necessary.
+        Raises the same exceptions as paramiko.SSHClient.connect / socks.
+        Every successful acquire() must be paired with a release().
+        """
+        key = self.make_key(session_info, jumpbox)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, _KeyLock())
+            key_lock.users += 1
+        try:
+            return self._acquire(key, key_lock, session_info, jumpbox, timeout, banner_timeout)
+        finally:
+            with self._lock:
+                key_lock.users -= 1
+                self._forget_key_lock_locked(key)
+
+    def _acquire(self, key, key_lock: _KeyLock, session_info, jumpbox, timeout, banner_timeout):
+        with key_lock.lock:
+            with self._lock:
+                pooled = self._connections.get(key)
+                if pooled and not pooled.is_active():
+                    print(f"♻️ 连接池中的连接已失效，重新连接: {key[2]}@{key[0]}:{key[1]}")
+                    self._drop_locked(pooled)
+                    pooled = None
+                if pooled:
+                    pooled.refcount += 1
+                    print(
+                        f"🔁 复用已有 SSH 连接: {key[2]}@{key[0]}:{key[1]} (refs={pooled.refcount})")
+                    return pooled.client
+
+            # Handshake outside the pool lock, only this key is blocked
+            client, jumpbox_client = self._connect(
+                session_info, jumpbox, timeout, banner_timeout)
+            pooled = PooledConnection(key, client, jumpbox_client)
+            pooled.refcount = 1
+            with self._lock:
+                self._connections[key] = pooled
+                self._by_client[id(client)] = pooled
+            return client
+
+    def release(self, client: Optional[paramiko.SSHClient]):
+        """Give back a client obtained from acquire()."""
+        if client is None:
+            return
+        with self._lock:
+            pooled = self._by_client.get(id(client))
+            if pooled is None:
+                # Not pooled (or already evicted), just close it
+                try:
+                    client.close()
+                except Exception:
+                    pass
+                return
+            pooled.refcount = max(0, pooled.refcount - 1)
+            pooled.last_release = time.monotonic()
+            if pooled.refcount == 0:
+                if not pooled.is_active() or self.idle_timeout <= 0:
+                    self._drop_locked(pooled)
+                else:
+                    self._schedule_eviction_locked()
+
+    def get_shared_state(self, client: Optional[paramiko.SSHClient]) -> Dict:
+        """Per-connection dictionary that lives as long as the pooled transport."""
+        with self._lock:
+            pooled = self._by_client.get(id(client))
+            return pooled.shared_state if pooled else {}
+
+    def close_all(self):
+        with self._lock:
+            for pooled in list(self._connections.values()):
+                self._drop_locked(pooled)
+            if self._evict_timer:
+                self._evict_timer.cancel()
+                self._evict_timer = None
+
+    # ---------------------------
+    # Eviction
+    # ---------------------------
+    def _schedule_eviction_locked(self):
+        if self._evict_timer and self._evict_timer.is_alive():
+            return
+        self._evict_timer = threading.Timer(
+            self.idle_timeout, self._evict_idle)
+        self._evict_timer.daemon = True
+        self._evict_timer.start()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_timer = None
+            pending = False
+            for pooled in list(self._connections.values()):
+                if pooled.refcount > 0:
+                    continue
+                if now - pooled.last_release >= self.idle_timeout:
+                    print(
+                        f"🧹 关闭空闲 SSH 连接: {pooled.key[2]}@{pooled.key[0]}:{pooled.key[1]}")
+                    self._drop_locked(pooled)
+                else:
+                    pending = True
+            if pending:
+                self._schedule_eviction_locked()
+
+    def _drop_locked(self, pooled: PooledConnection):
+        self._connections.pop(pooled.key, None)
+        self._by_client.pop(id(pooled.client), None)
+        self._forget_key_lock_locked(pooled.key)
+        pooled.close()
+
+    def _forget_key_lock_locked(self, key: Tuple):
+        key_lock = self._key_locks.get(key)
+        if key_lock and key_lock.users == 0 and key not in self._connections:
+            del self._key_locks[key]
+
+    # ---------------------------
+    # Connection setup
+    # ---------------------------
+    def _create_socket(self, session_info):
+        proxy_type_name = getattr(session_info, 'proxy_type', 'None')
+        proxy_host = getattr(session_info, 'proxy_host', '')
+        proxy_port = getattr(session_info, 'proxy_port', 0)
+        if proxy_type_name == 'None' or not proxy_host or not proxy_port:
+            return None
+        proxy_type_map = {
+            'HTTP': socks.HTTP,
+            'SOCKS4': socks.SOCKS4,
+            'SOCKS5': socks.SOCKS5
+        }
+        proxy_type = proxy_type_map.get(proxy_type_name)
+        if not proxy_type:
+            return None
+        proxy_username = getattr(session_info, 'proxy_username', '')
+        proxy_password = getattr(session_info, 'proxy_password', '')
+        sock = socks.socksocket()
+        sock.settimeout(15)
+        sock.set_proxy(
+            proxy_type=proxy_type,
+            addr=proxy_host,
+            port=proxy_port,
+            rdns=proxy_type_name in ['SOCKS4', 'SOCKS5'],
+            username=proxy_username if proxy_username else None,
+            password=proxy_password if proxy_password else None
+        )
+        sock.connect((session_info.host, session_info.port))
+        return sock
+
+    @staticmethod
+    def _connect_client(client: paramiko.SSHClient, target, sock, timeout, banner_timeout):
+        if target.auth_type == "password":
+            client.connect(
+                target.host,
+                port=target.port,
+                username=target.username,
+                password=target.password,
+                timeout=timeout,
+                banner_timeout=banner_timeout,
+                sock=sock
+            )
+        else:
+            client.connect(
+                target.host,
+                port=target.port,
+                username=target.username,
+                key_filename=target.key_path,
+                timeout=timeout,
+                banner_timeout=banner_timeout,
+                sock=sock
+            )
+
+    def _connect(self, session_info, jumpbox, timeout, banner_timeout):
+        conn = paramiko.SSHClient()
+        conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        sock = self._create_socket(session_info)
+        jumpbox_conn = None
+
+        if isinstance(jumpbox, Session):
+            jumpbox_conn = paramiko.SSHClient()
+            jumpbox_conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            print(
+                f"🔗 连接到跳板机: {jumpbox.username}@{jumpbox.host}:{jumpbox.port}")
+            self._connect_client(jumpbox_conn, jumpbox,
+                                 sock, timeout, banner_timeout)
+            print("✅ 跳板机连接成功")
+
+            print(f"🔄 创建到目标服务器 {session_info.host}:{session_info.port} 的隧道")
+            jumpbox_channel = jumpbox_conn.get_transport().open_channel(
+                kind="direct-tcpip",
+                dest_addr=(session_info.host, session_info.port),
+                src_addr=(jumpbox.host, jumpbox.port)
+            )
+            print("✅ 隧道创建成功")
+            sock = jumpbox_channel
+
+        print(
+            f"🔗 连接到目标服务器: {session_info.username}@{session_info.host}:{session_info.port}")
+        try:
+            self._connect_client(conn, session_info,
+                                 sock, timeout, banner_timeout)
+        except Exception:
+            if jumpbox_conn:
+                jumpbox_conn.close()
+            raise
+        print("✅ 目标服务器连接成功")
+
+        conn.get_transport().set_keepalive(30)
+        return conn, jumpbox_conn
@@ -0,0 +1,186 @@
+# delta_upload.py
+import hashlib
+import os
+import shlex
+import struct
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import paramiko
+
+from tools.atool import resource_path
+from tools.deploy_cache import ScriptDeployCache
+
+REMOTE_DELTA_PATH = "./.ssh/delta_helper.py"
+_ADLER_MOD = 65521
+_MAX_LITERAL = 1024 * 1024
+# the rolling checksum runs in Python (a few MB/s where little matches) over
+# the whole file in memory: bigger files go up in full
+DELTA_MAX_SIZE = 64 * 1024 * 1024
+
+
+class DeltaUnsupported(Exception):
+    """The delta path cannot be used for this file; do a full upload instead."""
+
+
+def choose_block_size(size: int) -> int:
+    """~sqrt(size), clamped to 2-64 KB like rsync."""
+    block = int(size ** 0.5) // 1024 * 1024
+    return max(2048, min(64 * 1024, block))
+
+
+def parse_signature(text: str) -> Tuple[int, int, Dict[int, Dict[str, int]], Optional[Tuple[int, str]]]:
+    """
+    Output of `delta_helper.py sig` -> (size, block_size, {adler32: {md5: index}},
+    (length, md5) of a trailing partial block or None).
+    """
+    lines = text.split("\n")
+    size, block_size = (int(v) for v in lines[0].split())
+    blocks: Dict[int, Dict[str, int]] = {}
+    tail = None
+    count = -(-size // block_size) if block_size else 0
+    for index, line in enumerate(lines[1:count + 1]):
+        weak, strong = line.split()
+        if index == count - 1 and size % block_size:
+            tail = (size % block_size, strong)
+        else:
+            blocks.setdefault(int(weak, 16), {})[strong] = index
+    return size, block_size, blocks, tail
+
+
+def compute_delta(data: bytes, block_size: int, blocks: Dict[int, Dict[str, int]],
+                  tail: Optional[Tuple[int, str]] = None, tail_index: int = 0,
+                  max_literal: Optional[int] = None) -> List[tuple]:
+    """
+    rsync algorithm: slide a rolling adler32 over `data` and emit
+    ("C", first_block, count) for runs of remote blocks and ("D", bytes)
+    for literal data in between. Raises DeltaUnsupported as soon as the
+    literal data exceeds max_literal.
+    """
+    ops: List[tuple] = []
+    n = len(data)
+    literal_start = pos = 0
+    flushed = 0
+    if max_literal is None:
+        max_literal = n
+
+    def flush_literal(end):
+        nonlocal flushed
+        if end > literal_start:
+            ops.append(("D", data[literal_start:end]))
+            flushed += end - literal_start
+
+    def add_copy(index):
+        if ops and ops[-1][0] == "C" and ops[-1][1] + ops[-1][2] == index:
+            ops[-1] = ("C", ops[-1][1], ops[-1][2] + 1)
+        else:
+            ops.append(("C", index, 1))
+
+    weak = None
+    a = b = 0
+    while blocks and pos + block_size <= n:
+        if weak is None:
+            weak = zlib.adler32(data[pos:pos + block_size])
+            a, b = weak & 0xffff, weak >> 16
+        candidates = blocks.get(weak)
+        if candidates:
+            index = candidates.get(hashlib.md5(
+                data[pos:pos + block_size]).hexdigest())
+            if index is not None:
+                flush_literal(pos)
+                add_copy(index)
+                pos += block_size
+                literal_start = pos
+                weak = None
+                continue
+        if pos + block_size >= n:
+            break
+        if flushed + pos - literal_start >= max_literal:
+            raise DeltaUnsupported(
+                f"delta too large (more than {max_literal} of {n} bytes changed)")
+        # roll the window one byte forward
+        out, inp = data[pos], data[pos + block_size]
+        a = (a - out + inp) % _ADLER_MOD
+        b = (b - block_size * out + a - 1) % _ADLER_MOD
+        weak = (b << 16) | a
+        pos += 1
+
+    if tail and n - literal_start >= tail[0] and \
+            hashlib.md5(data[n - tail[0]:]).hexdigest() == tail[1]:
+        flush_literal(n - tail[0])
+        add_copy(tail_index)
+    else:
+        flush_literal(n)
+    return ops
+
+
+def encode_delta(ops: List[tuple], block_size: int, result_md5: str):
+    """Yield the binary instruction stream read by `delta_helper.py patch`."""
+    yield struct.pack(">I", block_size)
+    for op in ops:
+        if op[0] == "C":
+            yield b"C" + struct.pack(">QI", op[1], op[2])
+        else:
+            data = op[1]
+            for i in range(0, len(data), _MAX_LITERAL):
+                part = data[i:i + _MAX_LITERAL]
+                yield b"D" + struct.pack(">I", len(part)) + part
+    yield b"E" + result_md5.encode()
+
+
+def delta_upload(conn: paramiko.SSHClient, local_path: str, remote_path: str,
+                 callback: Optional[Callable[[int, int], None]] = None,
+                 max_ratio: float = 0.7, max_size: int = DELTA_MAX_SIZE) -> int:
+    """
+    Update remote_path to the content of local_path by sending only the
+    blocks that changed. Returns the number of literal bytes sent.
+    Raises DeltaUnsupported when a full upload should be done instead
+    (file above max_size, no python3 remotely, no remote file yet, the delta
+    is too big or the remote patch failed).
+    """
+    size = os.path.getsize(local_path)
+    if size > max_size:
+        raise DeltaUnsupported(f"file too large for a delta ({size} bytes)")
+    helper = resource_path(os.path.join("resource", "delta_helper.py"))
+    try:
+        ScriptDeployCache.ensure(conn, helper, REMOTE_DELTA_PATH)
+    except Exception as e:
+        raise DeltaUnsupported(f"deploy helper failed: {e}")
+
+    remote = shlex.quote(remote_path)
+    block_size = choose_block_size(size)
+    stdin, stdout, stderr = conn.exec_command(
+        f"[ -f {remote} ] && command -v python3 >/dev/null && "
+        f"python3 {REMOTE_DELTA_PATH} sig {remote} {block_size}")
+    stdin.close()
+    text = stdout.read().decode(errors="ignore")
+    if stdout.channel.recv_exit_status() != 0 or not text:
+        raise DeltaUnsupported("remote file or python3 missing")
+    remote_size, block_size, blocks, tail = parse_signature(text)
+    if callback:
+        callback(0, size)
+
+    with open(local_path, "rb") as f:
+        data = f.read()
+    ops = compute_delta(data, block_size, blocks, tail,
+                        tail_index=remote_size // block_size,
+                        max_literal=int(size * max_ratio))
+    literal = sum(len(op[1]) for op in ops if op[0] == "D")
+    if size and literal > size * max_ratio:
+        raise DeltaUnsupported(
+            f"delta too large ({literal} of {size} bytes changed)")
+
+    stdin, stdout, stderr = conn.exec_command(
+        f"python3 {REMOTE_DELTA_PATH} patch {remote}")
+    channel = stdin.channel
+    for part in encode_delta(ops, block_size, hashlib.md5(data).hexdigest()):
+        channel.sendall(part)
+    channel.shutdown_write()
+    result = stdout.read().decode(errors="ignore").strip()
+    if channel.recv_exit_status() != 0 or result != "OK":
+        error = stderr.read().decode(errors="ignore").strip()
+        raise DeltaUnsupported(f"delta patch failed: {error or result}")
+    if callback:
+        callback(size, size)
+    print(f"🔁 增量上传 {remote_path}: 发送 {literal}/{size} 字节")
+    return literal
@@ -0,0 +1,74 @@
+# deploy_cache.py
+import hashlib
+import posixpath
+import shlex
+import threading
+from typing import Dict, Tuple
+
+import paramiko
+
+from tools.connection_pool import SSHConnectionPool
+
+
+class ScriptDeployCache:
+    """
+    Content-hash keyed deployment of helper scripts to remote hosts.
+
+    The local file is read and hashed once per process. Deploying costs one
+    exec round trip (mkdir + md5sum) when the remote copy is current; only on
+    mismatch the script is streamed from memory over the exec channel's stdin
+    (cat > tmp && mv), without SFTP and without a local temp file. Pooled
+    connections additionally remember what they already deployed.
+    """
+    _local: Dict[str, Tuple[bytes, str]] = {}
+    _lock = threading.Lock()
+    SHARED_KEY = "deployed_scripts"
+
+    @classmethod
+    def local_script(cls, local_path: str) -> Tuple[bytes, str]:
+        """(content with LF line endings, md5 hex) of a local script."""
+        with cls._lock:
+            cached = cls._local.get(local_path)
+            if cached is None:
+                with open(local_path, 'rb') as f:
+                    content = f.read().replace(b'\r\n', b'\n')
+                cached = (content, hashlib.md5(content).hexdigest())
+                cls._local[local_path] = cached
+            return cached
+
+    @classmethod
+    def ensure(cls, conn: paramiko.SSHClient, local_path: str, remote_path: str, timeout: int = 15) -> str:
+        """
+        Make sure remote_path holds the local script and is executable.
+        Returns the md5 of the deployed file.
+        """
+        content, md5 = cls.local_script(local_path)
+        deployed = SSHConnectionPool.instance().get_shared_state(
+            conn).setdefault(cls.SHARED_KEY, {})
+        if deployed.get(remote_path) == md5:
+            return md5
+
+        remote_dir = shlex.quote(posixpath.dirname(remote_path) or ".")
+        remote = shlex.quote(remote_path)
+        check_cmd = (f"mkdir -p {remote_dir} && chmod 700 {remote_dir}; "
+                     f"[ -x {remote} ] && md5sum {remote} 2>/dev/null | awk '{{print $1}}'")
+        stdin, stdout, stderr = conn.exec_command(check_cmd, timeout=timeout)
+        remote_md5 = stdout.read().decode('utf-8', errors='ignore').strip()
+
+        if remote_md5 != md5:
+            print(f"⬆️ 部署 {posixpath.basename(remote_path)} (remote={remote_md5 or 'missing'}, local={md5})")
+            tmp = shlex.quote(f"{remote_path}.{md5[:8]}.tmp")
+            upload_cmd = (f"cat > {tmp} && chmod 755 {tmp} && mv -f {tmp} {remote} && "
+                          f"md5sum {remote} | awk '{{print $1}}'")
+            stdin, stdout, stderr = conn.exec_command(upload_cmd, timeout=timeout)
+            stdin.write(content)
+            stdin.flush()
+            stdin.channel.shutdown_write()
+            remote_md5 = stdout.read().decode('utf-8', errors='ignore').strip()
+            if remote_md5 != md5:
+                error = stderr.read().decode('utf-8', errors='ignore').strip()
+                raise IOError(f"部署 {remote_path} 失败: {error or remote_md5}")
+            print("✅ 上传并设置可执行成功")
+
+        deployed[remote_path] = md5
+        return md5
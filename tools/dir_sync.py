@@ -0,0 +1,269 @@
+# dir_sync.py
+import hashlib
+import os
+import posixpath
+import shlex
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+import paramiko
+
+# relative path -> (kind, size, mtime); kind: "f" file, "d" directory, "l" link/other
+Manifest = Dict[str, Tuple[str, int, float]]
+
+# FAT / SFTP attributes only keep whole seconds
+MTIME_TOLERANCE = 2.0
+
+
+def local_manifest(root: str) -> Manifest:
+    """Walk a local directory tree (relative paths use '/')."""
+    manifest: Manifest = {}
+
+    def scan(directory, prefix):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            rel = prefix + entry.name
+            try:
+                if entry.is_symlink():
+                    manifest[rel] = ("l", 0, 0.0)
+                elif entry.is_dir():
+                    manifest[rel] = ("d", 0, 0.0)
+                    scan(entry.path, rel + "/")
+                elif entry.is_file():
+                    st = entry.stat()
+                    manifest[rel] = ("f", st.st_size, st.st_mtime)
+            except OSError:
+                pass
+
+    scan(root, "")
+    return manifest
+
+
+def remote_manifest(conn: paramiko.SSHClient, root: str, timeout: int = 60) -> Manifest:
+    """Whole remote tree in one `find -printf` round trip."""
+    cmd = (f"find {shlex.quote(root)} -mindepth 1 "
+           f"-printf '%y\\t%s\\t%T@\\t%P\\0' 2>/dev/null")
+    stdin, stdout, stderr = conn.exec_command(cmd, timeout=timeout)
+    stdin.close()
+    data = stdout.read().decode("utf-8", errors="surrogateescape")
+    manifest: Manifest = {}
+    for record in data.split("\0"):
+        parts = record.split("\t", 3)
+        if len(parts) != 4:
+            continue
+        kind, size, mtime, rel = parts
+        if kind not in ("f", "d"):
+            kind = "l"
+        try:
+            manifest[rel] = (kind, int(size) if kind == "f" else 0, float(mtime))
+        except ValueError:
+            continue
+    return manifest
+
+
+def remote_exists(conn: paramiko.SSHClient, root: str) -> bool:
+    stdin, stdout, stderr = conn.exec_command(f"test -d {shlex.quote(root)}")
+    return stdout.channel.recv_exit_status() == 0
+
+
+def local_md5(path: str) -> Optional[str]:
+    md5 = hashlib.md5()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(block)
+    except OSError:
+        return None
+    return md5.hexdigest()
+
+
+def remote_md5s(conn: paramiko.SSHClient, root: str, rels: List[str]) -> Dict[str, str]:
+    """md5 of many remote files in one exec; the file list goes over stdin."""
+    if not rels:
+        return {}
+    stdin, stdout, stderr = conn.exec_command(
+        f"cd {shlex.quote(root)} && xargs -0 md5sum --")
+    stdin.write("\0".join(rels).encode("utf-8", errors="surrogateescape"))
+    stdin.channel.shutdown_write()
+    result = {}
+    for line in stdout.read().decode("utf-8", errors="surrogateescape").splitlines():
+        # md5sum escapes names containing '\' or newlines with a leading '\'
+        if len(line) > 34 and not line.startswith("\\"):
+            result[line[34:]] = line[:32]
+    return result
+
+
+class SyncPlan:
+    """
+    Minimal set of operations making `direction`'s destination a mirror of its
+    source. Built from two manifests; executing it and then planning again
+    yields an empty plan (mtimes are copied to the destination).
+    """
+
+    def __init__(self, local_root: str, remote_root: str, direction: str):
+        self.local_root = local_root
+        self.remote_root = remote_root
+        self.direction = direction  # "upload": local -> remote, "download": remote -> local
+        self.dry_run = True
+        self.delete = False
+        self.mkdirs: List[str] = []
+        # (relative path, size, source mtime)
+        self.transfers: List[Tuple[str, int, float]] = []
+        # destination entries missing from the source: (relative path, kind)
+        self.deletes: List[Tuple[str, str]] = []
+        # same content, only the mtime differs: (relative path, source mtime)
+        self.touches: List[Tuple[str, float]] = []
+        # file on one side, directory on the other
+        self.conflicts: List[str] = []
+        self.unchanged = 0
+        # same size, different mtime: content check pending (see resolve_by_hash)
+        self.hash_candidates: List[Tuple[str, int, float]] = []
+
+    @property
+    def transfer_bytes(self) -> int:
+        return sum(size for _, size, _ in self.transfers)
+
+    def is_empty(self, delete: Optional[bool] = None) -> bool:
+        delete = self.delete if delete is None else delete
+        return not (self.mkdirs or self.transfers or self.touches
+                    or (delete and self.deletes))
+
+    def local_path(self, rel: str) -> str:
+        return os.path.join(self.local_root, *rel.split("/"))
+
+    def remote_path(self, rel: str) -> str:
+        return posixpath.join(self.remote_root, rel)
+
+    def summary(self) -> str:
+        return (f"{len(self.transfers)} to transfer ({self.transfer_bytes} bytes), "
+                f"{len(self.mkdirs)} directories to create, "
+                f"{len(self.deletes)} extra, {len(self.touches)} timestamp fixes, "
+                f"{len(self.conflicts)} conflicts, {self.unchanged} unchanged")
+
+
+def compute_plan(local: Manifest, remote: Manifest, local_root: str, remote_root: str,
+                 direction: str = "upload", tolerance: float = MTIME_TOLERANCE) -> SyncPlan:
+    """
+    Compare source and destination manifests. A file is sent when it is missing,
+    its size differs or its mtime differs by more than `tolerance`; files whose
+    only difference is the mtime are listed in `hash_candidates` for an optional
+    content check by the caller.
+    """
+    plan = SyncPlan(local_root, remote_root, direction)
+    src, dst = (local, remote) if direction == "upload" else (remote, local)
+
+    for rel in sorted(src):
+        kind, size, mtime = src[rel]
+        other = dst.get(rel)
+        if kind == "l":
+            continue
+        if kind == "d":
+            if other is None:
+                plan.mkdirs.append(rel)
+            elif other[0] != "d":
+                plan.conflicts.append(rel)
+            continue
+        if other is None:
+            plan.transfers.append((rel, size, mtime))
+        elif other[0] != "f":
+            plan.conflicts.append(rel)
+        elif other[1] != size:
+            plan.transfers.append((rel, size, mtime))
+        elif abs(other[2] - mtime) > tolerance:
+            plan.hash_candidates.append((rel, size, mtime))
+        else:
+            plan.unchanged += 1
+
+    deleted_dirs = set()
+    for rel in sorted(dst):
+        if rel in src or dst[rel][0] == "l":
+            continue
+        # only the topmost entry of a removed subtree
+        parts = rel.split("/")
+        if any("/".join(parts[:i]) in deleted_dirs for i in range(1, len(parts))):
+            continue
+        plan.deletes.append((rel, dst[rel][0]))
+        if dst[rel][0] == "d":
+            deleted_dirs.add(rel)
+    return plan
+
+
+def resolve_by_hash(plan: SyncPlan, conn: paramiko.SSHClient, use_hash: bool):
+    """Files differing only in mtime: compare md5s (one exec) or just resend them."""
+    candidates, plan.hash_candidates = plan.hash_candidates, []
+    if not candidates:
+        return
+    if not use_hash:
+        plan.transfers.extend(candidates)
+        plan.transfers.sort()
+        return
+    remote = remote_md5s(conn, plan.remote_root, [rel for rel, _, _ in candidates])
+    for rel, size, mtime in candidates:
+        digest = remote.get(rel)
+        if digest and digest == local_md5(plan.local_path(rel)):
+            plan.touches.append((rel, mtime))
+        else:
+            plan.transfers.append((rel, size, mtime))
+    plan.transfers.sort()
+
+
+def build_plan(conn: paramiko.SSHClient, local_root: str, remote_root: str,
+               direction: str = "upload", use_hash: bool = False) -> SyncPlan:
+    """Scan both sides and compute the sync plan (nothing is modified)."""
+    # a missing source would turn into "delete everything" on the destination
+    if direction == "upload" and not os.path.isdir(local_root):
+        raise FileNotFoundError(f"Local directory not found: {local_root}")
+    if direction == "download" and not remote_exists(conn, remote_root):
+        raise FileNotFoundError(f"Remote directory not found: {remote_root}")
+    local = local_manifest(local_root) if os.path.isdir(local_root) else {}
+    remote = remote_manifest(conn, remote_root)
+    plan = compute_plan(local, remote, local_root, remote_root, direction)
+    resolve_by_hash(plan, conn, use_hash)
+    return plan
+
+
+def _remote_batch(conn: paramiko.SSHClient, root: str, command: str, data: str):
+    """Run `command` in root (created if missing) with `data` on its stdin."""
+    stdin, stdout, stderr = conn.exec_command(
+        f"mkdir -p {shlex.quote(root)} && cd {shlex.quote(root)} && {command}")
+    stdin.write(data.encode("utf-8", errors="surrogateescape"))
+    stdin.channel.shutdown_write()
+    if stdout.channel.recv_exit_status() != 0:
+        error = stderr.read().decode(errors="ignore").strip()
+        raise IOError(f"{command} failed: {error}")
+
+
+def apply_structure(plan: SyncPlan, conn: paramiko.SSHClient, delete: bool):
+    """Create directories, remove extra entries and fix mtimes on the destination."""
+    if plan.direction == "upload":
+        # names go NUL separated over stdin: no quoting, no argv limit
+        if plan.mkdirs:
+            _remote_batch(conn, plan.remote_root, "xargs -0 mkdir -p --",
+                          "\0".join(plan.mkdirs))
+        if delete and plan.deletes:
+            _remote_batch(conn, plan.remote_root, "xargs -0 rm -rf --",
+                          "\0".join(rel for rel, _ in plan.deletes))
+        if plan.touches:
+            _remote_batch(
+                conn, plan.remote_root,
+                "while IFS=\"$(printf '\\t')\" read -r t p; do touch -m -d \"@$t\" -- \"$p\"; done",
+                "".join(f"{int(mtime)}\t{rel}\n" for rel, mtime in plan.touches))
+    else:
+        os.makedirs(plan.local_root, exist_ok=True)
+        for rel in plan.mkdirs:
+            os.makedirs(plan.local_path(rel), exist_ok=True)
+        if delete:
+            for rel, kind in plan.deletes:
+                path = plan.local_path(rel)
+                if kind == "d":
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        for rel, mtime in plan.touches:
+            os.utime(plan.local_path(rel), (mtime, mtime))
@@ -0,0 +1,92 @@
+# listing_cache.py
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+DEFAULT_TTL = 30
+DEFAULT_MAX_ENTRIES = 256
+# directory mtimes have (at worst) one second resolution: a change made in the
+# same second as the stat that preceded the listing leaves the mtime as it was
+RACY_WINDOW = 1.0
+
+
+class _Entry:
+    __slots__ = ("listing", "mtime", "fetched")
+
+    def __init__(self, listing: List[dict], mtime: Optional[float], stat_time: Optional[float]):
+        self.listing = listing
+        if mtime is not None and (stat_time is None or mtime >= stat_time - RACY_WINDOW):
+            # too recent to prove the listing complete, revalidate by listing
+            mtime = None
+        self.mtime = mtime
+        self.fetched = time.monotonic()
+
+
+class ListingCache:
+    """
+    Directory listings of one session, keyed by remote path (LRU bounded).
+
+    A cached listing is served at once and then revalidated: within `ttl`
+    seconds only the directory mtime is compared (one stat; it changes when
+    entries are added, removed or renamed), after that the directory is listed
+    again since sizes and mtimes of the entries may have changed. Operations
+    done by this client invalidate the affected paths right away.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _norm(path: str) -> str:
+        return posixpath.normpath(path) if path else "/"
+
+    def get(self, path: str) -> Optional[Tuple[List[dict], Optional[float], bool]]:
+        """(listing, directory mtime, still within ttl) or None."""
+        path = self._norm(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            self._entries.move_to_end(path)
+            fresh = time.monotonic() - entry.fetched < self.ttl
+            return list(entry.listing), entry.mtime, fresh
+
+    def put(self, path: str, listing: List[dict], mtime: Optional[float],
+            stat_time: Optional[float] = None):
+        """
+        mtime is the directory mtime stat'ed before listing, at stat_time (on
+        the server's clock, as the mtime; None if unknown); it is kept only
+        when it is older than that by RACY_WINDOW.
+        """
+        path = self._norm(path)
+        with self._lock:
+            self._entries[path] = _Entry(list(listing), mtime, stat_time)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: str, subtree: bool = False):
+        """Forget a directory (and with subtree, everything below it)."""
+        path = self._norm(path)
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            self._entries.pop(path, None)
+            if subtree:
+                for key in [k for k in self._entries if k.startswith(prefix)]:
+                    del self._entries[key]
+
+    def invalidate_parent(self, path: str, subtree: bool = False):
+        """An entry changed: its directory's listing is outdated (and its own, with subtree)."""
+        path = self._norm(path)
+        self.invalidate(posixpath.dirname(path) or "/")
+        if subtree:
+            self.invalidate(path, subtree=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,343 @@
+# metrics_store.py
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from tools.setting_config import config_dir
+
+# (step seconds, slots): 2 s for 1 hour, 1 min for 24 hours, 10 min for 7 days
+TIERS = ((2, 1800), (60, 1440), (600, 1008))
+MAX_SERIES = 128
+NAME_SIZE = 64
+
+_MAGIC = b"AMS1"
+_HEADER = struct.Struct("<4sIII")  # magic, version, max_series, tier count
+_TIER = struct.Struct("<II")       # step, slots
+_HEADER_SIZE = 256
+_VERSION = 1
+
+
+class MetricRing:
+    """
+    Fixed step ring buffer of one metric at one resolution.
+
+    Slot i covers the time range [i*step, (i+1)*step) and holds the average of
+    every sample that fell into it. `tags` remembers which slot number is
+    stored at each ring position (slot + 1, 0 = empty), so stale positions left
+    from a previous lap or a gap in the data are recognised without clearing.
+    The buffers are arrays or memoryviews into an mmap'd file.
+    """
+
+    def __init__(self, step: int, capacity: int, tags=None, values=None):
+        self.step = step
+        self.capacity = capacity
+        self.tags = tags if tags is not None else array("q", bytes(8 * capacity))
+        self.values = values if values is not None else array("d", bytes(8 * capacity))
+        self._slot = -1
+        self._sum = 0.0
+        self._count = 0
+
+    @property
+    def span(self) -> int:
+        return self.step * self.capacity
+
+    def add(self, t: float, value: float):
+        slot = int(t // self.step)
+        if slot < self._slot:
+            return  # clock went backwards, keep the newer data
+        if slot != self._slot:
+            self._slot, self._sum, self._count = slot, 0.0, 0
+        self._sum += value
+        self._count += 1
+        pos = slot % self.capacity
+        self.tags[pos] = slot + 1
+        self.values[pos] = self._sum / self._count
+
+    def range(self, start: float, end: float) -> Tuple[List[float], List[float]]:
+        """(timestamps, values) of the filled slots between start and end."""
+        last = int(end // self.step)
+        first = max(int(start // self.step), last - self.capacity + 1)
+        times, values = [], []
+        tags, vals, cap, step = self.tags, self.values, self.capacity, self.step
+        for slot in range(first, last + 1):
+            pos = slot % cap
+            if tags[pos] == slot + 1:
+                times.append(float(slot * step))
+                values.append(vals[pos])
+        return times, values
+
+    def release(self):
+        """Drop references to mmap backed buffers so the file can be closed."""
+        if isinstance(self.tags, memoryview):
+            self.tags.release()
+            self.values.release()
+        self.tags = array("q", bytes(8 * self.capacity))
+        self.values = array("d", bytes(8 * self.capacity))
+
+
+class MetricSeries:
+    """One metric at every resolution tier; samples go into all tiers at once."""
+
+    def __init__(self, name: str, rings: List[MetricRing]):
+        self.name = name
+        self.rings = rings
+        self.last_time = None
+        self.last_value = None
+
+    def add(self, t: float, value: float):
+        for ring in self.rings:
+            ring.add(t, value)
+        self.last_time, self.last_value = t, value
+
+    def ring_for(self, span: float) -> MetricRing:
+        """The finest tier that still covers `span` seconds."""
+        for ring in self.rings:
+            if ring.span >= span:
+                return ring
+        return self.rings[-1]
+
+    def history(self, span: float, now: float) -> Tuple[List[float], List[float]]:
+        return self.ring_for(span).range(now - span, now)
+
+
+class _MmapFile:
+    """
+    Per host file holding MAX_SERIES fixed size series blocks.
+
+    Layout: header (magic, version, max_series, tiers) | name table of
+    max_series * NAME_SIZE bytes | series blocks, each tier being `slots` int64
+    tags followed by `slots` float64 values. A fresh file is created sparse
+    (all zero = all empty), so unused blocks cost no disk space.
+    """
+
+    def __init__(self, path: str, tiers, max_series: int):
+        self.path = path
+        self.tiers = tuple(tiers)
+        self.max_series = max_series
+        self.names_offset = _HEADER_SIZE
+        self.data_offset = self.names_offset + max_series * NAME_SIZE
+        self.block_size = sum(slots * 16 for _, slots in self.tiers)
+        size = self.data_offset + max_series * self.block_size
+
+        header = _HEADER.pack(_MAGIC, _VERSION, max_series, len(self.tiers)) + \
+            b"".join(_TIER.pack(step, slots) for step, slots in self.tiers)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fresh = True
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            with open(path, "rb") as f:
+                fresh = f.read(len(header)) != header
+        if fresh:
+            # layout changed or new host: start over
+            with open(path, "wb") as f:
+                f.write(header)
+                f.truncate(size)
+        self._file = open(path, "r+b")
+        self.map = mmap.mmap(self._file.fileno(), size)
+        self._views: List[memoryview] = []
+
+    def names(self) -> List[Optional[str]]:
+        result = []
+        for i in range(self.max_series):
+            offset = self.names_offset + i * NAME_SIZE
+            raw = self.map[offset:offset + NAME_SIZE].rstrip(b"\0")
+            result.append(raw.decode("utf-8", "replace") if raw else None)
+        return result
+
+    def claim(self, index: int, name: str):
+        raw = name.encode("utf-8")[:NAME_SIZE]
+        offset = self.names_offset + index * NAME_SIZE
+        self.map[offset:offset + NAME_SIZE] = raw.ljust(NAME_SIZE, b"\0")
+
+    def rings(self, index: int) -> List[MetricRing]:
+        rings = []
+        offset = self.data_offset + index * self.block_size
+        view = memoryview(self.map)
+        for step, slots in self.tiers:
+            tags = view[offset:offset + slots * 8].cast("q")
+            offset += slots * 8
+            values = view[offset:offset + slots * 8].cast("d")
+            offset += slots * 8
+            self._views.extend((tags, values))
+            rings.append(MetricRing(step, slots, tags, values))
+        self._views.append(view)
+        return rings
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self, series: List[MetricSeries]):
+        for s in series:
+            for ring in s.rings:
+                ring.release()
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self.map.flush()
+        self.map.close()
+        self._file.close()
+
+
+class MetricsStore:
+    """
+    Compact time-series history of one remote host.
+
+    Every telemetry sample handled by the main window is split into scalar
+    metrics (cpu, mem, load1, disk:<mount>:read, net:<iface>:rx, ...) and
+    appended to fixed size rings at 2 s / 1 min / 10 min resolution, so
+    memory is bounded by MAX_SERIES no matter how long a session stays open.
+    With `persist` the rings live in an mmap'd file under the config dir and
+    the history survives restarts.
+    Stores are shared between tabs of the same host through acquire/release.
+    """
+    _stores: Dict[str, "MetricsStore"] = {}
+    _refs: Dict[str, int] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, host_key: str, persist: bool = False, tiers=TIERS,
+                 max_series: int = MAX_SERIES):
+        self.host_key = host_key
+        self.tiers = tuple(tiers)
+        self.max_series = max_series
+        self._series: Dict[str, MetricSeries] = {}
+        self._file: Optional[_MmapFile] = None
+        self._free: List[int] = []
+        self._warned = False
+        if persist:
+            try:
+                self._open_file()
+            except Exception as e:
+                print(f"⚠️ 打开历史数据文件失败, 仅保存在内存中: {e}")
+                self._file = None
+
+    @classmethod
+    def acquire(cls, host_key: str, persist: bool = False) -> "MetricsStore":
+        with cls._lock:
+            store = cls._stores.get(host_key)
+            if store is None:
+                store = cls(host_key, persist=persist)
+                cls._stores[host_key] = store
+            cls._refs[host_key] = cls._refs.get(host_key, 0) + 1
+            return store
+
+    @classmethod
+    def release(cls, store: "MetricsStore"):
+        with cls._lock:
+            key = store.host_key
+            cls._refs[key] = cls._refs.get(key, 1) - 1
+            if cls._refs[key] <= 0:
+                cls._refs.pop(key, None)
+                cls._stores.pop(key, None)
+                store.close()
+
+    @staticmethod
+    def file_path(host_key: str) -> str:
+        safe = re.sub(r"[^\w.@-]+", "_", host_key)
+        return os.path.join(str(config_dir), "metrics", f"{safe}.bin")
+
+    def _open_file(self):
+        self._file = _MmapFile(self.file_path(self.host_key),
+                               self.tiers, self.max_series)
+        for index, name in enumerate(self._file.names()):
+            if name is None:
+                self._free.append(index)
+            else:
+                self._series[name] = MetricSeries(name, self._file.rings(index))
+        self._free.reverse()  # pop() hands out the lowest index first
+
+    # ---------------------------
+    # Recording
+    # ---------------------------
+    def _get_series(self, name: str) -> Optional[MetricSeries]:
+        series = self._series.get(name)
+        if series is not None:
+            return series
+        if len(self._series) >= self.max_series:
+            if not self._warned:
+                print(f"⚠️ {self.host_key} 指标数量超过 {self.max_series}, 忽略新指标 {name}")
+                self._warned = True
+            return None
+        if self._file is not None and self._free:
+            index = self._free.pop()
+            self._file.claim(index, name)
+            rings = self._file.rings(index)
+        else:
+            rings = [MetricRing(step, slots) for step, slots in self.tiers]
+        series = MetricSeries(name, rings)
+        self._series[name] = series
+        return series
+
+    def add(self, name: str, value, t: float):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        series = self._get_series(name)
+        if series is not None:
+            series.add(t, value)
+
+    def record(self, sample: dict, t: Optional[float] = None):
+        """Store the scalar metrics of an "info" telemetry sample."""
+        t = time.time() if t is None else t
+        add = self.add
+        add("cpu", sample.get("cpu_percent"), t)
+        add("mem", sample.get("mem_percent"), t)
+        add("mem_used", sample.get("mem_used"), t)
+        load = sample.get("load")
+        if isinstance(load, (list, tuple)):
+            for name, value in zip(("load1", "load5", "load15"), load):
+                add(name, value, t)
+        for disk in sample.get("disk_usage") or ():
+            mount = disk.get("mount")
+            if mount:
+                add(f"disk:{mount}:read", disk.get("read_kbps"), t)
+                add(f"disk:{mount}:write", disk.get("write_kbps"), t)
+        for nic in sample.get("net_usage") or ():
+            iface = nic.get("iface")
+            if iface:
+                add(f"net:{iface}:rx", nic.get("rx_kbps"), t)
+                add(f"net:{iface}:tx", nic.get("tx_kbps"), t)
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def names(self, prefix: str = "") -> List[str]:
+        return sorted(n for n in self._series if n.startswith(prefix))
+
+    def history(self, name: str, span: float, now: Optional[float] = None) -> Tuple[List[float], List[float]]:
+        """(timestamps, values) of the last `span` seconds at the finest tier covering it."""
+        series = self._series.get(name)
+        if series is None:
+            return [], []
+        return series.history(span, time.time() if now is None else now)
+
+    def summary(self, name: str, span: float, now: Optional[float] = None) -> Optional[Tuple[float, float, float]]:
+        """(min, avg, max) over the last `span` seconds, None without data."""
+        _, values = self.history(name, span, now)
+        if not values:
+            return None
+        return min(values), sum(values) / len(values), max(values)
+
+    def latest(self, name: str) -> Optional[float]:
+        series = self._series.get(name)
+        return series.last_value if series else None
+
+    # ---------------------------
+    # Lifetime
+    # ---------------------------
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close(list(self._series.values()))
+            except Exception as e:
+                print(f"⚠️ 关闭历史数据文件失败: {e}")
+            self._file = None
+        self._series.clear()
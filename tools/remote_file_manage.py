@@ -1,20 +1,30 @@
 # remote_file_manage.py
-from PyQt5.QtCore import pyqtSignal, QThread, QMutex, QWaitCondition, QThreadPool, QTimer, QEventLoop
+from PyQt5.QtCore import pyqtSignal, QThread, QMutex, QWaitCondition, QTimer, QEventLoop
 from tools.transfer_worker import TransferWorker
+from tools.sftp_engine import SFTPSessionPool
+from tools.tar_stream import local_tree_stats, remote_tree_stats, should_stream
+from tools.transfer_journal import TransferJournal
+from tools.dir_sync import apply_structure, build_plan
+from tools.transfer_scheduler import BACKGROUND, INTERACTIVE, USER, TransferScheduler
+from tools.transfer_telemetry import TransferTelemetry
+from tools.task_queue import MAIN_LANE, META_LANE, SLOW_LANE, TaskQueue
+from tools.listing_cache import ListingCache
+from tools.remote_lister import RemoteLister
 from tools.setting_config import SCM
+from tools.connection_pool import SSHConnectionPool
+from tools.connection_bootstrap import ConnectionBootstrap
 import paramiko
+import posixpath
+import threading
 import traceback
-import socks
 from typing import Dict, List, Optional
 import stat
 import os
 from typing import Tuple
 from datetime import datetime
 import shlex
-from PyQt5.QtCore import Qt
 from functools import partial
 import time
-from tools.session_manager import Session
 
 
 class RemoteFileManager(QThread):
@@ -31,11 +41,15 @@ class RemoteFileManager(QThread):
     sftp_ready = pyqtSignal()
     upload_progress = pyqtSignal(str, int, int, int)
     download_progress = pyqtSignal(str, int, int, int)
+    # Progress of all running transfers, sampled at UI rate (see TransferTelemetry)
+    transfer_progress_batch = pyqtSignal(list)
     # File path, success, error message
     upload_finished = pyqtSignal(str, bool, str)
     # Path, success, error message
     delete_finished = pyqtSignal(str, bool, str)
     list_dir_finished = pyqtSignal(str, list)  # path, result
+    # path, entries, first batch (clear the view); list_dir_finished follows
+    list_dir_batch = pyqtSignal(str, list, bool)
     # path, result (e.g. "directory"/"file"/False)
     path_check_result = pyqtSignal(str, object)
     # remote_path , local_path , status , error msg,open it
@@ -57,6 +71,12 @@ class RemoteFileManager(QThread):
     # remote_path_path
     start_to_uncompression = pyqtSignal(str)
     compression_finished = pyqtSignal(str, str)
+    # SyncPlan (dry run preview or the plan being executed)
+    sync_plan_ready = pyqtSignal(object)
+    # remote_dir, success, message
+    sync_finished = pyqtSignal(str, bool, str)
+    # identifier, "upload"/"download": a journaled transfer was resumed
+    transfer_resumed = pyqtSignal(str, str)
 
     def __init__(self, session_info, parent=None, child_key=None, jumpbox=None):
         super().__init__(parent)
@@ -76,6 +96,8 @@ class RemoteFileManager(QThread):
         # self.heart_timer = QTimer()
         # self.heart_timer.timeout.connect(self.keep_heartbeat)
         self.conn = None
+        # metadata workers and the slow lane, each with its own SFTP session
+        self._lane_threads: List[threading.Thread] = []
         self.sftp = None
         self.upload_conn = None
         self.download_conn = None
@@ -91,148 +113,37 @@ class RemoteFileManager(QThread):
         self.mutex = QMutex()
         self.condition = QWaitCondition()
         self._is_running = True
-        self._tasks = []
+        # prioritised, coalescing; metadata queries go to the worker pool,
+        # copy/delete to the slow lane thread
+        self._tasks = TaskQueue()
+        self.metadata_workers = max(1, int(SCM().read_config().get("metadata_workers", 3)))
 
-        # Thread pool for handling concurrent transfers
-        self.thread_pool = QThreadPool()
+        # Transfers run on the process wide TransferScheduler (priorities,
+        # per-host/global limits and bandwidth caps shared by all tabs)
         config = SCM().read_config()
-        max_threads = config.get("max_concurrent_transfers", 4)
-        self.thread_pool.setMaxThreadCount(max_threads)
+        self.scheduler = TransferScheduler.instance()
+        self.host_key = f"{self.user}@{self.host}:{self.port}"
+        self.sftp_pool: Optional[SFTPSessionPool] = None
+        self._reconnect_lock = threading.Lock()
+        # key of this host's resumable transfer journals (None = resume disabled)
+        self.journal_host = self.host_key if config.get(
+            "transfer_resume", True) else None
+        self.telemetry = TransferTelemetry(self)
+        # listings served at once on navigation, revalidated in the background
+        self.listing_cache = ListingCache(config.get("listing_cache_ttl", 30))
+        # picks find -printf or SFTP listing on first use
+        self.lister: Optional[RemoteLister] = None
+        self.telemetry.progress_batch.connect(self.transfer_progress_batch)
         self.active_workers = {}  # To track active TransferWorker instances
 
     # ---------------------------
     # Main thread loop
     # ---------------------------
-    def _create_socket(self):
-        if self.proxy_type == 'None' or not self.proxy_host or not self.proxy_port:
-            return None
-        sock = socks.socksocket()
-        sock.settimeout(15)
-        proxy_type_map = {
-            'HTTP': socks.HTTP,
-            'SOCKS4': socks.SOCKS4,
-            'SOCKS5': socks.SOCKS5
-        }
-        proxy_type = proxy_type_map.get(self.proxy_type)
-        if not proxy_type:
-            return None
-        use_remote_dns = self.proxy_type in ['SOCKS4', 'SOCKS5']
-        sock.set_proxy(
-            proxy_type=proxy_type,
-            addr=self.proxy_host,
-            port=self.proxy_port,
-            rdns=use_remote_dns,
-            username=self.proxy_username if self.proxy_username else None,
-            password=self.proxy_password if self.proxy_password else None
-        )
-        try:
-            sock.connect((self.host, self.port))
-            return sock
-        except Exception as e:
-            raise e
-
     def _create_ssh_connection(self):
-        """Helper function to create and configure an SSH connection with jumpbox support."""
-        conn = paramiko.SSHClient()
-        conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        sock = self._create_socket()
-
-        if isinstance(self.jumpbox, Session):
-            jumpbox_conn = paramiko.SSHClient()
-            jumpbox_conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-            host = self.jumpbox.host
-            user = self.jumpbox.username
-            port = self.jumpbox.port
-            password = self.jumpbox.password
-            auth_type = self.jumpbox.auth_type
-            key_path = self.jumpbox.key_path
-
-            print(f"🔗 连接到跳板机: {user}@{host}:{port}")
-
-            if auth_type == "password":
-                jumpbox_conn.connect(
-                    host, port, user, password,
-                    timeout=30, banner_timeout=30, sock=sock
-                )
-            else:
-                jumpbox_conn.connect(
-                    host, port, user, key_filename=key_path,
-                    timeout=30, banner_timeout=30, sock=sock
-                )
-
-            print("✅ 跳板机连接成功")
-
-            print(f"🔄 创建到目标服务器 {self.host}:{self.port} 的隧道")
-            jumpbox_transport = jumpbox_conn.get_transport()
-            dest_addr = (self.host, self.port)
-            jumpbox_channel = jumpbox_transport.open_channel(
-                kind="direct-tcpip",
-                dest_addr=dest_addr,
-                src_addr=(host, port)
-            )
-
-            print("✅ 隧道创建成功")
-
-            print(f"🔗 通过隧道连接到目标服务器: {self.user}@{self.host}:{self.port}")
-            try:
-                if self.auth_type == "password":
-                    conn.connect(
-                        self.host,
-                        port=self.port,
-                        username=self.user,
-                        password=self.password,
-                        timeout=30,
-                        banner_timeout=30,
-                        sock=jumpbox_channel
-                    )
-                else:
-                    conn.connect(
-                        self.host,
-                        port=self.port,
-                        username=self.user,
-                        key_filename=self.key_path,
-                        timeout=30,
-                        banner_timeout=30,
-                        sock=jumpbox_channel
-                    )
-                print("✅ 目标服务器连接成功")
-
-            except Exception as e:
-                self.error_occurred.emit(e)
-                jumpbox_conn.close()
-                raise e
-
-            self.jumpbox_conn = jumpbox_conn
-
-        else:
-            print(f"🔗 直接连接到服务器: {self.user}@{self.host}:{self.port}")
-            if self.auth_type == "password":
-                conn.connect(
-                    self.host,
-                    port=self.port,
-                    username=self.user,
-                    password=self.password,
-                    timeout=30,
-                    banner_timeout=30,
-                    sock=sock
-                )
-            else:
-                conn.connect(
-                    self.host,
-                    port=self.port,
-                    username=self.user,
-                    key_filename=self.key_path,
-                    timeout=30,
-                    banner_timeout=30,
-                    sock=sock
-                )
-            print("✅ 直接连接成功")
-
-        transport = conn.get_transport()
-        transport.set_keepalive(30)
-
-        # self.heart_timer.start(5000)
+        """Borrow the shared SSH connection for this session from the pool (jumpbox/proxy aware)."""
+        conn = SSHConnectionPool.instance().acquire(
+            self.session_info, self.jumpbox, timeout=30, banner_timeout=30)
+        print(f"✅ 文件管理器已获取连接: {self.user}@{self.host}:{self.port}")
         return conn
 
     def run(self):
@@ -243,105 +154,22 @@ class RemoteFileManager(QThread):
             # self.download_conn = self._create_ssh_connection()
 
             self.sftp = self.conn.open_sftp()
+            self.sftp_pool = SFTPSessionPool(self.conn)
             self.sftp_ready.emit()
             self._fetch_user_group_maps()
+            self._resume_pending_transfers()
+            lanes = [(META_LANE, f"metadata-{i} {self.host_key}")
+                     for i in range(self.metadata_workers)]
+            lanes.append((SLOW_LANE, f"slow-lane {self.host_key}"))
+            for lane, name in lanes:
+                thread = threading.Thread(
+                    target=self._lane_loop, args=(lane,), name=name, daemon=True)
+                self._lane_threads.append(thread)
+                thread.start()
             while self._is_running:
-                self.mutex.lock()
-                if not self._tasks:
-                    self.condition.wait(self.mutex)
-                if self._tasks:
-                    task = self._tasks.pop(0)
-                    self.mutex.unlock()
-                    try:
-                        ttype = task.get('type')
-                        if ttype == 'add_path':
-                            self._add_path_to_tree(
-                                task['path'], task["update_tree_sign"])
-                        elif ttype == 'kill_process':
-                            self._handle_kill_task(
-                                task['pid'], task.get('callback'))
-                        elif ttype == 'remove_path':
-                            self._remove_path_from_tree(task['path'])
-                        elif ttype == 'refresh':
-                            self._refresh_paths_impl(task.get('paths'))
-                        elif ttype == 'upload_file':
-                            self._dispatch_transfer_task(
-                                'upload',
-                                task['local_path'],
-                                task['remote_path'],
-                                task['compression'],
-                                task_id=task.get('task_id')
-                            )
-                        elif ttype == 'delete':
-                            self._handle_delete_task(
-                                task['path'],
-                                task.get('callback')
-                            )
-                        elif ttype == "download_files":
-                            self._dispatch_transfer_task(
-                                'download',
-                                None,  # local_path is not used for download tasks
-                                task['path'],
-                                task["compression"],
-                                open_it=task["open_it"],
-                                session_id=task.get("session_id")
-                            )
-                        elif ttype == 'list_dir':
-                            # print(f"Handle:{[task['path']]}")
-                            result = self.list_dir_detailed(task['path'])
-                            # print(f"List dir : {result}")
-                            self.list_dir_finished.emit(
-                                task['path'], result or [])
-                        elif ttype == 'check_path':
-                            path_to_check = task['path']
-                            try:
-                                res = self.check_path_type(
-                                    path_to_check)
-                            except Exception as e:
-                                res = False
-                            self.path_check_result.emit(path_to_check, res)
-                        elif ttype == 'copy_to':
-                            self._handle_copy_task(
-                                task['source_path'],
-                                task['target_path'],
-                                task.get('cut', False)
-                            )
-                        elif ttype == 'set_permissions':
-                            self._handle_permission_task(
-                                task['file_path'],
-                                task['permission_num']
-                            )
-                        elif ttype == 'get_permissions':
-                            self._handle_get_permission_task(task['file_path'])
-
-                        elif ttype == 'rename':
-                            self._handle_rename_task(
-                                task['path'],
-                                task['new_name'],
-                                task.get('callback')
-                            )
-                        elif ttype == 'file_info':
-                            path, info_dict, status, error_msg = self._get_file_info(
-                                task['path'])
-                            self.file_info_ready.emit(
-                                path, info_dict, status, error_msg)
-                        elif ttype == 'file_type':
-                            self.classify_file_type_using_file(task['path'])
-                        elif ttype == 'mkdir':
-                            self._handle_mkdir_task(
-                                task['path'], task.get('callback'))
-                        elif ttype == "mkfile":
-                            self._handle_mkfile_task(
-                                task["path"], task.get('callback')
-                            )
-                        else:
-                            print(f"Unknown task type: {ttype}")
-                    except Exception as e:
-                        tb = traceback.format_exc()
-                        self.error_occurred.emit(
-                            f"Error while executing task: {e}\n{tb}")
-                else:
-                    self.mutex.unlock()
+                task = self._next_task(MAIN_LANE)
+                if task is not None:
+                    self._execute_task(task)
 
         except Exception as e:
             tb = traceback.format_exc()
@@ -349,23 +177,173 @@ class RemoteFileManager(QThread):
         finally:
             self._cleanup()
 
+    def _next_task(self, lane: str) -> Optional[dict]:
+        """Block until the lane has a task (None when woken up to stop)."""
+        self.mutex.lock()
+        try:
+            while self._is_running and not self._tasks.has_work(lane):
+                self.condition.wait(self.mutex)
+            return self._tasks.pop(lane) if self._is_running else None
+        finally:
+            self.mutex.unlock()
+
+    def _lane_loop(self, lane: str):
+        """Metadata worker / slow lane thread; SSH multiplexes their channels on one transport."""
+        while self._is_running:
+            task = self._next_task(lane)
+            if task is None:
+                continue
+            try:
+                self._execute_task(task)
+            finally:
+                self.mutex.lock()
+                self._tasks.done(task)
+                self.condition.wakeAll()
+                self.mutex.unlock()
+
+    def _queue_task(self, task: dict):
+        self.mutex.lock()
+        if self._tasks.push(task):
+            self.condition.wakeAll()
+        self.mutex.unlock()
+
+    @property
+    def sftp(self) -> Optional[paramiko.SFTPClient]:
+        """SFTP session of the calling thread: lane threads have their own from the pool."""
+        if self.sftp_pool is not None and threading.current_thread() in self._lane_threads:
+            return self.sftp_pool.get()
+        return self._sftp
+
+    @sftp.setter
+    def sftp(self, value):
+        self._sftp = value
+
+    def _execute_task(self, task: dict):
+        if self._tasks.is_stale(task):
+            return
+        try:
+            ttype = task.get('type')
+            if ttype == 'add_path':
+                self._add_path_to_tree(
+                    task['path'], task["update_tree_sign"])
+            elif ttype == 'kill_process':
+                self._handle_kill_task(
+                    task['pid'], task.get('callback'))
+            elif ttype == 'remove_path':
+                self._remove_path_from_tree(task['path'])
+            elif ttype == 'refresh':
+                self._refresh_paths_impl(task.get('paths'))
+            elif ttype == 'upload_file':
+                self._dispatch_transfer_task(
+                    'upload',
+                    task['local_path'],
+                    task['remote_path'],
+                    task['compression'],
+                    task_id=task.get('task_id'),
+                    delta=task.get('delta', False)
+                )
+            elif ttype == 'delete':
+                self._handle_delete_task(
+                    task['path'],
+                    task.get('callback')
+                )
+            elif ttype == "download_files":
+                self._dispatch_transfer_task(
+                    'download',
+                    None,  # local_path is not used for download tasks
+                    task['path'],
+                    task["compression"],
+                    open_it=task["open_it"],
+                    session_id=task.get("session_id")
+                )
+            elif ttype == 'list_dir':
+                self._handle_list_dir_task(task)
+            elif ttype == 'check_path':
+                path_to_check = task['path']
+                try:
+                    res = self.check_path_type(
+                        path_to_check)
+                except Exception as e:
+                    res = False
+                if self._tasks.is_stale(task):
+                    return
+                self.path_check_result.emit(path_to_check, res)
+            elif ttype == 'copy_to':
+                self._handle_copy_task(
+                    task['source_path'],
+                    task['target_path'],
+                    task.get('cut', False)
+                )
+            elif ttype == 'set_permissions':
+                self._handle_permission_task(
+                    task['file_path'],
+                    task['permission_num']
+                )
+            elif ttype == 'get_permissions':
+                self._handle_get_permission_task(task['file_path'])
+
+            elif ttype == 'rename':
+                self._handle_rename_task(
+                    task['path'],
+                    task['new_name'],
+                    task.get('callback')
+                )
+            elif ttype == 'file_info':
+                path, info_dict, status, error_msg = self._get_file_info(
+                    task['path'])
+                self.file_info_ready.emit(
+                    path, info_dict, status, error_msg)
+            elif ttype == 'file_type':
+                self.classify_file_type_using_file(task['path'])
+            elif ttype == 'mkdir':
+                self._handle_mkdir_task(
+                    task['path'], task.get('callback'))
+            elif ttype == "mkfile":
+                self._handle_mkfile_task(
+                    task["path"], task.get('callback')
+                )
+            elif ttype == 'sync':
+                self._handle_sync_task(
+                    task['local_dir'], task['remote_dir'], task['direction'],
+                    task['delete'], task['use_hash'], task['dry_run'])
+            elif ttype == 'sync_apply':
+                self._handle_sync_apply_task(task['plan'], task['delete'])
+            else:
+                print(f"Unknown task type: {ttype}")
+        except Exception as e:
+            tb = traceback.format_exc()
+            self.error_occurred.emit(
+                f"Error while executing task: {e}\n{tb}")
+
     # ---------------------------
     # Thread Control & Cleanup
     # ---------------------------
     def stop(self):
+        self.mutex.lock()
         self._is_running = False
         self.condition.wakeAll()
+        self.mutex.unlock()
         self.wait()
 
     def _cleanup(self):
+        self.scheduler.cancel_owner(self)
+        self._is_running = False
+        self.mutex.lock()
+        self.condition.wakeAll()
+        self.mutex.unlock()
+        for thread in self._lane_threads:
+            # a running cp/rm is left to the server, the thread only waits on it
+            thread.join(timeout=1)
         try:
-            if self.sftp:
-                self.sftp.close()
+            if self._sftp:
+                self._sftp.close()
         except Exception:
             pass
+        if self.sftp_pool:
+            self.sftp_pool.close_all()
         try:
-            if self.conn:
-                self.conn.close()
+            conn, self.conn = self.conn, None
+            SSHConnectionPool.instance().release(conn)
             # if self.upload_conn:
             #     self.upload_conn.close()
             # if self.download_conn:
@@ -399,16 +377,16 @@ class RemoteFileManager(QThread):
         except Exception:
             pass
 
-    def _dispatch_transfer_task(self, action, local_path, remote_path, compression, open_it=False, task_id=None, session_id=None):
+    def _dispatch_transfer_task(self, action, local_path, remote_path, compression, open_it=False, task_id=None, session_id=None, delta=False):
         """Creates and starts TransferWorker(s) for uploads or downloads."""
         if action == 'upload':
             self._dispatch_upload_task(
-                local_path, remote_path, compression, open_it, task_id=task_id)
+                local_path, remote_path, compression, open_it, task_id=task_id, delta=delta)
         elif action == 'download':
             self._dispatch_download_task(
                 remote_path, compression, open_it, session_id=session_id)
 
-    def _dispatch_upload_task(self, local_path, remote_path, compression, open_it, task_id=None):
+    def _dispatch_upload_task(self, local_path, remote_path, compression, open_it, task_id=None, delta=False):
         """Handles dispatching of upload tasks, expanding directories if necessary."""
         # If compression is on and we have a list of paths, treat it as a single batch job.
         if compression and isinstance(local_path, list):
@@ -421,11 +399,18 @@ class RemoteFileManager(QThread):
         # Fallback to original logic for single items or non-compressed lists.
         paths_to_process = local_path if isinstance(
             local_path, list) else [local_path]
+        # Remote directories created/seen by any worker of this batch
+        known_dirs = set()
 
         for path_item in paths_to_process:
             is_dir = os.path.isdir(path_item)
 
-            if is_dir and not compression:
+            if is_dir and not compression and self._use_tar_stream(*local_tree_stats(path_item)):
+                # Many small files: one tar stream instead of one SFTP transfer per file
+                print(f"📦 流式 tar 上传 {path_item}")
+                self._create_and_start_worker(
+                    'upload', self.conn, path_item, remote_path, compression, open_it, stream_tar=True)
+            elif is_dir and not compression:
                 # Expand directory into a list of files for individual upload
                 all_files = self._list_local_files_recursive(path_item)
                 for file_path in all_files:
@@ -433,13 +418,15 @@ class RemoteFileManager(QThread):
                     # self._create_and_start_worker(
                     #     'upload', self.upload_conn, file_path, remote_path, compression, open_it, upload_context=path_item)
                     self._create_and_start_worker(
-                        'upload', self.conn, file_path, remote_path, compression, open_it, upload_context=path_item)
+                        'upload', self.conn, file_path, remote_path, compression, open_it, upload_context=path_item,
+                        known_dirs=known_dirs)
             else:
                 # It's a single file, a list of files, or a compressed directory
                 # self._create_and_start_worker(
                 #     'upload', self.upload_conn, path_item, remote_path, compression, open_it)
                 self._create_and_start_worker(
-                    'upload', self.conn, path_item, remote_path, compression, open_it)
+                    'upload', self.conn, path_item, remote_path, compression, open_it, known_dirs=known_dirs,
+                    delta=delta and not compression and not is_dir)
 
     def _dispatch_download_task(self, remote_path, compression, open_it, session_id=None):
         """Handles dispatching of download tasks, expanding directories if necessary."""
@@ -457,7 +444,12 @@ class RemoteFileManager(QThread):
                 print(f"非压缩下载 {path_item}")
                 is_dir = self.check_path_type(path_item) == "directory"
 
-                if is_dir:
+                if is_dir and self._use_tar_stream(*remote_tree_stats(self.conn, path_item)):
+                    print(f"📦 流式 tar 下载 {path_item}")
+                    self._create_and_start_worker(
+                        'download', self.conn, None, path_item, compression, open_it, session_id=session_id,
+                        stream_tar=True)
+                elif is_dir:
                     # Expand directory into a list of files for individual download
                     all_files, dirs_to_create = self._list_remote_files_recursive(
                         path_item)
@@ -475,6 +467,55 @@ class RemoteFileManager(QThread):
                     self._create_and_start_worker(
                         'download', self.conn, None, path_item, compression, open_it, session_id=session_id)
 
+    def _reconnect_transfers(self):
+        """
+        Called from transfer threads after the link dropped: replace the dead
+        connection (once, however many workers ask) and return the new
+        (connection, sftp_pool).
+        """
+        with self._reconnect_lock:
+            transport = self.conn.get_transport() if self.conn else None
+            if transport is None or not transport.is_active():
+                print(f"🔌 传输连接已断开, 重新连接 {self.user}@{self.host}:{self.port}")
+                old_conn, old_pool = self.conn, self.sftp_pool
+                self.conn = self._create_ssh_connection()
+                self.sftp_pool = SFTPSessionPool(self.conn)
+                self.lister = None
+                try:
+                    self.sftp = self.conn.open_sftp()
+                except Exception as e:
+                    print(f"⚠️ 重新打开 SFTP 失败: {e}")
+                if old_pool:
+                    old_pool.close_all()
+                SSHConnectionPool.instance().release(old_conn)
+            return self.conn, self.sftp_pool
+
+    def _resume_pending_transfers(self):
+        """Continue the transfers of this host that were interrupted by a disconnect or restart."""
+        if not self.journal_host:
+            return
+        # journals held by a running transfer (of any session) are not listed
+        for journal in TransferJournal.pending(self.journal_host):
+            data = journal.data
+            if data.get("action") == "upload" and os.path.isfile(data.get("local", "")):
+                print(f"⏩ 继续未完成的上传: {data['local']} -> {data['remote']}")
+                self.transfer_resumed.emit(data["local"], "upload")
+                self._create_and_start_worker(
+                    'upload', self.conn, data["local"], posixpath.dirname(data["remote"]), False,
+                    on_finished=lambda *_, j=journal: j.release())
+            elif data.get("action") == "download" and data.get("remote"):
+                print(f"⏩ 继续未完成的下载: {data['remote']} -> {data['local']}")
+                self.transfer_resumed.emit(data["remote"], "download")
+                self._create_and_start_worker(
+                    'download', self.conn, None, data["remote"], False, resume_target=data["local"],
+                    on_finished=lambda *_, j=journal: j.release())
+            else:
+                journal.discard()
+                journal.release()
+
+    def _use_tar_stream(self, count: int, total_bytes: int) -> bool:
+        return should_stream(count, total_bytes, SCM().read_config())
+
     def _list_remote_files_recursive(self, remote_path):
         """Recursively lists all files in a remote directory. Returns a tuple of (file_paths, dir_paths)."""
         file_paths = []
@@ -497,6 +538,77 @@ class RemoteFileManager(QThread):
 
         return file_paths, dir_paths
 
+    def _handle_sync_task(self, local_dir, remote_dir, direction, delete, use_hash, dry_run):
+        """Compares both trees and, unless dry_run, carries out the plan."""
+        try:
+            plan = build_plan(self.conn, local_dir,
+                              remote_dir, direction, use_hash)
+            plan.dry_run, plan.delete = dry_run, delete
+            print(f"🔄 同步计划 {local_dir} <-> {remote_dir}: {plan.summary()}")
+            self.sync_plan_ready.emit(plan)
+        except Exception as e:
+            print(f"❌ 同步失败 {local_dir} <-> {remote_dir}: {e}")
+            self.sync_finished.emit(remote_dir, False, str(e))
+            return
+        if not dry_run:
+            self._handle_sync_apply_task(plan, delete)
+
+    def _handle_sync_apply_task(self, plan, delete):
+        """
+        Carries out a computed plan: the structure right away, the files through
+        the transfer pool. sync_finished follows once every transfer is done.
+        """
+        remote_dir = plan.remote_root
+        plan.dry_run, plan.delete = False, delete
+        try:
+            apply_structure(plan, self.conn, delete)
+        except Exception as e:
+            print(f"❌ 同步失败 {plan.local_root} <-> {remote_dir}: {e}")
+            self.sync_finished.emit(remote_dir, False, str(e))
+            return
+        finally:
+            if plan.direction == "upload":
+                self.listing_cache.invalidate(remote_dir, subtree=True)
+        if not plan.transfers:
+            self.sync_finished.emit(remote_dir, True, plan.summary())
+            return
+
+        lock = threading.Lock()
+        remaining = [len(plan.transfers)]
+        failed = []
+
+        def transfer_done(rel, success, msg):
+            with lock:
+                if not success:
+                    failed.append(rel)
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            if failed:
+                print(f"❌ 同步 {remote_dir}: {len(failed)} 个文件传输失败")
+                self.sync_finished.emit(
+                    remote_dir, False, f"{len(failed)} of {len(plan.transfers)} files failed: "
+                    + ", ".join(failed[:5]))
+            else:
+                print(f"✅ 同步完成 {remote_dir}: {plan.summary()}")
+                self.sync_finished.emit(remote_dir, True, plan.summary())
+
+        # every directory of the destination exists now
+        known_dirs = {posixpath.dirname(plan.remote_path(rel))
+                      for rel, _, _ in plan.transfers}
+        for rel, _, mtime in plan.transfers:
+            on_finished = partial(transfer_done, rel)
+            if plan.direction == "upload":
+                self._create_and_start_worker(
+                    'upload', self.conn, plan.local_path(rel),
+                    posixpath.dirname(plan.remote_path(rel)), False,
+                    known_dirs=known_dirs, sync_mtime=mtime, on_finished=on_finished)
+            else:
+                self._create_and_start_worker(
+                    'download', self.conn, None, plan.remote_path(rel), False,
+                    resume_target=plan.local_path(rel), sync_mtime=mtime,
+                    on_finished=on_finished)
+
     def _list_local_files_recursive(self, local_path):
         """Recursively lists all files in a local directory."""
         file_paths = []
@@ -505,8 +617,11 @@ class RemoteFileManager(QThread):
                 file_paths.append(os.path.join(root, file))
         return file_paths
 
-    def _create_and_start_worker(self, action, connection, local_path, remote_path, compression, open_it=False, download_context=None, upload_context=None, task_id=None, session_id=None):
-        """Helper to create, connect signals, and start a single TransferWorker."""
+    def _create_and_start_worker(self, action, connection, local_path, remote_path, compression, open_it=False, download_context=None, upload_context=None, task_id=None, session_id=None, known_dirs=None, stream_tar=False, resume_target=None, delta=False, sync_mtime=None, on_finished=None):
+        """
+        Helper to create, connect signals, and start a single TransferWorker.
+        on_finished(success, msg) is called from the worker thread when it is done.
+        """
         worker = TransferWorker(
             connection,
             action,
@@ -516,8 +631,17 @@ class RemoteFileManager(QThread):
             download_context,
             upload_context,
             task_id,
-            session_id
+            session_id,
+            sftp_pool=self.sftp_pool,
+            known_dirs=known_dirs,
+            stream_tar=stream_tar,
+            journal_host=self.journal_host,
+            reconnect=self._reconnect_transfers,
+            resume_target=resume_target,
+            delta=delta and SCM().read_config().get("delta_upload", True),
+            sync_mtime=sync_mtime
         )
+        worker.telemetry = self.telemetry
 
         # Store open_it parameter in worker for download callback
         if action == 'download':
@@ -525,12 +649,18 @@ class RemoteFileManager(QThread):
 
         if action == 'upload':
             worker.signals.finished.connect(self.upload_finished)
+            if on_finished:
+                worker.signals.finished.connect(
+                    lambda path, success, msg: on_finished(success, msg))
+            worker.signals.finished.connect(
+                lambda path, success, msg: self.listing_cache.invalidate_parent(
+                    remote_path, subtree=True) if success and remote_path else None
+            )
             # Refresh the parent directory of the remote path upon successful upload.
             worker.signals.finished.connect(
                 lambda path, success, msg: self.refresh_paths(
                     [os.path.dirname(remote_path.rstrip('/'))]) if success and remote_path else None
             )
-            worker.signals.progress.connect(self.upload_progress)
             worker.signals.start_to_compression.connect(
                 self.start_to_compression)
             worker.signals.start_to_uncompression.connect(
@@ -542,6 +672,9 @@ class RemoteFileManager(QThread):
             # Create callback function for download completion
             def emit_download_finished(identifier, success, msg):
                 """Emit download finished signal with proper parameters"""
+                if on_finished:
+                    on_finished(success, msg)
+                self.telemetry.finish(identifier, success)
                 self.download_finished.emit(
                     identifier,
                     msg if success else "",
@@ -550,10 +683,14 @@ class RemoteFileManager(QThread):
                     worker._open_it
                 )
             worker._download_callback = emit_download_finished
-            worker.signals.progress.connect(
-                self.download_progress, Qt.QueuedConnection)
 
-        self.thread_pool.start(worker)
+        if open_it or delta:
+            priority = INTERACTIVE
+        elif sync_mtime is not None or resume_target:
+            priority = BACKGROUND
+        else:
+            priority = USER
+        self.scheduler.submit(worker, self.host_key, priority, owner=self)
 
         # Track the worker
         if task_id:
@@ -576,39 +713,27 @@ class RemoteFileManager(QThread):
             worker.stop()
 
     def mkdir(self, path: str, callback=None):
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'mkdir',
             'path': path,
             "callback": callback,
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def mkfile(self, path: str, callback=None):
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'mkfile',
             'path': path,
             "callback": callback,
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def get_file_type(self, path: str):
-        self.mutex.lock()
-        self._tasks.append({'type': 'file_type', 'path': path})
-        self.condition.wakeAll()
-        self.mutex.unlock()
+        self._queue_task({'type': 'file_type', 'path': path})
 
     def get_file_info(self, path: str):
         """
         The result is sent via the file_info_ready signal.
         """
-        self.mutex.lock()
-        self._tasks.append({'type': 'file_info', 'path': path})
-        self.condition.wakeAll()
-        self.mutex.unlock()
+        self._queue_task({'type': 'file_info', 'path': path})
 
     def set_permissions(self, file_path: str, permission_num: int):
         """
@@ -628,14 +753,11 @@ class RemoteFileManager(QThread):
                 - success (bool): True if the operation succeeded, False otherwise.
                 - error_msg (str): Error message if the operation failed, empty string otherwise.
         """
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'set_permissions',
             'file_path': file_path,
             'permission_num': permission_num
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def get_permissions(self, file_path: str):
         """
@@ -651,13 +773,10 @@ class RemoteFileManager(QThread):
                 - success (bool): True if the operation succeeded, False otherwise.
                 - error_msg (str): Error message if the operation failed, empty string otherwise.
         """
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'get_permissions',
             'file_path': file_path
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def copy_to(self, source_path: str, target_path: str, cut: bool = False):
         """
@@ -680,15 +799,12 @@ class RemoteFileManager(QThread):
             - success (bool): True if the operation succeeded, False otherwise.
             - error_msg (str): Error message if the operation failed, empty string otherwise.
         """
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'copy_to',
             'source_path': source_path,
             'target_path': target_path,
             'cut': cut
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def kill_process(self, pid: int, callback=None):
         """
@@ -710,14 +826,11 @@ class RemoteFileManager(QThread):
                 - success (bool): True if kill succeeded, False otherwise.
                 - error_msg (str): Error message if kill failed, empty string otherwise.
         """
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'kill_process',
             'pid': pid,
             'callback': callback
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def delete_path(self, path, callback=None):
         """
@@ -740,57 +853,52 @@ class RemoteFileManager(QThread):
                 - error_msg (str): Error message if deletion failed, empty string otherwise.
         """
 
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'delete',
             'path': path,
             'callback': callback
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def add_path(self, path: str, update_tree_sign=True):
-        self.mutex.lock()
-        self._tasks.append({'type': 'add_path', 'path': path,
+        self._queue_task({'type': 'add_path', 'path': path,
                            "update_tree_sign": update_tree_sign})
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def remove_path(self, path: str):
-        self.mutex.lock()
-        self._tasks.append({'type': 'remove_path', 'path': path})
-        self.condition.wakeAll()
-        self.mutex.unlock()
+        self._queue_task({'type': 'remove_path', 'path': path})
 
     def refresh_paths(self, paths: Optional[List[str]] = None):
         """Refresh the specified path or all directories if paths is None"""
-        self.mutex.lock()
-        self._tasks.append({'type': 'refresh', 'paths': paths})
-        self.condition.wakeAll()
-        self.mutex.unlock()
+        if paths is None:
+            self.listing_cache.clear()
+        else:
+            for path in paths:
+                self.listing_cache.invalidate(path)
+        self._queue_task({'type': 'refresh', 'paths': paths})
 
     def check_path_async(self, path: str):
-        self.mutex.lock()
-        self._tasks.append({'type': 'check_path', 'path': path})
-        self.condition.wakeAll()
-        self.mutex.unlock()
+        self._queue_task({'type': 'check_path', 'path': path})
 
-    def list_dir_async(self, path: str):
-        """List a directory"""
-        self.mutex.lock()
-        if any(t.get('type') == 'list_dir' and t.get('path') == path for t in self._tasks):
-            self.mutex.unlock()
+    def list_dir_async(self, path: str, use_cache: bool = True):
+        """
+        List a directory, the result is sent via list_dir_finished.
+
+        With use_cache a cached listing is emitted immediately and revalidated in
+        the background; list_dir_finished is emitted again only if it changed.
+        use_cache=False (explicit refresh) always lists the directory again.
+        """
+        cached = self.listing_cache.get(path) if use_cache and self.listing_cache.ttl > 0 else None
+        if cached is None:
+            self._queue_task({'type': 'list_dir', 'path': path})
             return
-        self._tasks.append({'type': 'list_dir', 'path': path})
-        self.condition.wakeAll()
-        self.mutex.unlock()
+        listing, mtime, fresh = cached
+        self.list_dir_finished.emit(path, listing)
+        # while fresh, an unchanged directory mtime is enough
+        self._queue_task({'type': 'list_dir', 'path': path, 'revalidate': True,
+                          'cached_mtime': mtime if fresh else None})
 
     def download_path_async(self, path: str, open_it: bool = False, compression=False, session_id: str = None):
-        self.mutex.lock()
-        self._tasks.append(
+        self._queue_task(
             {'type': 'download_files', 'path': path, "open_it": open_it, "compression": compression, "session_id": session_id})
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def rename(self, path: str, new_name: str, callback=None):
         """
@@ -815,17 +923,14 @@ class RemoteFileManager(QThread):
                 - error_msg (str): Error message if rename failed, empty string otherwise.
         """
 
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'rename',
             'path': path,
             'new_name': new_name,
             'callback': callback
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
-    def upload_file(self, local_path, remote_path: str, compression: bool, callback=None, task_id=None):
+    def upload_file(self, local_path, remote_path: str, compression: bool, callback=None, task_id=None, delta=False):
         """
         Uploads a local file to the remote server asynchronously.
 
@@ -839,6 +944,8 @@ class RemoteFileManager(QThread):
                 Receives two arguments:
                 - success (bool): True if upload succeeded, False otherwise.
                 - error_msg (str): Error message if upload failed, empty string otherwise.
+            delta (bool, optional): The remote file is an older copy of local_path
+                (re-upload after an edit); send only the changed blocks when possible.
 
         Signals:
             upload_finished (str, bool, str): Emitted upon completion with parameters:
@@ -847,17 +954,60 @@ class RemoteFileManager(QThread):
                 - error_msg (str): Error message if upload failed, empty string otherwise.
         """
 
-        self.mutex.lock()
-        self._tasks.append({
+        self._queue_task({
             'type': 'upload_file',
             'local_path': local_path,
             'remote_path': remote_path,
             'compression': compression,
             'callback': callback,
-            'task_id': task_id
+            'task_id': task_id,
+            'delta': delta
+        })
+
+    def sync_directory(self, local_dir: str, remote_dir: str, direction: str = "upload",
+                       delete: bool = False, use_hash: bool = False, dry_run: bool = True):
+        """
+        Mirrors local_dir to remote_dir ("upload") or remote_dir to local_dir ("download").
+
+        Both trees are scanned (the remote one with a single `find`), only new or
+        changed files are transferred through the transfer pool, and the source
+        mtimes are copied so that repeating the sync is cheap.
+
+        Args:
+            delete (bool): Remove destination entries missing from the source.
+            use_hash (bool): Compare md5s of files whose only difference is the mtime
+                instead of transferring them again.
+            dry_run (bool): Only compute the plan.
+
+        Signals:
+            sync_plan_ready (SyncPlan): The computed plan, also in dry-run mode.
+            sync_finished (str, bool, str): remote_dir, success, summary or error message,
+                once every transfer of the plan finished or failed.
+        """
+        self._queue_task({
+            'type': 'sync',
+            'local_dir': local_dir,
+            'remote_dir': remote_dir,
+            'direction': direction,
+            'delete': delete,
+            'use_hash': use_hash,
+            'dry_run': dry_run
+        })
+
+    def apply_sync_plan(self, plan, delete: bool = False):
+        """
+        Carries out a plan computed by a dry run of sync_directory, exactly as it
+        was previewed (nothing is deleted that the preview did not list).
+
+        Signals:
+            sync_finished (str, bool, str): remote_dir, success, summary or error message,
+                once every transfer of the plan finished or failed.
+        """
+        self._queue_task({
+            'type': 'sync_apply',
+            'plan': plan,
+            'delete': delete
         })
-        self.condition.wakeAll()
-        self.mutex.unlock()
 
     def classify_file_type_using_file(self, path: str) -> str:
         """
@@ -986,6 +1136,7 @@ class RemoteFileManager(QThread):
                 except FileNotFoundError:
                     try:
                         self.sftp.mkdir(current_path)
+                        self.listing_cache.invalidate_parent(current_path)
                         print(f"✅ Created directory: {current_path}")
                     except Exception as mkdir_exc:
                         error_msg = f"Failed to create directory {current_path}: {mkdir_exc}"
@@ -1062,6 +1213,7 @@ class RemoteFileManager(QThread):
                 # Create empty file by opening in write mode and closing immediately
                 with self.sftp.open(path, 'w') as f:
                     f.write('')  # Write empty content
+                self.listing_cache.invalidate_parent(path)
                 print(f"✅ Created file: {path}")
 
                 # Success
@@ -1196,6 +1348,7 @@ class RemoteFileManager(QThread):
 
             # 执行重命名
             self.sftp.rename(path, new_path)
+            self.listing_cache.invalidate_parent(path, subtree=True)
 
             print(f"✅ 重命名成功: {path} -> {new_path}")
             self.rename_finished.emit(path, new_path, True, "")
@@ -1262,6 +1415,9 @@ class RemoteFileManager(QThread):
 
             if exit_status == 0:
                 print(f"✅ 复制成功: {source_path} -> {target_path}")
+                self.listing_cache.invalidate_parent(target_path, subtree=True)
+                if cut:
+                    self.listing_cache.invalidate_parent(source_path, subtree=True)
                 self.copy_finished.emit(source_path, target_path, True, "")
 
                 # 刷新源和目标父目录
@@ -1576,6 +1732,7 @@ class RemoteFileManager(QThread):
 
             if exit_status == 0:
                 print(f"✅ 权限设置成功: {file_path} -> 0o{permission_num:03o}")
+                self.listing_cache.invalidate_parent(file_path)
                 self.permission_finished.emit(
                     file_path, permission_num, True, "")
 
@@ -1713,6 +1870,10 @@ class RemoteFileManager(QThread):
             if self.conn is None:
                 print("SSH 连接未建立")
                 return None
+            bootstrap = ConnectionBootstrap.cached(self.conn)
+            if (bootstrap and bootstrap.done.is_set() and bootstrap.get("home")
+                    and default_path == getattr(self.session_info, 'file_manager_default_path', None)):
+                return bootstrap.get("home")
             if default_path:
                 stdin, stdout, stderr = self.conn.exec_command(
                     f'if [ -d "{default_path}" ]; then echo "exists"; else echo "not found"; fi')
@@ -1767,10 +1928,18 @@ class RemoteFileManager(QThread):
     def _fetch_user_group_maps(self):
         """
         Fetch and parse /etc/passwd and /etc/group to cache UID/GID mappings.
+        Reuses the maps fetched by the connection bootstrap when available.
         """
         if self.conn is None:
             return
 
+        bootstrap = ConnectionBootstrap.cached(self.conn)
+        if bootstrap and bootstrap.wait(10) and bootstrap.get("id_maps"):
+            maps = bootstrap.get("id_maps")
+            self.uid_map.update(maps["uid"])
+            self.gid_map.update(maps["gid"])
+            return
+
         # Fetch /etc/passwd
         try:
             stdin, stdout, stderr = self.conn.exec_command("cat /etc/passwd")
@@ -1843,56 +2012,71 @@ class RemoteFileManager(QThread):
             if callback:
                 callback(False, error_msg)
 
-    def list_dir_detailed(self, path: str) -> Optional[List[dict]]:
+    def _dir_mtime(self, path: str) -> Optional[float]:
+        try:
+            return self.sftp.stat(path).st_mtime
+        except Exception:
+            return None
+
+    def _handle_list_dir_task(self, task: dict):
+        path = task['path']
+        revalidate = task.get('revalidate', False)
+        # taken before listing: a change during the listing shows up next time;
+        # the stat time is read on the server's clock, like the mtime
+        lister = self._get_lister()
+        stat_time = lister.server_time() if lister else None
+        mtime = self._dir_mtime(path)
+        if revalidate and mtime is not None and mtime == task.get('cached_mtime'):
+            return
+        on_batch = None
+        if not revalidate:
+            # stream into the view; a revalidation only reports the final result
+            first = [True]
+
+            def on_batch(entries):
+                if self._tasks.is_stale(task):
+                    return
+                self.list_dir_batch.emit(path, entries, first[0])
+                first[0] = False
+        result = self.list_dir_detailed(path, on_batch)
+        if result is None:
+            self.listing_cache.invalidate(path)
+            if revalidate:
+                # keep showing the cached listing
+                return
+        else:
+            previous = self.listing_cache.get(path)
+            self.listing_cache.put(path, result, mtime, stat_time)
+            if revalidate and previous is not None and previous[0] == result:
+                return
+        if self._tasks.is_stale(task):
+            print(f"⏭️ 丢弃过期的目录列表: {path}")
+            return
+        self.list_dir_finished.emit(path, result or [])
+
+    def _get_lister(self) -> Optional[RemoteLister]:
+        if self.conn is None:
+            return None
+        if self.lister is None:
+            self.lister = RemoteLister(self.conn, self._get_owner_group)
+        return self.lister
+
+    def list_dir_detailed(self, path: str, on_batch=None) -> Optional[List[dict]]:
+        """
+        Entries of a remote directory (None on error), see RemoteLister.
+        on_batch receives the entries in batches while the listing streams in.
+        """
         if self.conn is None:
             print("list_dir_detailed: ssh connection not ready")
             return None
         start_time = time.perf_counter()
-        detailed_result = []
-        safe_path = shlex.quote(path)
-        command = f'''
-        sh -c 'cd {safe_path} && for item in * .*; do
-            if [ "$item" = "." ] || [ "$item" = ".." ]; then continue; fi;
-            info=$(stat -c "%A	%s	%Y	%u	%g" "$item" 2>/dev/null);
-            if [ -z "$info" ]; then continue; fi;
-            printf "%s	%s" "$info" "$item";
-            if [ -L "$item" ] && [ -d "$item" ]; then printf "	DIRLINK"; fi;
-            printf "\\0";
-        done'
-        '''
         try:
-            stdin, stdout, stderr = self.conn.exec_command(command, timeout=20)
-            output = stdout.read().decode('utf-8', errors='ignore')
-            error_output = stderr.read().decode('utf-8', errors='ignore').strip()
-            if error_output:
-                print(
-                    f"Error executing remote command for path {path}: {error_output}")
-                return None
-            records = output.strip('\0').split('\0')
-            for record in records:
-                if not record:
-                    continue
-                parts = record.split('	')
-                if len(parts) < 6:
-                    continue
-                perms, size, mtime_unix, uid, gid, filename = parts[:6]
-                is_dir_link = len(parts) > 6 and parts[6] == 'DIRLINK'
-                is_dir = perms.startswith('d') or (
-                    perms.startswith('l') and is_dir_link)
-                owner, group = self._get_owner_group(int(uid), int(gid))
-                detailed_result.append({
-                    "name": filename,
-                    "is_dir": is_dir,
-                    "size": int(size),
-                    "mtime": datetime.fromtimestamp(int(mtime_unix)).strftime('%Y/%m/%d %H:%M'),
-                    "perms": perms,
-                    "owner": f"{owner}/{group}"
-                })
+            result = self._get_lister().list(path, self.sftp, on_batch)
             end_time = time.perf_counter()
             print(f"获取远程目录 '{path}' 数据耗时: {end_time - start_time:.4f} 秒")
-            return detailed_result
+            return result
         except Exception as e:
-            print(f"list_dir_detailed (optimized) error: {e}")
+            print(f"list_dir_detailed error: {e}")
 
     def _handle_delete_task(self, paths, callback=None):
         """
@@ -1925,6 +2109,8 @@ class RemoteFileManager(QThread):
 
             if exit_status == 0:
                 print(f"✅ Deletion successful: {paths}")
+                for p in paths:
+                    self.listing_cache.invalidate_parent(p, subtree=True)
 
                 # 计算所有父目录，刷新文件树
                 parent_dirs = {os.path.dirname(p)
@@ -2057,9 +2243,13 @@ class FileManagerHandler:
         #     partial(self._wrap_show_info, type_="uncompression"))
 
         fm.compression_finished.connect(self._on_compression_finished)
+        fm.sync_plan_ready.connect(self._on_sync_plan_ready)
+        fm.sync_finished.connect(self._on_sync_finished)
         fm.upload_progress.connect(partial(self._on_progress, mode="upload"))
         fm.download_progress.connect(
             partial(self._on_progress, mode="download"))
+        fm.transfer_progress_batch.connect(self._on_progress_batch)
+        fm.transfer_resumed.connect(self._on_transfer_resumed)
 
         self.session_widget.file_explorer.upload_file.connect(
             self._on_upload_request)
@@ -2095,10 +2285,22 @@ class FileManagerHandler:
         self.parent._update_transfer_item_name(
             identifier, new_name, self.child_key)
 
+    def _on_sync_plan_ready(self, plan):
+        self.parent._on_sync_plan_ready(plan, self.child_key)
+
+    def _on_sync_finished(self, remote_dir, status, msg):
+        self.parent._on_sync_finished(remote_dir, status, msg, self.child_key)
+
     def _on_progress(self, path, percentage, bytes_so_far, total_bytes, mode):
         self.parent._show_progresses(path, percentage, bytes_so_far, total_bytes,
                                      self.child_key, mode)
 
+    def _on_progress_batch(self, batch):
+        self.parent._show_progress_batch(batch, self.child_key)
+
+    def _on_transfer_resumed(self, identifier, action):
+        self.parent._add_transfer_item_if_not_exists(self.child_key, identifier, action)
+
     def _on_upload_request(self, local_path, remote_path, compression):
         self.parent._handle_upload_request(self.child_key, local_path, remote_path,
                                            compression, self.fm)
@@ -2111,9 +2313,11 @@ class FileManagerHandler:
             "sftp_ready",
             "upload_progress",
             "download_progress",
+            "transfer_progress_batch",
             "upload_finished",
             "delete_finished",
             "list_dir_finished",
+            "list_dir_batch",
             "path_check_result",
             "download_finished",
             "copy_finished",
@@ -2125,6 +2329,9 @@ class FileManagerHandler:
             "start_to_compression",
             "start_to_uncompression",
             "compression_finished",
+            "sync_plan_ready",
+            "sync_finished",
+            "transfer_resumed",
         ]
 
         for sig_name in signals:
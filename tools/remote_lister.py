@@ -0,0 +1,217 @@
+# remote_lister.py
+import shlex
+import stat
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+import paramiko
+
+# entries handed to on_batch at a time while a listing streams in; the first
+# batch is smaller so the view has something to show right away
+BATCH_SIZE = 500
+FIRST_BATCH_SIZE = 100
+
+# %M perms (ls style), %Y type following links (d = directory or link to one)
+FIND_FORMAT = "%M\\t%s\\t%T@\\t%U\\t%G\\t%Y\\t%f\\0"
+
+# prints the NUL separated names read from stdin that are (links to) directories;
+# `[ -d ]` is a shell builtin, so this forks once per xargs batch, not per name
+DIRLINK_FILTER = "xargs -0 sh -c 'for f; do [ -d \"$f\" ] && printf \"%s\\0\" \"$f\"; done' sh"
+
+OnBatch = Callable[[List[dict]], None]
+
+
+def _batch_due(result: List[dict], pending: List[dict]) -> bool:
+    first = len(result) == len(pending)
+    return len(pending) >= (FIRST_BATCH_SIZE if first else BATCH_SIZE)
+
+
+class RemoteLister:
+    """
+    Lists a remote directory with a constant number of remote processes.
+
+    Strategies, the first one the server supports is used for the session:
+      - "find": one `find -maxdepth 1 -printf` (GNU findutils) prints every
+        entry with its metadata, NUL separated, streamed as it is read.
+      - "sftp": `listdir_iter` over the SFTP session (read-ahead, streamed),
+        symlinks resolved afterwards with one batched `[ -d ]` exec, or with
+        one SFTP stat each when the account has no shell.
+    """
+
+    def __init__(self, conn: paramiko.SSHClient, owner_group: Callable[[int, int], Tuple[str, str]]):
+        self.conn = conn
+        self.owner_group = owner_group
+        self.strategy: Optional[str] = None
+        self._lock = threading.Lock()
+        # server clock - client clock (a lower bound), False until measured
+        self._clock_offset = False
+
+    def _probe(self) -> str:
+        with self._lock:
+            if self.strategy is None:
+                try:
+                    stdin, stdout, stderr = self.conn.exec_command(
+                        "find . -maxdepth 0 -printf ''", timeout=10)
+                    ok = stdout.channel.recv_exit_status() == 0
+                except Exception:
+                    ok = False
+                self.strategy = "find" if ok else "sftp"
+                print(f"📂 目录列表方式: {self.strategy}")
+            return self.strategy
+
+    def server_time(self) -> Optional[float]:
+        """
+        Current time on the server's clock, never later than the real one
+        (None if the server has no shell). Measured once per session.
+        """
+        with self._lock:
+            if self._clock_offset is False:
+                self._clock_offset = self._measure_clock_offset()
+            offset = self._clock_offset
+        return None if offset is None else time.time() + offset
+
+    def _measure_clock_offset(self) -> Optional[float]:
+        try:
+            stdin, stdout, stderr = self.conn.exec_command("date +%s", timeout=10)
+            stdin.close()
+            server = float(stdout.read().decode().strip())
+            received = time.time()
+        except Exception:
+            return None
+        # the server printed its time (truncated to the second) before we
+        # received it, so server - received underestimates the offset
+        offset = server - received
+        print(f"🕒 服务器时钟偏差: {offset:+.1f}s")
+        return offset
+
+    def list(self, path: str, sftp: paramiko.SFTPClient, on_batch: Optional[OnBatch] = None,
+             timeout: int = 20) -> Optional[List[dict]]:
+        """
+        Entries of path (None if it can't be listed). With on_batch, the
+        entries are also passed on in batches as soon as they arrive.
+        """
+        if self._probe() == "find":
+            return self._list_find(path, on_batch, timeout)
+        return self._list_sftp(path, sftp, on_batch)
+
+    # ---------------------------
+    # Records
+    # ---------------------------
+    def _entry(self, name: str, perms: str, size: int, mtime: float, uid: int, gid: int,
+               is_dir: bool) -> dict:
+        owner, group = self.owner_group(uid, gid)
+        return {
+            "name": name,
+            "is_dir": is_dir,
+            "size": size,
+            "mtime": datetime.fromtimestamp(int(mtime)).strftime('%Y/%m/%d %H:%M'),
+            "perms": perms,
+            "owner": f"{owner}/{group}"
+        }
+
+    def _parse_find_record(self, record: bytes) -> Optional[dict]:
+        parts = record.decode('utf-8', errors='ignore').split('\t', 6)
+        if len(parts) < 7 or not parts[6]:
+            return None
+        perms, size, mtime, uid, gid, kind, name = parts
+        try:
+            return self._entry(name, perms, int(size), float(mtime), int(uid), int(gid),
+                               perms.startswith('d') or (perms.startswith('l') and kind == 'd'))
+        except ValueError:
+            return None
+
+    # ---------------------------
+    # Strategies
+    # ---------------------------
+    def _list_find(self, path: str, on_batch: Optional[OnBatch], timeout: int) -> Optional[List[dict]]:
+        command = (f"cd {shlex.quote(path)} && "
+                   f"find . -mindepth 1 -maxdepth 1 -printf '{FIND_FORMAT}'")
+        stdin, stdout, stderr = self.conn.exec_command(command, timeout=timeout)
+        stdin.close()
+        channel = stdout.channel
+        result: List[dict] = []
+        pending: List[dict] = []
+        buffer = b""
+        while True:
+            data = channel.recv(65536)
+            if not data:
+                break
+            buffer += data
+            *records, buffer = buffer.split(b"\0")
+            for record in records:
+                entry = self._parse_find_record(record)
+                if entry:
+                    result.append(entry)
+                    pending.append(entry)
+            if on_batch and _batch_due(result, pending):
+                on_batch(pending)
+                pending = []
+        status = channel.recv_exit_status()
+        if status != 0 and not result:
+            error = stderr.read().decode('utf-8', errors='ignore').strip()
+            print(f"Error executing remote command for path {path}: {error}")
+            return None
+        if on_batch and pending:
+            on_batch(pending)
+        return result
+
+    def _list_sftp(self, path: str, sftp: paramiko.SFTPClient,
+                   on_batch: Optional[OnBatch]) -> Optional[List[dict]]:
+        result: List[dict] = []
+        pending: List[dict] = []
+        links = []
+        try:
+            for attr in sftp.listdir_iter(path):
+                mode = attr.st_mode or 0
+                if stat.S_ISLNK(mode):
+                    # emitted once resolved
+                    links.append(attr)
+                    continue
+                entry = self._entry(attr.filename, stat.filemode(mode), attr.st_size or 0,
+                                    attr.st_mtime or 0, attr.st_uid or 0, attr.st_gid or 0,
+                                    stat.S_ISDIR(mode))
+                result.append(entry)
+                pending.append(entry)
+                if on_batch and _batch_due(result, pending):
+                    on_batch(pending)
+                    pending = []
+        except IOError as e:
+            print(f"Error listing {path} over SFTP: {e}")
+            return None
+
+        dir_links = self._resolve_links(path, sftp, [a.filename for a in links])
+        for attr in links:
+            entry = self._entry(attr.filename, stat.filemode(attr.st_mode), attr.st_size or 0,
+                                attr.st_mtime or 0, attr.st_uid or 0, attr.st_gid or 0,
+                                attr.filename in dir_links)
+            result.append(entry)
+            pending.append(entry)
+        if on_batch and pending:
+            on_batch(pending)
+        return result
+
+    def _resolve_links(self, path: str, sftp: paramiko.SFTPClient, names: List[str]) -> set:
+        """Names among `names` (symlinks in path) that point to directories."""
+        if not names:
+            return set()
+        try:
+            stdin, stdout, stderr = self.conn.exec_command(
+                f"cd {shlex.quote(path)} && {DIRLINK_FILTER}", timeout=20)
+            stdin.write("\0".join(names).encode('utf-8'))
+            stdin.channel.shutdown_write()
+            output = stdout.read()
+            if stdout.channel.recv_exit_status() in (0, 123):  # 123: some names failed
+                return {n.decode('utf-8', errors='ignore') for n in output.split(b"\0") if n}
+        except Exception:
+            pass
+        # no shell on this account
+        dirs = set()
+        for name in names:
+            try:
+                if stat.S_ISDIR(sftp.stat(f"{path.rstrip('/')}/{name}").st_mode):
+                    dirs.add(name)
+            except IOError:
+                pass
+        return dirs
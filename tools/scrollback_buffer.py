@@ -0,0 +1,208 @@
+# scrollback_buffer.py
+import codecs
+import itertools
+import re
+from collections import deque
+from typing import List, Optional, Tuple
+
+# user@host:path$ / user@host:path#
+PROMPT_RE = re.compile(r"[\w\d\._-]+@[\w\d\.-]+:.*[#\$]")
+
+
+class AnsiStripper:
+    """
+    Incremental ANSI/VT escape sequence stripper.
+
+    Escape sequences may be split across chunks, so the parser state is kept
+    between feed() calls instead of running a regex over the whole text.
+    """
+    NORMAL, ESC, CSI, OSC, OSC_ESC, CHARSET = range(6)
+
+    def __init__(self):
+        self.state = self.NORMAL
+
+    def reset(self):
+        self.state = self.NORMAL
+
+    def feed(self, text: str) -> str:
+        out = []
+        append = out.append
+        state = self.state
+        for ch in text:
+            if state == self.NORMAL:
+                if ch == "\x1b":
+                    state = self.ESC
+                elif ch >= " " or ch in "\n\r\t\b":
+                    append(ch)
+                # other C0 controls (BEL, SI/SO ...) are dropped
+            elif state == self.ESC:
+                if ch == "[":
+                    state = self.CSI
+                elif ch == "]":
+                    state = self.OSC
+                elif ch in "()*+":
+                    state = self.CHARSET
+                else:
+                    # two-character sequence (ESC =, ESC >, ESC M ...)
+                    state = self.NORMAL
+            elif state == self.CSI:
+                # parameters/intermediates are 0x20-0x3f, final byte 0x40-0x7e
+                if "@" <= ch <= "~":
+                    state = self.NORMAL
+            elif state == self.OSC:
+                if ch == "\x07":
+                    state = self.NORMAL
+                elif ch == "\x1b":
+                    state = self.OSC_ESC
+            elif state == self.OSC_ESC:
+                # ESC \ terminates OSC, anything else keeps us inside
+                state = self.NORMAL if ch == "\\" else self.OSC
+            elif state == self.CHARSET:
+                state = self.NORMAL
+        self.state = state
+        return "".join(out)
+
+
+class ScrollbackBuffer:
+    """
+    Bounded, line oriented scrollback of plain terminal text.
+
+    Lines live in a fixed size ring addressed by a monotonically increasing
+    sequence number, so random access is O(1) and old lines are overwritten in
+    place. Lines matching the shell prompt are indexed while appending, which
+    lets get_command_blocks() jump straight to the last N commands without
+    scanning the scrollback.
+    """
+
+    def __init__(self, max_lines: int = 5000, max_line_length: int = 16384):
+        self.max_lines = max(1, int(max_lines))
+        self.max_line_length = max_line_length
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._ansi = AnsiStripper()
+        self.clear()
+
+    def clear(self):
+        self._ring: List[Optional[str]] = [None] * self.max_lines
+        self._next_seq = 0  # sequence number of the next completed line
+        self._partial: List[str] = []
+        self._pending_cr = False
+        self._prompts = deque()  # sequence numbers of prompt lines
+        self._decoder.reset()
+        self._ansi.reset()
+
+    # ---------------------------
+    # Append
+    # ---------------------------
+    def feed(self, data: bytes):
+        """Append raw terminal bytes."""
+        self.feed_text(self._decoder.decode(data))
+
+    def feed_text(self, text: str):
+        text = self._ansi.feed(text)
+        if not text:
+            return
+        partial = self._partial
+        for ch in text:
+            if self._pending_cr:
+                self._pending_cr = False
+                if ch != "\n":
+                    # bare CR: the line is being redrawn (progress bars, readline)
+                    partial.clear()
+            if ch == "\n":
+                self._commit_line()
+                partial = self._partial
+            elif ch == "\r":
+                self._pending_cr = True
+            elif ch == "\b":
+                if partial:
+                    partial.pop()
+            elif len(partial) < self.max_line_length:
+                partial.append(ch)
+
+    def _commit_line(self):
+        line = "".join(self._partial)
+        self._partial = []
+        seq = self._next_seq
+        self._ring[seq % self.max_lines] = line
+        self._next_seq = seq + 1
+        if PROMPT_RE.search(line):
+            self._prompts.append(seq)
+        oldest = self.first_seq
+        while self._prompts and self._prompts[0] < oldest:
+            self._prompts.popleft()
+
+    # ---------------------------
+    # Access
+    # ---------------------------
+    @property
+    def first_seq(self) -> int:
+        return max(0, self._next_seq - self.max_lines)
+
+    def __len__(self):
+        return self._next_seq - self.first_seq
+
+    def line(self, seq: int) -> str:
+        """Return a line by sequence number; the unfinished line is at _next_seq."""
+        if seq == self._next_seq:
+            return "".join(self._partial)
+        if seq < self.first_seq or seq > self._next_seq:
+            raise IndexError(seq)
+        return self._ring[seq % self.max_lines]
+
+    def lines(self, start: int, stop: int) -> List[str]:
+        start = max(start, self.first_seq)
+        stop = min(stop, self._next_seq)
+        return [self._ring[i % self.max_lines] for i in range(start, stop)]
+
+    def tail(self, max_chars: int = 1500) -> str:
+        """Last max_chars characters of the scrollback, walking backwards."""
+        parts = ["".join(self._partial)]
+        size = len(parts[0])
+        seq = self._next_seq - 1
+        first = self.first_seq
+        while seq >= first and size < max_chars:
+            line = self._ring[seq % self.max_lines]
+            parts.append(line)
+            size += len(line) + 1
+            seq -= 1
+        text = "\n".join(reversed(parts))
+        return text[-max_chars:] if len(text) > max_chars else text
+
+    def search(self, pattern, limit: int = 50) -> List[Tuple[int, str]]:
+        """Newest-first (seq, line) matches of a regex or plain substring."""
+        if isinstance(pattern, str):
+            pattern = re.compile(re.escape(pattern))
+        result = []
+        seq = self._next_seq
+        first = self.first_seq
+        while seq >= first and len(result) < limit:
+            line = self.line(seq)
+            if pattern.search(line):
+                result.append((seq, line))
+            seq -= 1
+        return result
+
+    def get_command_blocks(self, count: int = 1) -> List[Tuple[str, str]]:
+        """
+        Return up to `count` (command, output) pairs, newest first.
+        A block is the text between two consecutive prompt lines.
+        """
+        # only the newest prompts, without copying the whole deque
+        prompts = list(itertools.islice(reversed(self._prompts), count + 1))[::-1]
+        if PROMPT_RE.search("".join(self._partial)):
+            # the prompt currently waiting for input closes the last block
+            prompts.append(self._next_seq)
+            prompts = prompts[-(count + 1):]
+        blocks = []
+        for i in range(len(prompts) - 1, 0, -1):
+            start, end = prompts[i - 1], prompts[i]
+            blocks.append((self._extract_command(self.line(start)),
+                           "\n".join(self.lines(start + 1, end))))
+        return blocks
+
+    @staticmethod
+    def _extract_command(prompt_line: str) -> str:
+        split_pos = max(prompt_line.rfind('#'), prompt_line.rfind('$'))
+        if split_pos == -1:
+            return ""
+        return prompt_line[split_pos + 1:].strip()
@@ -25,7 +25,34 @@ class SCM:
             "follow_cd": False,  # bool
             "language": "system",  # system, EN, CN, JP, RU
             "default_view": "icon",  # icon or details
-            "max_concurrent_transfers": 10,  # int 1-10
+            "max_concurrent_transfers": 10,  # int 1-10 per host
+            "transfer_progress_hz": 10,  # int Transfer progress UI updates per second (1-60)
+            "metadata_workers": 3,  # int Concurrent remote metadata queries (listing, stat, file type) per tab
+            "listing_cache_ttl": 30,  # int Seconds a cached directory listing is trusted without relisting (0 = no cache)
+            "transfer_global_limit": 16,  # int Concurrent transfers of all sessions together
+            # int Bandwidth caps in KB/s, all sessions / per host (0 = unlimited)
+            "transfer_rate_limit_kb": 0,
+            "transfer_host_rate_limit_kb": 0,
+            "sftp_window": 64,  # int SFTP read/write requests kept in flight per file
+            "sftp_block_size": 32768,  # int bytes per SFTP request (4096-262144)
+            "transfer_io_buffer_kb": 1024,  # int Local file write buffer of transfers, 64 KB aligned
+            # int Directories with at least this many files, averaging at most
+            # tar_stream_max_avg_kb each, are transferred as one tar stream (0 = never)
+            "tar_stream_min_files": 50,
+            "tar_stream_max_avg_kb": 512,
+            # bool Journal transfers of files >= transfer_resume_min_mb so they continue
+            # after a disconnect or restart; transfer_verify_chunks md5-checks the last chunk
+            "transfer_resume": True,
+            "transfer_resume_min_mb": 8,
+            "transfer_verify_chunks": False,
+            # int Downloads >= multistream_min_mb are fetched as this many parallel
+            # SFTP streams (1 = off); multistream_verify compares md5 afterwards
+            "multistream_count": 4,
+            "multistream_min_mb": 64,
+            "multistream_verify": True,
+            # bool Directory sync: md5-compare files whose only difference is the mtime
+            "sync_compare_hash": False,
+            "delta_upload": True,  # bool Re-upload edited files as a block delta (rsync algorithm)
             "compress_upload": False,  # bool compress_upload
             "splitter_lr_ratio": [0.2, 0.8],  # proportion
             "splitter_tb_ratio": [0.6, 0.4],  # proportion
@@ -47,6 +74,21 @@ class SCM:
             "right_panel_ai_chat": True,
             "file_tree_single_click": False,
             "update_channel": "none",
+            # int Seconds an unused pooled SSH connection is kept open
+            "ssh_pool_idle_timeout": 60,
+            # int Milliseconds terminal output is coalesced before it is emitted
+            "terminal_flush_interval_ms": 5,
+            # bool Drop intermediate terminal output when the view falls behind
+            "terminal_fast_forward": False,
+            # int Lines of plain-text scrollback kept per terminal for AI capture
+            "terminal_scrollback_lines": 5000,
+            # bool Use the python /proc agent for monitoring when python3 exists
+            "monitor_agent": True,
+            # int Seconds between resource samples of the visible tab / of background tabs
+            "monitor_interval": 2,
+            "monitor_background_interval": 30,
+            # bool Keep the resource history of each host in an mmap'd file across restarts
+            "metrics_persist": False,
             "account": {"user": "Guest", "avatar_url": r"resource\icons\guest.png", "combo": "", "qid": "", "email": ""}
         }
         self.config_path = config_dir / "setting-config.json"
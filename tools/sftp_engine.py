@@ -0,0 +1,543 @@
+# sftp_engine.py
+import hashlib
+import mmap
+import os
+import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+import paramiko
+
+from tools.setting_config import SCM
+from tools.transfer_journal import ChunkHasher, TransferJournal, file_chunk_md5
+
+DEFAULT_WINDOW = 64
+DEFAULT_BLOCK_SIZE = 32768
+MAX_BLOCK_SIZE = 256 * 1024
+DEFAULT_RESUME_MIN_MB = 8
+DEFAULT_STREAMS = 4
+DEFAULT_MULTISTREAM_MIN_MB = 64
+DEFAULT_IO_BUFFER_KB = 1024
+IO_ALIGN = 64 * 1024
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+def preallocate(fileobj, size: int):
+    """
+    Reserve `size` bytes for a file being written: posix_fallocate where the
+    OS and filesystem support it (no fragmentation, early ENOSPC), otherwise
+    extend it with truncate.
+    """
+    if size <= 0:
+        return
+    fileobj.flush()
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fileobj.fileno(), 0, size)
+            return
+        except OSError:
+            pass  # e.g. not supported by the filesystem
+    if os.fstat(fileobj.fileno()).st_size < size:
+        fileobj.truncate(size)
+
+
+@contextmanager
+def mapped_file(path: str):
+    """
+    memoryview of a whole local file through mmap. Written to an unbuffered
+    SFTP file, a slice is copied once, into the outgoing SFTP packet.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        try:
+            yield view
+        finally:
+            view.release()
+            try:
+                mm.close()
+            except BufferError:
+                # a slice is still referenced (e.g. by a traceback); the map
+                # is closed when it gets collected
+                pass
+
+
+class PipelinedSFTP:
+    """
+    SFTP file transfer that keeps up to `window` requests of `block_size`
+    bytes in flight per file instead of waiting for each reply.
+
+    sftp.get / sftp.put only get a fraction of the link on high latency
+    connections: throughput is roughly window * block_size / RTT, so with
+    the defaults (64 x 32 KB) a 150 ms link can still carry ~14 MB/s.
+    Downloads use paramiko's prefetch, uploads pipelined writes whose
+    acknowledgements are collected once more than `window` are outstanding.
+
+    With `journal_host` set, files of at least `resume_min_size` bytes keep a
+    TransferJournal and continue from the last confirmed offset when the
+    same transfer is started again.
+
+    Downloads of at least `multistream_min_size` bytes are split into
+    `streams` byte ranges fetched over separate SFTP sessions at once, since
+    a single channel is capped by its flow control window.
+
+    `throttle(nbytes)` is called for every block moved (bandwidth caps and
+    pause of the TransferScheduler); it may block.
+
+    Local I/O avoids the Python copy loop becoming the bottleneck on fast
+    links: sources are mmapped and their memoryview slices written to an
+    unbuffered remote file (copied only into the SFTP packet, not through
+    read() and a write buffer first), targets are preallocated and written
+    through an `io_buffer` sized (IO_ALIGN aligned) buffer instead of one
+    write() per SFTP block.
+    """
+
+    def __init__(self, sftp: paramiko.SFTPClient, window: Optional[int] = None,
+                 block_size: Optional[int] = None,
+                 is_stopped: Optional[Callable[[], bool]] = None,
+                 journal_host: Optional[str] = None,
+                 resume_min_size: int = DEFAULT_RESUME_MIN_MB * 1024 * 1024,
+                 verify_chunks: bool = False,
+                 streams: int = 1,
+                 multistream_min_size: int = DEFAULT_MULTISTREAM_MIN_MB * 1024 * 1024,
+                 multistream_verify: bool = True,
+                 throttle: Optional[Callable[[int], None]] = None,
+                 io_buffer: Optional[int] = None):
+        if window is None or block_size is None or io_buffer is None:
+            config = SCM().read_config()
+            window = window or config.get("sftp_window", DEFAULT_WINDOW)
+            block_size = block_size or config.get(
+                "sftp_block_size", DEFAULT_BLOCK_SIZE)
+            io_buffer = io_buffer or config.get(
+                "transfer_io_buffer_kb", DEFAULT_IO_BUFFER_KB) * 1024
+        self.sftp = sftp
+        self.window = max(1, int(window))
+        self.block_size = max(4096, min(int(block_size), MAX_BLOCK_SIZE))
+        self.is_stopped = is_stopped or (lambda: False)
+        self.journal_host = journal_host
+        self.resume_min_size = resume_min_size
+        self.verify_chunks = verify_chunks
+        self.streams = max(1, int(streams))
+        self.multistream_min_size = multistream_min_size
+        self.multistream_verify = multistream_verify
+        self.throttle = throttle or (lambda nbytes: None)
+        self.io_buffer = max(IO_ALIGN, -(-int(io_buffer) // IO_ALIGN) * IO_ALIGN)
+
+    def _check_stopped(self):
+        if self.is_stopped():
+            raise TransferCancelled("Transfer was cancelled by user.")
+
+    def _open_journal(self, action, local_path, remote_path, size, mtime) -> Optional[TransferJournal]:
+        if not self.journal_host or size < self.resume_min_size:
+            return None
+        return TransferJournal.open(self.journal_host, action, local_path, remote_path,
+                                    size, int(mtime or 0), verify=self.verify_chunks)
+
+    # ---------------------------
+    # Download
+    # ---------------------------
+    def get(self, remote_path: str, local_path: str, callback=None) -> int:
+        """Download remote_path to local_path, callback(bytes_so_far, total)."""
+        attr = self.sftp.stat(remote_path)
+        size = attr.st_size or 0
+        journal = self._open_journal(
+            "download", local_path, remote_path, size, attr.st_mtime)
+        try:
+            if self.streams > 1 and size >= self.multistream_min_size:
+                return self._get_multistream(remote_path, local_path, size, journal, callback)
+            return self._get_sequential(remote_path, local_path, size, journal, callback)
+        finally:
+            if journal:
+                journal.release()
+
+    def _get_sequential(self, remote_path: str, local_path: str, size: int,
+                        journal: Optional[TransferJournal], callback=None) -> int:
+        offset = self._download_resume_offset(
+            journal, local_path) if journal else 0
+        hasher = ChunkHasher(journal, offset) if journal and journal.verify else None
+        transferred = offset
+        with self.sftp.open(remote_path, "rb") as fr:
+            fr.MAX_REQUEST_SIZE = self.block_size
+            if offset:
+                fr.seek(offset)
+            if size > offset:
+                # prefetch starts at the current position
+                try:
+                    fr.prefetch(size, max_concurrent_requests=self.window)
+                except TypeError:
+                    # paramiko < 3.3 has no request limit, prefetches everything
+                    fr.prefetch(size)
+            with open(local_path, "r+b" if offset else "wb", buffering=self.io_buffer) as fl:
+                if offset:
+                    fl.seek(offset)
+                    fl.truncate()
+                preallocate(fl, size)
+                try:
+                    while True:
+                        self._check_stopped()
+                        data = fr.read(self.block_size)
+                        if not data:
+                            break
+                        self.throttle(len(data))
+                        fl.write(data)
+                        transferred += len(data)
+                        if journal:
+                            if hasher:
+                                hasher.feed(data)
+                            journal.confirm(transferred, fl.flush)
+                        if callback:
+                            callback(transferred, size)
+                finally:
+                    if transferred < size:
+                        # no zero filled tail that looks like a complete file
+                        fl.truncate(transferred)
+        if transferred != size:
+            raise IOError(
+                f"size mismatch in get! {transferred} != {size}")
+        if journal:
+            journal.discard()
+        return transferred
+
+    def _get_multistream(self, remote_path: str, local_path: str, size: int,
+                         journal: Optional[TransferJournal], callback=None) -> int:
+        """
+        Fetch [0, size) as `streams` ranges in parallel, each over its own SFTP
+        session, writing at the range offset of a preallocated local file.
+        """
+        if journal and os.path.exists(local_path) and os.path.getsize(local_path) == size:
+            todo = journal.missing_ranges()
+        else:
+            todo = [(0, size)]
+            if journal:
+                journal.reset(0)
+            with open(local_path, "wb") as fl:
+                preallocate(fl, size)
+        ranges = self._split_ranges(todo, self.streams)
+        done = [size - sum(e - s for s, e in todo)]
+        lock = threading.Lock()
+        failed = threading.Event()
+        if done[0]:
+            print(f"⏩ 从已完成的 {done[0]} 字节继续多路下载 {local_path}")
+
+        def progress(n):
+            with lock:
+                done[0] += n
+                total = done[0]
+            if callback:
+                callback(total, size)
+
+        # open range files: a journal save covers ranges written by every thread
+        files = set()
+
+        def flush_all():
+            with lock:
+                for f in files:
+                    f.flush()
+
+        transport = self.sftp.get_channel().get_transport()
+
+        def fetch(start, end):
+            sftp = paramiko.SFTPClient.from_transport(transport)
+            try:
+                with sftp.open(remote_path, "rb") as fr, \
+                        open(local_path, "r+b", buffering=self.io_buffer) as fl:
+                    fr.MAX_REQUEST_SIZE = self.block_size
+                    fr.seek(start)
+                    fl.seek(start)
+                    try:
+                        fr.prefetch(end, max_concurrent_requests=self.window)
+                    except TypeError:
+                        fr.prefetch(end)
+                    with lock:
+                        files.add(fl)
+                    try:
+                        pos = start
+                        while pos < end:
+                            if failed.is_set():
+                                return
+                            self._check_stopped()
+                            data = fr.read(min(self.block_size, end - pos))
+                            if not data:
+                                raise IOError(
+                                    f"unexpected end of {remote_path} at {pos}")
+                            self.throttle(len(data))
+                            fl.write(data)
+                            if journal:
+                                # written out only when the journal is about to record it
+                                journal.add_range(pos, pos + len(data), before_save=flush_all)
+                            pos += len(data)
+                            progress(len(data))
+                    finally:
+                        with lock:
+                            files.discard(fl)
+            except Exception:
+                failed.set()
+                raise
+            finally:
+                sftp.close()
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges) or 1,
+                                    thread_name_prefix="sftp-range") as pool:
+                futures = [pool.submit(fetch, s, e) for s, e in ranges]
+                for future in futures:
+                    future.result()
+        except BaseException:
+            if not journal:
+                # preallocated with holes: nothing records which ranges are
+                # missing, so don't leave a file that looks complete
+                try:
+                    os.remove(local_path)
+                except OSError:
+                    pass
+            raise
+
+        if os.path.getsize(local_path) != size:
+            raise IOError(
+                f"size mismatch in get! {os.path.getsize(local_path)} != {size}")
+        if self.multistream_verify:
+            self._verify_md5(remote_path, local_path)
+        if journal:
+            journal.discard()
+        return size
+
+    @staticmethod
+    def _split_ranges(todo, streams: int, align: int = 1024 * 1024):
+        """Cut the missing ranges into about `streams` pieces of similar size."""
+        total = sum(e - s for s, e in todo)
+        piece = max(align, -(-total // streams // align) * align)
+        result = []
+        for start, end in todo:
+            while start < end:
+                result.append((start, min(end, start + piece)))
+                start += piece
+        return result
+
+    def _verify_md5(self, remote_path: str, local_path: str):
+        """Compare md5 of the reassembled file with the remote one (if md5sum exists)."""
+        transport = self.sftp.get_channel().get_transport()
+        channel = transport.open_session()
+        remote_md5 = None
+        try:
+            channel.exec_command(
+                f"md5sum {shlex.quote(remote_path)} 2>/dev/null")
+            out = channel.makefile("rb").read().decode(errors="ignore").split()
+            remote_md5 = out[0] if out else None
+        finally:
+            channel.close()
+        if not remote_md5:
+            return
+        md5 = hashlib.md5()
+        with open(local_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(block)
+        if md5.hexdigest() != remote_md5:
+            raise IOError(
+                f"checksum mismatch after multi-stream download of {remote_path}")
+
+    def _download_resume_offset(self, journal: TransferJournal, local_path: str) -> int:
+        offset = journal.resume_offset()
+        if offset and (not os.path.exists(local_path) or os.path.getsize(local_path) < offset):
+            offset = 0
+        if offset and journal.verify:
+            index = offset // journal.chunk_size - 1
+            if file_chunk_md5(local_path, index, journal.chunk_size) != journal.chunk_hash(index):
+                print(f"⚠️ 本地分块校验失败, 重新下载: {local_path}")
+                offset = 0
+        if offset:
+            print(f"⏩ 从 {offset} 字节处继续下载 {local_path}")
+        journal.reset(offset)
+        return offset
+
+    # ---------------------------
+    # Upload
+    # ---------------------------
+    def put(self, local_path: str, remote_path: str, callback=None) -> int:
+        """Upload local_path to remote_path, callback(bytes_so_far, total)."""
+        size = os.path.getsize(local_path)
+        journal = self._open_journal(
+            "upload", local_path, remote_path, size, os.path.getmtime(local_path))
+        try:
+            return self._put(local_path, remote_path, size, journal, callback)
+        finally:
+            if journal:
+                journal.release()
+
+    def _put(self, local_path: str, remote_path: str, size: int,
+             journal: Optional[TransferJournal], callback=None) -> int:
+        offset = self._upload_resume_offset(
+            journal, remote_path) if journal else 0
+        hasher = ChunkHasher(journal, offset) if journal and journal.verify else None
+        transferred = offset
+        # unbuffered: every write() is an SFTP request right away, so nothing
+        # written sits in a local buffer outside the _reqs counted below
+        with mapped_file(local_path) as source, \
+                self.sftp.open(remote_path, "r+b" if offset else "wb", bufsize=0) as fw:
+            fw.MAX_REQUEST_SIZE = self.block_size
+            fw.set_pipelined(True)
+            if offset:
+                fw.seek(offset)
+            while transferred < size:
+                self._check_stopped()
+                data = source[transferred:transferred + self.block_size]
+                if not data:
+                    raise IOError(f"{local_path} shrank during upload")
+                self.throttle(len(data))
+                fw.write(data)
+                transferred += len(data)
+                self._limit_in_flight(fw)
+                if journal:
+                    if hasher:
+                        hasher.feed(data)
+                    # every request still pending is at most one block
+                    pending = len(getattr(fw, "_reqs", ()))
+                    journal.confirm(
+                        max(offset, transferred - pending * self.block_size))
+                if callback:
+                    callback(transferred, size)
+        # closing the file waited for every outstanding write
+        attr = self.sftp.stat(remote_path)
+        if attr.st_size > size:
+            # resumed over a longer stale file
+            self.sftp.truncate(remote_path, size)
+            attr = self.sftp.stat(remote_path)
+        if attr.st_size != size:
+            raise IOError(
+                f"size mismatch in put!  {attr.st_size} != {size}")
+        if journal:
+            journal.discard()
+        return transferred
+
+    def _upload_resume_offset(self, journal: TransferJournal, remote_path: str) -> int:
+        offset = journal.resume_offset()
+        if offset:
+            try:
+                if self.sftp.stat(remote_path).st_size < offset:
+                    offset = 0
+            except IOError:
+                offset = 0
+        if offset and journal.verify:
+            index = offset // journal.chunk_size - 1
+            if self._remote_chunk_md5(remote_path, index, journal.chunk_size) != journal.chunk_hash(index):
+                print(f"⚠️ 远程分块校验失败, 重新上传: {remote_path}")
+                offset = 0
+        if offset:
+            print(f"⏩ 从 {offset} 字节处继续上传 {remote_path}")
+        journal.reset(offset)
+        return offset
+
+    def _remote_chunk_md5(self, remote_path: str, index: int, chunk_size: int) -> Optional[str]:
+        transport = self.sftp.get_channel().get_transport()
+        channel = transport.open_session()
+        try:
+            channel.exec_command(
+                f"dd if={shlex.quote(remote_path)} bs={chunk_size} skip={index} count=1 "
+                f"2>/dev/null | md5sum")
+            out = channel.makefile("rb").read().decode(errors="ignore").split()
+        finally:
+            channel.close()
+        return out[0] if out else None
+
+    def _limit_in_flight(self, fw: paramiko.SFTPFile):
+        """Collect write acks until at most `window` requests are pending."""
+        reqs = getattr(fw, "_reqs", None)
+        if reqs is None:
+            return
+        while len(reqs) > self.window:
+            # raises IOError/SFTPError for a failed write
+            fw.sftp._read_response(reqs.popleft())
+
+
+class SFTPSessionPool:
+    """
+    Long lived SFTP sessions of one SSH connection, one per transfer thread.
+
+    Opening the SFTP subsystem costs a channel open plus the version
+    handshake; a worker thread now pays it once and reuses the session for
+    every TransferWorker it runs afterwards. Sessions that were closed (e.g.
+    by cancelling a transfer) are replaced on the next get().
+    """
+
+    def __init__(self, conn: paramiko.SSHClient):
+        self.conn = conn
+        config = SCM().read_config()
+        self.window = config.get("sftp_window", DEFAULT_WINDOW)
+        self.block_size = config.get("sftp_block_size", DEFAULT_BLOCK_SIZE)
+        self.resume = config.get("transfer_resume", True)
+        self.resume_min_size = config.get(
+            "transfer_resume_min_mb", DEFAULT_RESUME_MIN_MB) * 1024 * 1024
+        self.verify_chunks = config.get("transfer_verify_chunks", False)
+        self.streams = config.get("multistream_count", DEFAULT_STREAMS)
+        self.multistream_min_size = config.get(
+            "multistream_min_mb", DEFAULT_MULTISTREAM_MIN_MB) * 1024 * 1024
+        self.multistream_verify = config.get("multistream_verify", True)
+        self.io_buffer = config.get(
+            "transfer_io_buffer_kb", DEFAULT_IO_BUFFER_KB) * 1024
+        self._local = threading.local()
+        self._sessions: List[paramiko.SFTPClient] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _usable(sftp: Optional[paramiko.SFTPClient]) -> bool:
+        if sftp is None:
+            return False
+        channel = sftp.get_channel()
+        return channel is not None and not channel.closed
+
+    def get(self) -> paramiko.SFTPClient:
+        """SFTP session of the calling thread, opened on first use."""
+        if self._closed:
+            raise IOError("SFTP session pool is closed")
+        sftp = getattr(self._local, "sftp", None)
+        if self._usable(sftp):
+            return sftp
+        self.discard()
+        sftp = self.conn.open_sftp()
+        self._local.sftp = sftp
+        with self._lock:
+            self._sessions.append(sftp)
+        return sftp
+
+    def engine(self, sftp: paramiko.SFTPClient, is_stopped=None, journal_host=None, throttle=None) -> PipelinedSFTP:
+        return PipelinedSFTP(sftp, self.window, self.block_size, is_stopped,
+                             io_buffer=self.io_buffer,
+                             journal_host=journal_host if self.resume else None,
+                             resume_min_size=self.resume_min_size,
+                             verify_chunks=self.verify_chunks,
+                             streams=self.streams,
+                             multistream_min_size=self.multistream_min_size,
+                             multistream_verify=self.multistream_verify,
+                             throttle=throttle)
+
+    def discard(self):
+        """Close the calling thread's session (after an error mid-transfer)."""
+        sftp = getattr(self._local, "sftp", None)
+        self._local.sftp = None
+        if sftp is None:
+            return
+        with self._lock:
+            if sftp in self._sessions:
+                self._sessions.remove(sftp)
+        try:
+            sftp.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        self._closed = True
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for sftp in sessions:
+            try:
+                sftp.close()
+            except Exception:
+                pass
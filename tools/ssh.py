@@ -1,19 +1,104 @@
-import os
 import re
-import json
 import traceback
 import paramiko
 from typing import Dict, List
 from PyQt5.QtCore import QThread, QTimer, pyqtSignal
-from tools.atool import resource_path
+from tools.setting_config import SCM
 import binascii
 import socks
 import socket
+import select
+import threading
+from tools.connection_pool import SSHConnectionPool
+from tools.connection_bootstrap import ConnectionBootstrap, REMOTE_PROC_PATH
+from tools.telemetry import (TelemetryDecoder, subscribe_command,
+                             interval_command, keyframe_command)
 import uuid
 import time
 from tools.session_manager import Session
 
 
+class ChannelReader(threading.Thread):
+    """
+    Blocks on a paramiko channel (select) instead of polling it, drains every
+    byte that is available and hands coalesced chunks to `on_data`.
+
+    A chunk is flushed once `flush_interval` seconds passed since its first byte
+    arrived or once it grew past `max_chunk` bytes.
+    """
+
+    def __init__(self, channel, on_data, on_closed=None, on_idle=None, flush_interval=0.005,
+                 max_chunk=256 * 1024, read_size=64 * 1024, idle_timeout=0.5, name=None):
+        super().__init__(name=name, daemon=True)
+        self.channel = channel
+        self.on_data = on_data
+        self.on_closed = on_closed
+        self.on_idle = on_idle
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_chunk = max_chunk
+        self.read_size = read_size
+        self.idle_timeout = idle_timeout
+        self._stop_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._resume_event.set()
+
+    def pause(self):
+        """Stop reading; the SSH window fills up and the remote side blocks."""
+        self._resume_event.clear()
+
+    def resume(self):
+        self._resume_event.set()
+
+    def run(self):
+        chan = self.channel
+        pending = bytearray()
+        first_at = None
+        try:
+            while not self._stop_event.is_set():
+                if not pending and not self._resume_event.is_set():
+                    self._resume_event.wait(self.idle_timeout)
+                    continue
+                if pending:
+                    timeout = max(0.0, self.flush_interval -
+                                  (time.monotonic() - first_at))
+                else:
+                    timeout = self.idle_timeout
+                readable, _, _ = select.select([chan], [], [], timeout)
+                if readable:
+                    data = chan.recv(self.read_size)
+                    if not data:
+                        break  # EOF, channel closed by the remote side
+                    if first_at is None:
+                        first_at = time.monotonic()
+                    pending += data
+                    # Drain whatever paramiko already buffered
+                    while len(pending) < self.max_chunk and chan.recv_ready():
+                        data = chan.recv(self.read_size)
+                        if not data:
+                            break
+                        pending += data
+                elif not pending and self.on_idle:
+                    self.on_idle()
+
+                if pending and (len(pending) >= self.max_chunk or
+                                time.monotonic() - first_at >= self.flush_interval):
+                    self.on_data(bytes(pending))
+                    pending.clear()
+                    first_at = None
+        except (OSError, ValueError, EOFError) as e:
+            print(f"ChannelReader({self.name}) stopped: {e}")
+        except Exception as e:
+            print(f"ChannelReader({self.name}) error: {e}")
+        if pending:
+            self.on_data(bytes(pending))
+        if not self._stop_event.is_set() and self.on_closed:
+            self.on_closed()
+
+
 class SSHWorker(QThread):
     result_ready = pyqtSignal(bytes)
     connected = pyqtSignal(bool, str)
@@ -23,12 +108,16 @@ class SSHWorker(QThread):
     auth_error = pyqtSignal(str)
     # host_key , processes_md5 key
     key_verification = pyqtSignal(str, str)
-    stop_timer_sig = pyqtSignal()
     command_output_ready = pyqtSignal(str, int)
     force_complete = pyqtSignal(str)
+    # phase -> milliseconds
+    bootstrap_finished = pyqtSignal(dict)
+
+    EARLY_OUTPUT_LIMIT = 1024 * 1024
 
     def __init__(self, session_info, parent=None, for_file=False, jumpbox=False):
         super().__init__(parent)
+        self.session_info = session_info
         self.host = session_info.host
         self.user = session_info.username
         self.port = session_info.port
@@ -46,9 +135,22 @@ class SSHWorker(QThread):
         self.conn = None
         self.channel = None
         self.resources_channel = None
-        self.timer = None
+        self.main_reader = None
+        self.resources_reader = None
+        self.bootstrap = None
+        self.remote_proc = REMOTE_PROC_PATH
         self.for_file = for_file
-        self._buffer = b""  # Storing incomplete output data
+        # Terminal output received before attach_output()
+        self._early_output = bytearray()
+        self._early_lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self._first_output_at = None
+        self.telemetry = TelemetryDecoder()  # resources channel frames
+        # Monitor subscription: wanted by the UI / last sent to the remote side
+        self._monitor_lock = threading.Lock()
+        self._monitor_running = False
+        self._monitor_wanted = None
+        self._monitor_sent = None
 
         # File tree structure
         self.file_tree: Dict = {}
@@ -96,214 +198,81 @@ class SSHWorker(QThread):
             self._process_capture_buffer(force=True)
 
     def run(self):
+        self._started_at = time.perf_counter()
         print(f"🆕 创建SSHWorker实例，目标: {self.user}@{self.host}:{self.port}")
         try:
             self.force_complete.connect(self.handle_force_complete)
-            self.conn = paramiko.SSHClient()
-            self.conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-            sock = self._create_socket()
-
-            if isinstance(self.jumpbox, Session):  # jumbox maybe is None:str
-                self.jumpbox_ssh = paramiko.SSHClient()
-                self.jumpbox_ssh.set_missing_host_key_policy(
-                    paramiko.AutoAddPolicy())
-
-                host = self.jumpbox.host
-                user = self.jumpbox.username
-                port = self.jumpbox.port
-                password = self.jumpbox.password
-                auth_type = self.jumpbox.auth_type
-                key_path = self.jumpbox.key_path
-
-                print(f"🔗 连接到跳板机: {user}@{host}:{port}")
-
-                # 连接到跳板机
-                if auth_type == "password":
-                    self.jumpbox_ssh.connect(
-                        host, port, user, password, timeout=10, sock=sock)
-                else:
-                    self.jumpbox_ssh.connect(
-                        host, port, user, key_filename=key_path, timeout=10, sock=sock)
-
-                print("✅ 跳板机连接成功")
-
-                print(f"🔄 创建到目标服务器 {self.host}:{self.port} 的隧道")
-                jumpbox_transport = self.jumpbox_ssh.get_transport()
-                dest_addr = (self.host, self.port)
-                jumpbox_channel = jumpbox_transport.open_channel(
-                    kind="direct-tcpip",
-                    dest_addr=dest_addr,
-                    src_addr=(host, port)
-                )
-
-                print("✅ 隧道创建成功")
-
-                print(f"🔗 通过隧道连接到目标服务器: {self.user}@{self.host}:{self.port}")
-                try:
-                    if self.auth_type == "password":
-                        self.conn.connect(
-                            self.host,
-                            username=self.user,
-                            password=self.password,
-                            timeout=10,
-                            port=self.port,
-                            sock=jumpbox_channel
-                        )
-                    else:
-                        self.conn.connect(
-                            self.host,
-                            username=self.user,
-                            key_filename=self.key_path,
-                            timeout=10,
-                            port=self.port,
-                            sock=jumpbox_channel
-                        )
-                    print("✅ 目标服务器连接成功")
-
-                except paramiko.AuthenticationException as e:
-                    error_msg = self.tr(
-                        f"Target server authentication failed: {e}")
-                    self.auth_error.emit(error_msg)
-                    self._cleanup()
-                    return
-                except (socket.timeout, paramiko.SSHException) as e:
-                    error_msg = self.tr(
-                        f"Target server connection failed: {e}")
-                    self.error_occurred.emit(error_msg)
-                    self._cleanup()
-                    return
-
-            else:
-                print(
-                    f"🔗 Connect directly to the server: {self.user}@{self.host}:{self.port}")
-                try:
-                    if self.auth_type == "password":
-                        self.conn.connect(
-                            self.host,
-                            username=self.user,
-                            password=self.password,
-                            timeout=10,
-                            port=self.port,
-                            sock=sock
-                        )
-                    else:
-                        self.conn.connect(
-                            self.host,
-                            username=self.user,
-                            key_filename=self.key_path,
-                            timeout=10,
-                            port=self.port,
-                            sock=sock
-                        )
-                    print("✅ Direct connection successful")
-
-                except paramiko.AuthenticationException as e:
-                    error_msg = self.tr(f"Authentication failed: {e}")
-                    self.auth_error.emit(error_msg)
-                    self._cleanup()
-                    return
-                except (socket.timeout, paramiko.SSHException) as e:
-                    error_msg = self.tr(f"Connection failed: {e}")
-                    self.error_occurred.emit(error_msg)
-                    self._cleanup()
-                    return
+            print(
+                f"🔗 Acquire pooled connection: {self.user}@{self.host}:{self.port}")
+            try:
+                self.conn = SSHConnectionPool.instance().acquire(
+                    self.session_info, self.jumpbox)
+                print("✅ Connection ready")
+            except paramiko.AuthenticationException as e:
+                error_msg = self.tr(f"Authentication failed: {e}")
+                self.auth_error.emit(error_msg)
+                self._cleanup()
+                return
+            except (socket.timeout, paramiko.SSHException) as e:
+                error_msg = self.tr(f"Connection failed: {e}")
+                self.error_occurred.emit(error_msg)
+                self._cleanup()
+                return
 
             transport = self.conn.get_transport()
-            transport.set_keepalive(30)
             self.channel = transport.open_session()
             self.channel.get_pty(term='xterm', width=120, height=30)
             self.channel.invoke_shell()
-
-            self.resources_channel = transport.open_session()
-            self.resources_channel.get_pty(term='xterm', width=120, height=30)
-            self.resources_channel.invoke_shell()
-
-            time.sleep(1)
-            # ---------- resources handling ----------
-            try:
-                self.sftp = self.conn.open_sftp()
-                remote_dir = "./.ssh"
-                self.remote_proc = "./.ssh/processes.sh"
-                self.local_proc = resource_path(os.path.join(
-                    "resource", "processes.sh"))
-                # ensure remote .ssh dir exists
-                try:
-                    self.sftp.stat(remote_dir)
-                except IOError:
-                    try:
-                        self.sftp.mkdir(remote_dir, mode=0o700)
-                        print(f"创建远端目录 {remote_dir}")
-                    except Exception as e:
-                        print(f"无法创建远端目录 {remote_dir}: {e}")
-                if not os.path.exists(self.local_proc):
-                    err = f"本地 processes 文件不存在: {self.local_proc}"
-                    print(err)
-                    self.error_occurred.emit(err)
-                else:
-                    try:
-                        print(
-                            f"上传本地 {self.local_proc} 到远端 {self.remote_proc} ...")
-                        with open(self.local_proc, 'rb') as f:
-                            content = f.read()
-                        content = content.replace(b'\r\n', b'\n')
-                        import tempfile
-                        with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.sh') as tmp:
-                            tmp.write(content)
-                            tmp_path = tmp.name
-                        try:
-                            self.sftp.put(tmp_path, self.remote_proc)
-                            self.sftp.chmod(self.remote_proc, 0o755)
-                            print("✅ 上传并设置可执行成功")
-                        finally:
-                            try:
-                                os.unlink(tmp_path)
-                            except Exception:
-                                pass
-                    except Exception as e:
-                        tb = traceback.format_exc()
-                        err = f"上传 processes 失败: {e}\n{tb}"
-                        print(err)
-                        self.error_occurred.emit(err)
-                try:
-                    self.sftp.close()
-                    print("SFTP 连接已关闭")
-                except Exception:
-                    pass
-            except Exception as e:
-                tb = traceback.format_exc()
-                print(f"resources pre-check/upload 出错: {e}\n{tb}")
-                self.error_occurred.emit(
-                    f"resources pre-check/upload 出错: {e}")
+            # Start reading right away, output is held until the terminal attaches
+            self._start_main_reader()
             # ---------- main channel handling ----------
             cd_folder: str = self.ssh_default_path.replace("\\", "/")
             if "/" in cd_folder:
                 self.run_command(f"cd {cd_folder}")
             self.connected.emit(True, "Connect Success")
 
-            self.timer = QTimer()
-            self.stop_timer_sig.connect(self.timer.stop)
-            self.timer.timeout.connect(self._check_output)
-            self.timer.start(100)
-
-            md5 = self.get_remote_md5(self.remote_proc)
-            host_key = self.get_hostkey_fp_hex()
+            # Script deploy, md5, home dir, uid/gid maps and the monitor shell
+            # all run concurrently on the shared transport
+            use_agent = SCM().read_config().get("monitor_agent", True)
+            self.bootstrap = ConnectionBootstrap(
+                self.conn, self.session_info, use_agent=use_agent).run(
+                extra_phases={"resources_shell": self._open_resources_shell})
+            if "deploy" in self.bootstrap.errors:
+                err = f"resources pre-check/upload 出错: {self.bootstrap.errors['deploy']}"
+                print(err)
+                self.error_occurred.emit(err)
+            timings = dict(self.bootstrap.timings)
+            if self._first_output_at is not None:
+                timings["first_output"] = (
+                    self._first_output_at - self._started_at) * 1000
+            self.bootstrap_finished.emit(timings)
+
+            md5 = self.bootstrap.get("deploy")
+            host_key = self.bootstrap.get("host_key")
             self.key_verification.emit(md5, host_key)
-            script_path = self.remote_proc
-            check_cmd = f"test -x {script_path} && echo 'EXISTS' || echo 'NOT_FOUND'"
-            self.run_command(check_cmd, channel="resources")
-            if self.user == "root":
-                cmd = f'{script_path}'
-                print(f"Running without sudo as root: {cmd}")
-            else:
-                cmd = f'echo {self.password} | sudo -S bash {script_path}'
-                print(f"Running with sudo as non-root: {cmd}")
-            try:
-                self.run_command(cmd, channel="resources")
-                print(f"已启动远端 processes 可执行文件({script_path})")
-            except Exception as e:
-                print(f"启动 processes 失败：{e}")
-                self.error_occurred.emit(f"启动 processes 失败：{e}")
+
+            if self.resources_channel is not None:
+                self._start_resources_reader()
+                script_path = self.remote_proc
+                # python agent needs to be deployed, otherwise stay on the shell loop
+                script_args = "" if self.bootstrap.get(
+                    "deploy_agent") else " --shell"
+                check_cmd = f"test -x {script_path} && echo 'EXISTS' || echo 'NOT_FOUND'"
+                self.run_command(check_cmd, channel="resources")
+                if self.user == "root":
+                    cmd = f'{script_path}{script_args}'
+                    print(f"Running without sudo as root: {cmd}")
+                else:
+                    cmd = f'echo {self.password} | sudo -S bash {script_path}{script_args}'
+                    print(f"Running with sudo as non-root: {cmd}")
+                try:
+                    self.run_command(cmd, channel="resources")
+                    print(f"已启动远端 processes 可执行文件({script_path})")
+                    self._monitor_running = True
+                    self._apply_monitoring()
+                except Exception as e:
+                    print(f"启动 processes 失败：{e}")
+                    self.error_occurred.emit(f"启动 processes 失败：{e}")
 
             self.exec_()
             self._cleanup()
@@ -315,35 +284,6 @@ class SSHWorker(QThread):
             tb = traceback.format_exc()
             self.error_occurred.emit(f"{e}\n{tb}")
 
-    def _create_socket(self):
-        if self.proxy_type == 'None' or not self.proxy_host or not self.proxy_port:
-            return None
-        sock = socks.socksocket()
-        sock.settimeout(15)
-        proxy_type_map = {
-            'HTTP': socks.HTTP,
-            'SOCKS4': socks.SOCKS4,
-            'SOCKS5': socks.SOCKS5
-        }
-        proxy_type = proxy_type_map.get(self.proxy_type)
-        if not proxy_type:
-            return None
-        use_remote_dns = self.proxy_type in ['SOCKS4', 'SOCKS5']
-        sock.set_proxy(
-            proxy_type=proxy_type,
-            addr=self.proxy_host,
-            port=self.proxy_port,
-            rdns=use_remote_dns,
-            username=self.proxy_username if self.proxy_username else None,
-            password=self.proxy_password if self.proxy_password else None
-        )
-        try:
-            sock.connect((self.host, self.port))
-            return sock
-        except Exception as e:
-            self.error_occurred.emit(f"Proxy connection failed: {e}")
-            return None
-
     def disconnect_all_signals(self):
         signals = [
             self.result_ready,
@@ -352,7 +292,6 @@ class SSHWorker(QThread):
             self.sys_resource,
             self.file_tree_updated,
             self.key_verification,
-            self.stop_timer_sig,
         ]
         for sig in signals:
             try:
@@ -361,11 +300,9 @@ class SSHWorker(QThread):
                 pass
 
     def _cleanup(self):
-        try:
-            if hasattr(self, "stop_timer_sig"):
-                self.stop_timer_sig.emit()
-        except Exception:
-            pass
+        for reader in (self.main_reader, self.resources_reader):
+            if reader:
+                reader.stop()
         try:
             if hasattr(self, "completion_timer") and self.completion_timer:
                 self.completion_timer.stop()
@@ -378,13 +315,13 @@ class SSHWorker(QThread):
         except Exception:
             pass
         try:
-            if self.conn:
-                transport = self.conn.get_transport()
-                if transport:
-                    transport.set_keepalive(0)
-                self.conn.close()
+            if self.resources_channel:
+                self.resources_channel.close()
         except Exception:
             pass
+        # The transport is shared with the file manager, hand it back to the pool
+        conn, self.conn = self.conn, None
+        SSHConnectionPool.instance().release(conn)
         self.disconnect_all_signals()
         # try:
         #     signals = [
@@ -406,73 +343,120 @@ class SSHWorker(QThread):
         except Exception:
             pass
 
-    def _check_output(self):
-        try:
-            # 检查连接状态
-            if self.conn and self.conn.get_transport():
-                if not self.conn.get_transport().is_active():
-                    self.error_occurred.emit("SSH连接已断开")
-                    self.quit()
+    def _open_resources_shell(self):
+        self.resources_channel = self.conn.get_transport().open_session()
+        self.resources_channel.get_pty(term='xterm', width=120, height=30)
+        self.resources_channel.invoke_shell()
+        return True
+
+    def _start_main_reader(self):
+        config = SCM().read_config()
+        flush_interval = config.get("terminal_flush_interval_ms", 5) / 1000
+        self.main_reader = ChannelReader(
+            self.channel,
+            on_data=self._on_main_output,
+            on_closed=self._on_main_closed,
+            on_idle=self._check_connection,
+            flush_interval=flush_interval,
+            name=f"ssh-main-{self.host}")
+        self.main_reader.start()
+
+    def _start_resources_reader(self):
+        self.resources_reader = ChannelReader(
+            self.resources_channel,
+            on_data=self._on_resources_output,
+            on_closed=lambda: print("资源监控channel已关闭"),
+            # Telemetry frames are not latency sensitive, coalesce harder
+            flush_interval=0.05,
+            name=f"ssh-resources-{self.host}")
+        self.resources_reader.start()
+
+    def attach_output(self):
+        """
+        Called once a terminal listens to result_ready: replay the output that
+        arrived in the meantime (banner, first prompt) and stream from now on.
+        """
+        with self._early_lock:
+            early, self._early_output = bytes(self._early_output), None
+        if early:
+            self.result_ready.emit(early)
+
+    def _on_main_output(self, chunk: bytes):
+        if self._early_output is not None:
+            with self._early_lock:
+                if self._early_output is not None:
+                    if self._first_output_at is None:
+                        self._first_output_at = time.perf_counter()
+                        print(
+                            f"⏱️ first output after {(self._first_output_at - self._started_at) * 1000:.0f}ms")
+                    if len(self._early_output) < self.EARLY_OUTPUT_LIMIT:
+                        self._early_output += chunk
                     return
+        self.result_ready.emit(chunk)
+        if self.is_capturing:
+            self.capture_buffer += chunk
+            self._process_capture_buffer()
 
-            # 检查主channel
-            if self.channel:
-                if self.channel.recv_ready():
-                    chunk = self.channel.recv(4096)
-                    self.result_ready.emit(chunk)
-                    if self.is_capturing:
-                        self.capture_buffer += chunk
-                        self._process_capture_buffer()
-
-                if self.channel.closed or self.channel.exit_status_ready():
-                    while self.channel.recv_ready():
-                        chunk = self.channel.recv(4096)
-                        self.result_ready.emit(chunk)
-                        if self.is_capturing:
-                            self.capture_buffer += chunk
-                            self._process_capture_buffer()
-                    # 只有主channel关闭时才退出线程
-                    self.quit()
-
-            # 检查资源channel
-            if self.resources_channel:
-                if self.resources_channel.recv_ready():
-                    chunk = self.resources_channel.recv(4096)
-                    # 资源channel的数据专门用于系统资源处理
-                    self._buffer += chunk
-                    self._process_sys_resource_buffer()
-
-                if self.resources_channel.closed or self.resources_channel.exit_status_ready():
-                    while self.resources_channel.recv_ready():
-                        chunk = self.resources_channel.recv(4096)
-                        self._buffer += chunk
-                        self._process_sys_resource_buffer()
-                    # 资源channel关闭不影响主连接，只记录日志
-                    print("资源监控channel已关闭")
+    def pause_output(self):
+        """Backpressure from the terminal view: stop draining the main channel."""
+        if self.main_reader:
+            self.main_reader.pause()
 
+    def resume_output(self):
+        if self.main_reader:
+            self.main_reader.resume()
+
+    def _on_main_closed(self):
+        # 只有主channel关闭时才退出线程
+        self.quit()
+
+    def _on_resources_output(self, chunk: bytes):
+        # 资源channel的数据专门用于系统资源处理
+        self._process_sys_resource_buffer(chunk)
+
+    def _check_connection(self):
+        try:
+            transport = self.conn.get_transport() if self.conn else None
+            if transport and not transport.is_active():
+                self.error_occurred.emit("SSH连接已断开")
+                self.main_reader.stop()
+                self.quit()
         except Exception as e:
             self.error_occurred.emit(str(e))
 
-    def _process_sys_resource_buffer(self):
+    def set_monitoring(self, categories, interval: int):
+        """
+        Choose which telemetry categories the remote monitor collects
+        (see tools.telemetry.CATEGORIES) and its sampling interval in seconds.
+        Can be called before the monitor runs; it is applied once it starts.
+        """
+        with self._monitor_lock:
+            self._monitor_wanted = (frozenset(categories), int(interval))
+        self._apply_monitoring()
+
+    def _apply_monitoring(self):
+        with self._monitor_lock:
+            wanted = self._monitor_wanted
+            if not self._monitor_running or wanted is None or wanted == self._monitor_sent:
+                return
+            categories, interval = wanted
+            previous = self._monitor_sent
+            self._monitor_sent = wanted
+        payload = b""
+        if previous is None or previous[0] != categories:
+            payload += subscribe_command(categories)
+        if previous is None or previous[1] != interval:
+            payload += interval_command(interval)
+        self.run_command(payload, add_newline=False, channel="resources")
+
+    def _process_sys_resource_buffer(self, chunk: bytes):
         try:
-            text = self._buffer.decode(errors='ignore')
-            pattern = re.compile(r'///(SysInfo|Start)(.*?)End///', re.DOTALL)
-            match = pattern.search(text)
-            if match:
-                tag, payload = match.groups()
-                try:
-                    data = json.loads(payload.strip())
-                    if tag == "SysInfo":
-                        data = {"type": "sysinfo", **data}
-                    else:
-                        data = {"type": "info", **data}
-                    self.sys_resource.emit(data)
-                except Exception as e:
-                    print(f"Error processing system resource data: {e}")
-                    print("--- Failing payload ---")
-                    print(repr(payload.strip()))
-                last_end = match.end()
-                self._buffer = self._buffer[last_end:]
+            for data in self.telemetry.feed(chunk):
+                self.sys_resource.emit(data)
+            if self.telemetry.need_keyframe:
+                self.telemetry.need_keyframe = False
+                self.run_command(keyframe_command(),
+                                 add_newline=False, channel="resources")
         except Exception as e:
             print(f"Error in _process_sys_resource_buffer: {e}")
 
@@ -0,0 +1,254 @@
+# tar_stream.py
+import os
+import posixpath
+import shlex
+import tarfile
+import threading
+from typing import Callable, Optional, Tuple
+
+import paramiko
+
+from tools.sftp_engine import TransferCancelled
+
+BLOCK = tarfile.BLOCKSIZE
+STREAM_BUFSIZE = 64 * 1024
+
+
+def _tar_size(count: int, total_bytes: int) -> int:
+    """Approximate tar stream size: one header block per entry, padded data."""
+    return total_bytes + count * BLOCK * 2 + 2 * BLOCK
+
+
+def local_tree_stats(path: str) -> Tuple[int, int]:
+    """(file count, total bytes) of a local file or directory tree."""
+    if os.path.isfile(path):
+        return 1, os.path.getsize(path)
+    count = total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+                count += 1
+            except OSError:
+                pass
+    return count, total
+
+
+def remote_tree_stats(conn: paramiko.SSHClient, path: str, timeout: int = 30) -> Tuple[int, int]:
+    """(file count, total bytes) of a remote tree, in one exec round trip."""
+    cmd = (f"find {shlex.quote(path)} -type f -printf '%s\\n' 2>/dev/null | "
+           "awk '{n++; s+=$1} END {printf \"%d %d\\n\", n, s}'")
+    stdin, stdout, stderr = conn.exec_command(cmd, timeout=timeout)
+    parts = stdout.read().decode(errors="ignore").split()
+    if len(parts) != 2:
+        return 0, 0
+    return int(parts[0]), int(parts[1])
+
+
+def should_stream(count: int, total_bytes: int, config: dict) -> bool:
+    """Many small files: per-file SFTP round trips would dominate the transfer."""
+    min_files = config.get("tar_stream_min_files", 50)
+    max_avg_kb = config.get("tar_stream_max_avg_kb", 512)
+    if not min_files or count < min_files:
+        return False
+    return total_bytes / count <= max_avg_kb * 1024
+
+
+class _ChannelWriter:
+    """File-like sink for tarfile that sends into an exec channel and counts bytes."""
+
+    def __init__(self, channel: paramiko.Channel, on_bytes: Callable[[int], None],
+                 is_stopped: Callable[[], bool]):
+        self.channel = channel
+        self.on_bytes = on_bytes
+        self.is_stopped = is_stopped
+        self.written = 0
+
+    def write(self, data):
+        if self.is_stopped():
+            raise TransferCancelled("Transfer was cancelled by user.")
+        if self.channel.exit_status_ready():
+            raise IOError("remote tar exited early")
+        self.channel.sendall(data)
+        self.written += len(data)
+        self.on_bytes(self.written)
+        return len(data)
+
+
+class _ChannelReader:
+    """File-like source for tarfile reading a channel's stdout and counting bytes."""
+
+    def __init__(self, stdout: paramiko.ChannelFile, on_bytes: Callable[[int], None],
+                 is_stopped: Callable[[], bool]):
+        self.stdout = stdout
+        self.on_bytes = on_bytes
+        self.is_stopped = is_stopped
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        if self.is_stopped():
+            raise TransferCancelled("Transfer was cancelled by user.")
+        data = self.stdout.read(size)
+        self.read_bytes += len(data)
+        self.on_bytes(self.read_bytes)
+        return data
+
+
+def _progress(callback, expected: int):
+    """bytes streamed -> callback(percent, bytes, expected); 100 only once finished."""
+    last = [-1]
+
+    def report(done: int):
+        percent = min(99, int(done * 100 / expected)) if expected else 0
+        if percent != last[0]:
+            last[0] = percent
+            callback(percent, done, max(expected, done))
+    return report
+
+
+class _StderrDrain:
+    """
+    Reads a channel's stderr in the background, keeping the last `keep` bytes:
+    unread stderr uses up the channel window shared with the data stream, so
+    a chatty remote tar would otherwise stall the transfer.
+    """
+
+    def __init__(self, stderr: paramiko.ChannelFile, keep: int = 8192):
+        self.stderr = stderr
+        self.keep = keep
+        self.tail = b""
+        self._thread = threading.Thread(target=self._run, name="tar-stderr", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                data = self.stderr.read(4096)
+                if not data:
+                    break
+                self.tail = (self.tail + data)[-self.keep:]
+        except Exception:
+            pass
+
+    def text(self, timeout: float = 5) -> str:
+        self._thread.join(timeout)
+        return self.tail.decode(errors="ignore").strip()
+
+
+def _finish(channel: paramiko.Channel, errors: _StderrDrain):
+    status = channel.recv_exit_status()
+    if status != 0:
+        raise IOError(f"remote tar failed ({status}): {errors.text()}")
+
+
+def _inside(root: str, path: str) -> bool:
+    return os.path.commonpath([root, path]) == root
+
+
+def _check_member(member: tarfile.TarInfo, root: str):
+    """Refuse entries that would be written, or point, outside root (root is a realpath)."""
+    name = member.name
+    parts = name.replace("\\", "/").split("/")
+    if posixpath.isabs(name) or os.path.isabs(name) or os.path.splitdrive(name)[0] \
+            or ".." in parts:
+        raise IOError(f"unsafe path in remote archive: {name!r}")
+    target = os.path.realpath(os.path.join(root, name))
+    if not _inside(root, target):
+        raise IOError(f"remote archive entry leaves {root}: {name!r}")
+    if member.issym():
+        link = os.path.join(os.path.dirname(os.path.join(root, name)), member.linkname)
+    elif member.islnk():
+        link = os.path.join(root, member.linkname)
+    else:
+        return
+    if os.path.isabs(member.linkname) or not _inside(root, os.path.realpath(link)):
+        raise IOError(f"remote archive link leaves {root}: {name!r} -> {member.linkname!r}")
+
+
+def _extract_checked(tf: tarfile.TarFile, local_dir: str):
+    """extractall for Pythons without tarfile.data_filter: checks every member first."""
+    root = os.path.realpath(local_dir)
+    directories = []
+    for member in tf:
+        _check_member(member, root)
+        if member.isdev():
+            continue
+        # no setuid/setgid/sticky bits from the remote side
+        member.mode &= 0o777
+        if member.isdir():
+            # like extractall: writable until its content is in, attributes last
+            directories.append(member)
+            tf.extract(member, local_dir, set_attrs=False)
+        else:
+            tf.extract(member, local_dir)
+    for member in reversed(directories):
+        path = os.path.join(local_dir, member.name)
+        try:
+            os.chmod(path, member.mode)
+            os.utime(path, (member.mtime, member.mtime))
+        except OSError:
+            pass
+
+
+def upload_tar_stream(conn: paramiko.SSHClient, local_path: str, remote_dir: str,
+                      callback: Optional[Callable[[int, int, int], None]] = None,
+                      is_stopped: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Stream local_path (file or directory) into `tar -x` under remote_dir,
+    without an archive on either side. Returns bytes streamed.
+    """
+    is_stopped = is_stopped or (lambda: False)
+    count, total = local_tree_stats(local_path)
+    report = _progress(callback or (lambda *a: None), _tar_size(count, total))
+    target = shlex.quote(remote_dir)
+    stdin, stdout, stderr = conn.exec_command(
+        f"mkdir -p {target} && tar -xf - --no-same-owner -C {target}")
+    channel = stdin.channel
+    errors = _StderrDrain(stderr)
+    writer = _ChannelWriter(channel, report, is_stopped)
+    try:
+        with tarfile.open(fileobj=writer, mode="w|", bufsize=STREAM_BUFSIZE) as tf:
+            tf.add(local_path, arcname=os.path.basename(local_path.rstrip("/\\")))
+        channel.shutdown_write()
+        _finish(channel, errors)
+    except Exception:
+        channel.close()
+        raise
+    if callback:
+        callback(100, writer.written, writer.written)
+    return writer.written
+
+
+def download_tar_stream(conn: paramiko.SSHClient, remote_path: str, local_dir: str,
+                        callback: Optional[Callable[[int, int, int], None]] = None,
+                        is_stopped: Optional[Callable[[], bool]] = None) -> str:
+    """
+    Stream remote_path out of `tar -c` and extract it into local_dir as it
+    arrives. Returns the local path of the extracted item.
+    """
+    is_stopped = is_stopped or (lambda: False)
+    remote_path = remote_path.rstrip("/") or "/"
+    parent, name = posixpath.split(remote_path)
+    count, total = remote_tree_stats(conn, remote_path)
+    report = _progress(callback or (lambda *a: None), _tar_size(count, total))
+    stdin, stdout, stderr = conn.exec_command(
+        f"cd {shlex.quote(parent or '/')} && tar -cf - {shlex.quote(name)}")
+    channel = stdout.channel
+    stdin.close()
+    errors = _StderrDrain(stderr)
+    reader = _ChannelReader(stdout, report, is_stopped)
+    os.makedirs(local_dir, exist_ok=True)
+    try:
+        with tarfile.open(fileobj=reader, mode="r|", bufsize=STREAM_BUFSIZE) as tf:
+            # reject absolute paths / links leaving local_dir
+            if hasattr(tarfile, "data_filter"):
+                tf.extractall(local_dir, filter="data")
+            else:
+                _extract_checked(tf, local_dir)
+        _finish(channel, errors)
+    except Exception:
+        channel.close()
+        raise
+    if callback:
+        callback(100, reader.read_bytes, reader.read_bytes)
+    return os.path.join(local_dir, name)
@@ -0,0 +1,208 @@
+# task_queue.py
+import heapq
+import itertools
+from collections import deque
+from typing import Dict, List, Optional
+
+from tools.transfer_scheduler import BACKGROUND, INTERACTIVE, USER
+
+# Lanes of a RemoteFileManager: the main worker thread (file tree, transfer
+# dispatch), a pool of metadata workers each with its own channels on the
+# shared transport, and the slow lane thread running long shell commands, so
+# browsing never waits behind them
+MAIN_LANE = "main"
+META_LANE = "meta"
+SLOW_LANE = "slow"
+
+# task type -> priority class (lower runs first), unknown types are USER
+TASK_PRIORITIES = {
+    'list_dir': INTERACTIVE,
+    'check_path': INTERACTIVE,
+    'file_type': INTERACTIVE,
+    'file_info': INTERACTIVE,
+    'get_permissions': INTERACTIVE,
+    'rename': INTERACTIVE,
+    'mkdir': INTERACTIVE,
+    'mkfile': INTERACTIVE,
+    'kill_process': INTERACTIVE,
+    'refresh': BACKGROUND,
+    'sync': BACKGROUND,
+    'sync_apply': BACKGROUND,
+}
+# independent remote queries, run concurrently but in order per path
+METADATA_TASKS = {'list_dir', 'check_path', 'file_type', 'file_info',
+                  'get_permissions', 'set_permissions', 'kill_process'}
+# `cp -r` and `rm -rf` of big trees can take minutes
+SLOW_TASKS = {'copy_to', 'delete'}
+# read-only queries: a pending duplicate for the same path is dropped
+DEDUPE_TASKS = {'list_dir', 'check_path', 'file_type', 'file_info', 'get_permissions'}
+# only the newest request matters (explorer navigation, terminal cd): a new one
+# cancels the pending ones for other paths and marks a running one stale
+SUPERSEDE_TASKS = {'list_dir', 'check_path'}
+
+
+def _task_path(task: dict):
+    return task.get('path', task.get('file_path'))
+
+
+class TaskQueue:
+    """
+    Pending tasks of a RemoteFileManager, by lane and priority class.
+
+    Tasks of the same class keep their order. Read-only queries are coalesced
+    with the last task queued for their path, queued refreshes are merged into one, and the superseding types
+    carry a generation so the worker can drop results nobody waits for any
+    more (see is_stale).
+
+    Metadata tasks are handed to several workers at once, but never two for the
+    same path (or pid): a task runs only once everything queued before it for
+    its path is done (see done()), whatever the priority classes, so requests
+    on one path keep their order.
+    Not thread safe: the manager's mutex guards it.
+    """
+
+    def __init__(self):
+        self._heaps: Dict[str, list] = {MAIN_LANE: [], META_LANE: [], SLOW_LANE: []}
+        self._order = itertools.count()
+        # coalescing key -> queued task
+        self._pending: Dict[tuple, dict] = {}
+        # superseding type -> newest generation handed out
+        self._generations: Dict[str, int] = {}
+        # paths (or pids) of the metadata tasks running right now
+        self._busy = set()
+        # path (or pid) -> queued metadata tasks for it, oldest first
+        self._per_path: Dict[object, deque] = {}
+
+    @staticmethod
+    def lane_of(task: dict) -> str:
+        ttype = task.get('type')
+        if ttype in METADATA_TASKS:
+            return META_LANE
+        return SLOW_LANE if ttype in SLOW_TASKS else MAIN_LANE
+
+    @staticmethod
+    def _ordering_key(task: dict):
+        if task.get('type') == 'kill_process':
+            return ('pid', task.get('pid'))
+        return _task_path(task)
+
+    def _runnable(self, lane: str, task: dict) -> bool:
+        if task.get('cancelled'):
+            return False
+        if lane != META_LANE:
+            return True
+        key = self._ordering_key(task)
+        return key not in self._busy and self._per_path[key][0] is task
+
+    def _cancel(self, task: dict):
+        task['cancelled'] = True
+        if self.lane_of(task) == META_LANE:
+            key = self._ordering_key(task)
+            self._per_path[key].remove(task)
+            if not self._per_path[key]:
+                del self._per_path[key]
+
+    @staticmethod
+    def _key(task: dict) -> Optional[tuple]:
+        ttype = task.get('type')
+        if ttype in DEDUPE_TASKS:
+            return (ttype, _task_path(task))
+        if ttype == 'refresh':
+            return (ttype,)
+        return None
+
+    def push(self, task: dict) -> bool:
+        """Queue a task, False if it was folded into one already queued."""
+        ttype = task.get('type')
+        if ttype in SUPERSEDE_TASKS:
+            generation = self._generations.get(ttype, 0) + 1
+            self._generations[ttype] = generation
+            task['generation'] = generation
+            path = _task_path(task)
+            for key, queued in list(self._pending.items()):
+                if key[0] == ttype and key[1] != path:
+                    self._cancel(queued)
+                    del self._pending[key]
+
+        key = self._key(task)
+        queued = self._pending.get(key) if key else None
+        if queued is not None and self.lane_of(queued) == META_LANE and \
+                self._per_path[self._ordering_key(queued)][-1] is not queued:
+            # something else was queued for the path since (get/set/get
+            # permissions): folding would answer before it, queue a new one
+            queued = None
+        if queued is not None:
+            if ttype == 'refresh':
+                queued['paths'] = self._merge_paths(
+                    queued.get('paths'), task.get('paths'))
+            else:
+                if not task.get('revalidate'):
+                    # a real request outranks a background revalidation
+                    queued.pop('revalidate', None)
+                    queued.pop('cached_mtime', None)
+                if 'generation' in task:
+                    queued['generation'] = task['generation']
+            return False
+
+        if key:
+            self._pending[key] = task
+        if self.lane_of(task) == META_LANE:
+            self._per_path.setdefault(self._ordering_key(task), deque()).append(task)
+        priority = TASK_PRIORITIES.get(ttype, USER)
+        heapq.heappush(self._heaps[self.lane_of(task)],
+                       (priority, next(self._order), task))
+        return True
+
+    @staticmethod
+    def _merge_paths(a: Optional[List[str]], b: Optional[List[str]]) -> Optional[List[str]]:
+        # None = the whole tree
+        if a is None or b is None:
+            return None
+        return a + [p for p in b if p not in a]
+
+    def pop(self, lane: str = MAIN_LANE) -> Optional[dict]:
+        heap = self._heaps[lane]
+        waiting, found = [], None
+        while heap:
+            entry = heapq.heappop(heap)
+            task = entry[2]
+            if task.get('cancelled'):
+                continue
+            if not self._runnable(lane, task):
+                # its path is busy, it keeps its place
+                waiting.append(entry)
+                continue
+            found = task
+            break
+        for entry in waiting:
+            heapq.heappush(heap, entry)
+        if found is None:
+            return None
+        key = self._key(found)
+        if key and self._pending.get(key) is found:
+            del self._pending[key]
+        if lane == META_LANE:
+            path = self._ordering_key(found)
+            self._busy.add(path)
+            self._per_path[path].popleft()
+            if not self._per_path[path]:
+                del self._per_path[path]
+        return found
+
+    def done(self, task: dict):
+        """A popped metadata task finished, its path may run the next one."""
+        if self.lane_of(task) == META_LANE:
+            self._busy.discard(self._ordering_key(task))
+
+    def has_work(self, lane: str = MAIN_LANE) -> bool:
+        return any(self._runnable(lane, entry[2]) for entry in self._heaps[lane])
+
+    def is_stale(self, task: dict) -> bool:
+        """A newer request of the same superseding type was queued since."""
+        generation = task.get('generation')
+        return generation is not None and \
+            generation < self._generations.get(task.get('type'), 0)
+
+    def __len__(self):
+        return sum(1 for heap in self._heaps.values()
+                   for entry in heap if not entry[2].get('cancelled'))
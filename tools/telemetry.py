@@ -0,0 +1,173 @@
+# telemetry.py
+"""
+Resources channel telemetry protocol.
+
+The remote monitor writes one frame per line:
+
+    @@T1 <kind> <byte length> <json>\n
+
+kind  S  system information, emitted once
+      D  resource sample; keyed lists are delta encoded
+
+A keyed list (all_processes, connections, disk_usage, net_usage) is sent as
+{"keys": [...], "upsert": {key: fields}}: `keys` is the complete ordered key
+list of this sample, `upsert` only carries items that are new or changed, and
+the fields of an upserted item are merged into the previous item. Samples with
+"full": 1 are keyframes and carry every item. Plain lists/scalars are sent as is.
+Categories the client did not subscribe to are left out of a sample; the
+decoder fills them in with their last known value.
+
+The client controls the monitor with one line per command on the channel:
+
+    @@C sub top,processes,disks,net,connections
+    @@C interval <seconds>
+    @@C keyframe
+
+Frames are length prefixed, so the decoder never scans a payload for its end
+marker and every byte of input is looked at once.
+"""
+import json
+import re
+from typing import Dict, List, Optional
+
+MARKER = b"@@T1 "
+CATEGORIES = ("top", "processes", "disks", "net", "connections")
+LIST_FIELDS = ("top_processes", "all_processes",
+               "disk_usage", "net_usage", "connections")
+_HEADER_RE = re.compile(rb"@@T1 ([A-Z]) (\d{1,9}) ")
+_PARTIAL_HEADER_RE = re.compile(rb"@@T1 (?:[A-Z](?: \d{0,9})?)?")
+_MAX_HEADER = len(MARKER) + 12
+_MAX_FRAME = 16 * 1024 * 1024
+
+
+class TelemetryDecoder:
+    """
+    Incremental decoder: feed() raw channel bytes, get the complete samples as
+    the dicts `Window._set_usage` consumes ({"type": "sysinfo"|"info", ...}).
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._scan = 0  # where the next marker search starts
+        self._frame_end = None  # end offset of a frame whose header is parsed
+        self._frame_start = 0
+        self._kind = None
+        self._lists: Dict[str, Dict[str, dict]] = {}
+        self._seq = None
+        # last value of every list, for categories missing from a sample
+        self._last: Dict[str, object] = {name: [] for name in LIST_FIELDS}
+        self.synced = False
+        # set when a delta arrived without its base; the owner should send
+        # keyframe_command() and clear it
+        self.need_keyframe = False
+
+    def reset(self):
+        self.__init__()
+
+    def feed(self, data: bytes) -> List[dict]:
+        self._buf += data
+        samples = []
+        while True:
+            if self._frame_end is None and not self._parse_header():
+                break
+            if len(self._buf) < self._frame_end:
+                break  # payload not complete yet
+            payload = bytes(self._buf[self._frame_start:self._frame_end])
+            kind = self._kind
+            del self._buf[:self._frame_end]
+            self._scan = 0
+            self._frame_end = None
+            try:
+                sample = self._decode(kind, json.loads(payload))
+            except Exception as e:
+                print(f"Error processing system resource data: {e}")
+                print(repr(payload[:200]))
+                self.synced = False
+                self.need_keyframe = True
+                continue
+            if sample is not None:
+                samples.append(sample)
+        return samples
+
+    def _parse_header(self) -> bool:
+        buf = self._buf
+        while True:
+            idx = buf.find(MARKER, self._scan)
+            if idx < 0:
+                # keep a possible partial marker at the tail
+                keep = len(MARKER) - 1
+                if len(buf) > keep:
+                    del buf[:len(buf) - keep]
+                self._scan = 0
+                return False
+            if idx:
+                del buf[:idx]
+            match = _HEADER_RE.match(buf, 0, _MAX_HEADER)
+            if match and int(match.group(2)) <= _MAX_FRAME:
+                self._kind = match.group(1).decode()
+                self._frame_start = match.end()
+                self._frame_end = self._frame_start + int(match.group(2))
+                return True
+            if match is None and _PARTIAL_HEADER_RE.fullmatch(buf, 0, _MAX_HEADER):
+                self._scan = 0
+                return False  # header still arriving
+            self._scan = 1  # not a real header, look for the next marker
+
+    # ---------------------------
+    # Frame decoding
+    # ---------------------------
+    def _decode(self, kind: str, data: dict) -> Optional[dict]:
+        if kind == "S":
+            return {"type": "sysinfo", **data}
+        if kind != "D":
+            return None
+
+        seq = data.pop("seq", None)
+        full = data.pop("full", 0)
+        if full:
+            self._lists.clear()
+            self.synced = True
+        elif not self.synced or self._seq is None or seq != self._seq + 1:
+            # a delta without its base, wait for the next keyframe
+            self.synced = False
+            self.need_keyframe = True
+            self._seq = seq
+            return None
+        self._seq = seq
+
+        sample = {"type": "info", **self._last}
+        for name, value in data.items():
+            if isinstance(value, dict) and "keys" in value:
+                sample[name] = self._merge_list(name, value)
+            else:
+                sample[name] = value
+            if isinstance(sample[name], list):
+                self._last[name] = sample[name]
+        return sample
+
+    def _merge_list(self, name: str, delta: dict) -> List[dict]:
+        previous = self._lists.get(name, {})
+        upsert = delta.get("upsert", {})
+        current = {}
+        for key in delta["keys"]:
+            key = str(key)
+            item = previous.get(key)
+            changes = upsert.get(key)
+            if changes is not None:
+                item = {**item, **changes} if item else changes
+            if item is not None:
+                current[key] = item
+        self._lists[name] = current
+        return list(current.values())
+
+
+def subscribe_command(categories) -> bytes:
+    return ("@@C sub " + ",".join(c for c in CATEGORIES if c in categories) + "\n").encode()
+
+
+def interval_command(seconds: int) -> bytes:
+    return f"@@C interval {int(seconds)}\n".encode()
+
+
+def keyframe_command() -> bytes:
+    return b"@@C keyframe\n"
@@ -0,0 +1,275 @@
+# transfer_journal.py
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tools.setting_config import config_dir
+
+JOURNAL_DIR = config_dir / "transfers"
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_AGE = 7 * 24 * 3600
+
+# journal id -> number of holders (a running transfer, a pending resume) in this
+# process; claimed journals are not handed out by pending() again
+_claims: Dict[str, int] = {}
+_claims_lock = threading.Lock()
+
+
+def _merge(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Insert [start, end) into sorted, non-overlapping ranges."""
+    result = []
+    for s, e in ranges:
+        if e < start or s > end:
+            result.append([s, e])
+        else:
+            start, end = min(s, start), max(e, end)
+    result.append([start, end])
+    result.sort()
+    return result
+
+
+class TransferJournal:
+    """
+    On-disk checkpoint of one resumable file transfer.
+
+    The journal lives in <config_dir>/transfers/<id>.json and records the
+    completed byte ranges of the destination file, the size/mtime of the
+    source it was taken from and, when chunk verification is on, the md5 of
+    every completed CHUNK_SIZE chunk. It is saved whenever a chunk boundary is
+    crossed (atomically, via a temp file + rename) and deleted once the
+    transfer completes, so any journal left on disk is a transfer that can be
+    continued after a reconnect or an application restart.
+
+    open() and pending() claim the journal for this process; every claim is
+    given back with release() once its transfer finished or failed.
+    """
+
+    def __init__(self, path: str, data: dict):
+        self.path = path
+        self.data = data
+        # multi-stream downloads confirm ranges from several threads
+        self._lock = threading.Lock()
+        self._saved_bytes = self.confirmed_bytes
+        self.id = os.path.splitext(os.path.basename(path))[0]
+
+    # ---------------------------
+    # Open / list
+    # ---------------------------
+    @staticmethod
+    def make_id(host_key: str, action: str, local_path: str, remote_path: str) -> str:
+        raw = f"{host_key}|{action}|{os.path.abspath(local_path)}|{remote_path}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def open(cls, host_key: str, action: str, local_path: str, remote_path: str,
+             size: int, mtime: int, verify: bool = False,
+             chunk_size: int = CHUNK_SIZE) -> "TransferJournal":
+        """Journal of this transfer; starts over if the source changed since."""
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        journal_id = cls.make_id(host_key, action, local_path, remote_path)
+        cls._claim(journal_id)
+        path = os.path.join(JOURNAL_DIR, journal_id + ".json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if (data.get("size") == size and data.get("mtime") == int(mtime)
+                    and data.get("chunk_size") == chunk_size):
+                data["verify"] = verify
+                return cls(path, data)
+            print(f"♻️ 源文件已变化, 重新传输: {remote_path}")
+        except (OSError, ValueError):
+            pass
+        data = {
+            "host": host_key,
+            "action": action,
+            "local": os.path.abspath(local_path),
+            "remote": remote_path,
+            "size": size,
+            "mtime": int(mtime),
+            "chunk_size": chunk_size,
+            "verify": verify,
+            "ranges": [],
+            "hashes": {},
+            "updated": time.time(),
+        }
+        return cls(path, data)
+
+    @classmethod
+    def pending(cls, host_key: str) -> List["TransferJournal"]:
+        """
+        Unfinished transfers of a host that no transfer of this process holds,
+        claimed for the caller; journals older than MAX_AGE are dropped.
+        """
+        result = []
+        if not os.path.isdir(JOURNAL_DIR):
+            return result
+        now = time.time()
+        for name in os.listdir(JOURNAL_DIR):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(JOURNAL_DIR, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if now - data.get("updated", 0) > MAX_AGE:
+                cls(path, data).discard()
+            elif data.get("host") == host_key and cls._claim(name[:-len(".json")], only_free=True):
+                result.append(cls(path, data))
+        return result
+
+    @staticmethod
+    def _claim(journal_id: str, only_free: bool = False) -> bool:
+        with _claims_lock:
+            if only_free and _claims.get(journal_id):
+                return False
+            _claims[journal_id] = _claims.get(journal_id, 0) + 1
+            return True
+
+    def release(self):
+        """Give back one claim taken by open() or pending()."""
+        with _claims_lock:
+            count = _claims.get(self.id, 0) - 1
+            if count > 0:
+                _claims[self.id] = count
+            else:
+                _claims.pop(self.id, None)
+
+    # ---------------------------
+    # State
+    # ---------------------------
+    @property
+    def chunk_size(self) -> int:
+        return self.data["chunk_size"]
+
+    @property
+    def verify(self) -> bool:
+        return self.data.get("verify", False)
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        return [tuple(r) for r in self.data["ranges"]]
+
+    @property
+    def offset(self) -> int:
+        """End of the confirmed prefix [0, offset)."""
+        ranges = self.data["ranges"]
+        return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+    @property
+    def confirmed_bytes(self) -> int:
+        return sum(e - s for s, e in self.data["ranges"])
+
+    def missing_ranges(self) -> List[Tuple[int, int]]:
+        """Byte ranges of the file not confirmed yet."""
+        result, pos = [], 0
+        for s, e in self.data["ranges"]:
+            if s > pos:
+                result.append((pos, s))
+            pos = max(pos, e)
+        if pos < self.data["size"]:
+            result.append((pos, self.data["size"]))
+        return result
+
+    def resume_offset(self) -> int:
+        """Confirmed prefix rounded down to a whole chunk (so its hash can be checked)."""
+        return (self.offset // self.chunk_size) * self.chunk_size
+
+    def chunk_hash(self, index: int) -> Optional[str]:
+        return self.data["hashes"].get(str(index))
+
+    def reset(self, offset: int = 0):
+        """Forget everything from `offset` on."""
+        self.data["ranges"] = [[0, offset]] if offset else []
+        last = offset // self.chunk_size
+        self.data["hashes"] = {k: v for k, v in self.data["hashes"].items()
+                               if int(k) < last}
+        self._saved_bytes = offset
+        self.save()
+
+    # ---------------------------
+    # Update
+    # ---------------------------
+    def add_range(self, start: int, end: int, before_save: Optional[Callable[[], None]] = None):
+        """Mark [start, end) as safely written; saves after every chunk's worth of progress."""
+        if end <= start:
+            return
+        with self._lock:
+            self.data["ranges"] = _merge(self.data["ranges"], start, end)
+            confirmed = self.confirmed_bytes
+            if confirmed - self._saved_bytes >= self.chunk_size or confirmed >= self.data["size"]:
+                if before_save:
+                    before_save()
+                self._saved_bytes = confirmed
+                self.save()
+
+    def confirm(self, end: int, before_save: Optional[Callable[[], None]] = None):
+        """Extend the confirmed prefix to `end`."""
+        self.add_range(0, end, before_save)
+
+    def set_chunk_hash(self, index: int, digest: str):
+        self.data["hashes"][str(index)] = digest
+
+    def save(self):
+        self.data["updated"] = time.time()
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ 保存传输日志失败: {e}")
+
+    def discard(self):
+        for path in (self.path, self.path + ".tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ChunkHasher:
+    """
+    md5 of every complete CHUNK_SIZE chunk of a sequential stream, stored in the
+    journal. A trailing partial chunk needs none: resuming starts at a chunk
+    boundary, and a transfer that reached the end has no journal any more.
+    """
+
+    def __init__(self, journal: TransferJournal, offset: int):
+        self.journal = journal
+        self.offset = offset  # always chunk aligned at start
+        self._md5 = hashlib.md5()
+
+    def feed(self, data: bytes):
+        size = self.journal.chunk_size
+        view = memoryview(data)
+        while view:
+            room = size - self.offset % size
+            part = view[:room]
+            self._md5.update(part)
+            self.offset += len(part)
+            view = view[len(part):]
+            if self.offset % size == 0:
+                self.journal.set_chunk_hash(
+                    self.offset // size - 1, self._md5.hexdigest())
+                self._md5 = hashlib.md5()
+
+
+def file_chunk_md5(path: str, index: int, chunk_size: int) -> Optional[str]:
+    """md5 of chunk `index` of a local file, None if it is incomplete."""
+    md5 = hashlib.md5()
+    try:
+        with open(path, "rb") as f:
+            f.seek(index * chunk_size)
+            data = f.read(chunk_size)
+    except OSError:
+        return None
+    if len(data) != chunk_size:
+        return None
+    md5.update(data)
+    return md5.hexdigest()
+
@@ -0,0 +1,246 @@
+# transfer_scheduler.py
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from tools.setting_config import SCM
+
+# Priority classes, lower runs first
+INTERACTIVE = 0  # file opened for editing / re-upload after save
+USER = 1         # uploads and downloads started by the user
+BACKGROUND = 2   # directory sync, resumed journal transfers
+
+
+class TokenBucket:
+    """Byte rate limit shared by several threads; rate 0 = unlimited."""
+
+    def __init__(self, rate: float = 0):
+        self._lock = threading.Lock()
+        self.set_rate(rate)
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self.rate = max(0.0, float(rate))
+            # a quarter second of traffic (at least 256 KB) may go out at once
+            self.burst = max(self.rate / 4, 256 * 1024)
+            self.tokens = self.burst
+            self.stamp = time.monotonic()
+
+    def consume(self, n: int) -> float:
+        """Take n bytes, returns how long the caller has to wait (0 = go on)."""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens +
+                              (now - self.stamp) * self.rate)
+            self.stamp = now
+            # going into debt makes later callers wait for it as well
+            self.tokens -= n
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class _ScheduledJob(QRunnable):
+    """Runs one TransferWorker on the shared pool and reports back when done."""
+
+    def __init__(self, scheduler: "TransferScheduler", worker, host_key: str, priority: int, owner):
+        super().__init__()
+        self.scheduler = scheduler
+        self.worker = worker
+        self.host_key = host_key
+        self.priority = priority
+        self.owner = owner
+
+    def run(self):
+        try:
+            self.worker.run()
+        finally:
+            self.scheduler._finished(self)
+
+    def throttle(self, nbytes: int):
+        """Called by the transfer loops for every block moved."""
+        self.scheduler._throttle(self, nbytes)
+
+
+class TransferScheduler(QObject):
+    """
+    Process wide scheduler of every TransferWorker of every tab.
+
+    Queued transfers start by priority class (INTERACTIVE > USER > BACKGROUND),
+    round robin over hosts inside a class, as long as the host is below
+    `max_concurrent_transfers` and the process below `transfer_global_limit`.
+    Interactive transfers may exceed both limits by INTERACTIVE_EXTRA so that
+    opening a file is never stuck behind a long download, and ignore pause.
+
+    Running transfers call throttle() per block: it blocks while paused and
+    enforces the global (`transfer_rate_limit_kb`) and per host
+    (`transfer_host_rate_limit_kb`) token bucket rate limits.
+    """
+    INTERACTIVE_EXTRA = 2
+    paused_changed = pyqtSignal(bool)
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        # priority -> host_key -> queued jobs (dicts keep hosts in round robin order)
+        self._queues: Dict[int, Dict[str, deque]] = {
+            INTERACTIVE: {}, USER: {}, BACKGROUND: {}}
+        self._running: Dict[str, int] = {}
+        self._active = set()
+        self._paused = False
+        self.bucket = TokenBucket()
+        self._host_buckets: Dict[str, TokenBucket] = {}
+        self.pool = QThreadPool()
+        # threads (and their thread-local SFTP sessions) stay alive between transfers
+        self.pool.setExpiryTimeout(-1)
+        self.reload_config()
+
+    @classmethod
+    def instance(cls) -> "TransferScheduler":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = TransferScheduler()
+            return cls._instance
+
+    def reload_config(self):
+        config = SCM().read_config()
+        with self._lock:
+            self.global_limit = max(1, int(config.get("transfer_global_limit", 16)))
+            self.host_limit = max(1, int(config.get("max_concurrent_transfers", 4)))
+            self.host_rate = max(0, int(config.get("transfer_host_rate_limit_kb", 0))) * 1024
+            for bucket in self._host_buckets.values():
+                bucket.set_rate(self.host_rate)
+        self.bucket.set_rate(max(0, int(config.get("transfer_rate_limit_kb", 0))) * 1024)
+        self.pool.setMaxThreadCount(self.global_limit + self.INTERACTIVE_EXTRA)
+        self._dispatch()
+
+    # ---------------------------
+    # Queue
+    # ---------------------------
+    def submit(self, worker, host_key: str, priority: int = USER, owner=None):
+        """Queue a TransferWorker; it starts as soon as the limits allow."""
+        job = _ScheduledJob(self, worker, host_key, priority, owner)
+        worker.throttle = job.throttle
+        with self._lock:
+            self._queues[priority].setdefault(host_key, deque()).append(job)
+        self._dispatch()
+
+    def cancel_owner(self, owner):
+        """Drop the queued (not yet started) transfers of a closed tab."""
+        with self._lock:
+            for hosts in self._queues.values():
+                for host_key in list(hosts):
+                    kept = deque(j for j in hosts[host_key] if j.owner is not owner)
+                    for job in hosts[host_key]:
+                        if job.owner is owner:
+                            job.worker.stop()
+                    if kept:
+                        hosts[host_key] = kept
+                    else:
+                        del hosts[host_key]
+
+    def queued_count(self) -> int:
+        with self._lock:
+            return sum(len(q) for hosts in self._queues.values() for q in hosts.values())
+
+    def _next_job(self) -> Optional[_ScheduledJob]:
+        """Highest priority job whose host has room (caller holds the lock)."""
+        total = len(self._active)
+        for priority, hosts in self._queues.items():
+            extra = self.INTERACTIVE_EXTRA if priority == INTERACTIVE else 0
+            if priority != INTERACTIVE and self._paused:
+                break
+            if total >= self.global_limit + extra:
+                continue
+            best = None
+            for host_key, queue in hosts.items():
+                running = self._running.get(host_key, 0)
+                if running < self.host_limit + extra and (
+                        best is None or running < self._running.get(best, 0)):
+                    best = host_key
+            if best is not None:
+                queue = hosts.pop(best)
+                job = queue.popleft()
+                if queue:
+                    # back of the line: the other hosts of this class go next
+                    hosts[best] = queue
+                return job
+        return None
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    break
+                self._running[job.host_key] = self._running.get(job.host_key, 0) + 1
+                self._active.add(job)
+                started.append(job)
+        for job in started:
+            self.pool.start(job)
+
+    def _finished(self, job: _ScheduledJob):
+        with self._lock:
+            self._active.discard(job)
+            left = self._running.get(job.host_key, 1) - 1
+            if left > 0:
+                self._running[job.host_key] = left
+            else:
+                self._running.pop(job.host_key, None)
+        self._dispatch()
+
+    # ---------------------------
+    # Pause / bandwidth
+    # ---------------------------
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def pause(self):
+        """Stop starting queued transfers and hold running ones at their next block."""
+        if not self._paused:
+            self._paused = True
+            print("⏸️ 传输已暂停")
+            self.paused_changed.emit(True)
+
+    def resume(self):
+        if self._paused:
+            self._paused = False
+            print("▶️ 传输已恢复")
+            self.paused_changed.emit(False)
+            self._dispatch()
+
+    def _host_bucket(self, host_key: str) -> Optional[TokenBucket]:
+        if not self.host_rate:
+            return None
+        with self._lock:
+            bucket = self._host_buckets.get(host_key)
+            if bucket is None:
+                bucket = self._host_buckets[host_key] = TokenBucket(self.host_rate)
+            return bucket
+
+    def _throttle(self, job: _ScheduledJob, nbytes: int):
+        worker = job.worker
+        interactive = job.priority == INTERACTIVE
+        while self._paused and not interactive and not worker.is_stopped:
+            time.sleep(0.2)
+        delay = self.bucket.consume(nbytes)
+        host_bucket = self._host_bucket(job.host_key)
+        if host_bucket:
+            delay = max(delay, host_bucket.consume(nbytes))
+        if interactive:
+            # counted against the cap (slowing the others down) but never delayed
+            return
+        deadline = time.monotonic() + delay
+        while not worker.is_stopped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.2))
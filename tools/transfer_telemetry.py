@@ -0,0 +1,171 @@
+# transfer_telemetry.py
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from tools.setting_config import SCM
+
+# weight of the newest sample in the smoothed throughput
+SPEED_ALPHA = 0.3
+HISTORY_SIZE = 500
+
+
+class TransferStats:
+    """Counters of one transfer (identifier = local path for uploads, remote path for downloads)."""
+
+    def __init__(self, identifier: str, mode: str):
+        self.identifier = identifier
+        self.mode = mode
+        self.percent = -1
+        self.bytes = 0
+        self.total = 0
+        self.retries = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.success: Optional[bool] = None
+        # smoothed bytes/s and the sample it was last computed from
+        self.speed = 0.0
+        self._sample_time = self.started
+        self._sample_bytes = 0
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def average_mbps(self) -> float:
+        duration = self.duration
+        return self.bytes / duration / (1024 * 1024) if duration > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the smoothed speed, None while unknown."""
+        if self.speed <= 0 or self.total <= 0:
+            return None
+        return max(0.0, (self.total - self.bytes) / self.speed)
+
+    def sample(self, now: float):
+        dt = now - self._sample_time
+        if dt <= 0:
+            return
+        current = (self.bytes - self._sample_bytes) / dt
+        self.speed = current if not self.speed else \
+            SPEED_ALPHA * current + (1 - SPEED_ALPHA) * self.speed
+        self._sample_time, self._sample_bytes = now, self.bytes
+
+    def to_dict(self) -> dict:
+        return {
+            "identifier": self.identifier,
+            "mode": self.mode,
+            "bytes": self.bytes,
+            "total": self.total,
+            "retries": self.retries,
+            "duration": round(self.duration, 3),
+            "mbps": round(self.average_mbps, 3),
+            "success": self.success,
+        }
+
+
+class TransferTelemetry(QObject):
+    """
+    Collects the progress of TransferWorkers and publishes it at a fixed UI rate.
+
+    Workers call update() for every block from their own threads; that only
+    stores counters under a lock. A QTimer in the GUI thread samples them
+    `transfer_progress_hz` times a second, computes smoothed throughput and ETA
+    and emits one progress_batch with every transfer that moved since the last
+    tick. Finished transfers are kept in `history` for inspection.
+    """
+    # [(identifier, mode, percent, bytes_so_far, total_bytes, bytes_per_second, eta_seconds or -1)]
+    progress_batch = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._active: Dict[str, TransferStats] = {}
+        self._dirty = set()
+        self.history = deque(maxlen=HISTORY_SIZE)
+        hz = SCM().read_config().get("transfer_progress_hz", 10)
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(1000 / max(1, min(60, hz))))
+        self.timer.timeout.connect(self._flush)
+        self.timer.start()
+
+    # ---------------------------
+    # Worker side (any thread)
+    # ---------------------------
+    def update(self, identifier: str, mode: str, percent: int, bytes_so_far: int = 0, total_bytes: int = 0):
+        with self._lock:
+            stats = self._active.get(identifier)
+            if stats is None:
+                stats = self._active[identifier] = TransferStats(
+                    identifier, mode)
+            stats.percent = percent
+            if percent >= 0:
+                stats.bytes, stats.total = bytes_so_far, total_bytes
+            self._dirty.add(identifier)
+
+    def retry(self, identifier: str):
+        with self._lock:
+            stats = self._active.get(identifier)
+            if stats:
+                stats.retries += 1
+
+    def finish(self, identifier: str, success: bool):
+        """Stop publishing a transfer (its finished signal follows) and archive its stats."""
+        with self._lock:
+            stats = self._active.pop(identifier, None)
+            self._dirty.discard(identifier)
+        if stats is None:
+            return
+        stats.finished = time.monotonic()
+        stats.success = success
+        self.history.append(stats)
+        if success and stats.bytes:
+            print(f"📊 {stats.mode} {identifier}: {stats.bytes / 1024 / 1024:.2f} MB, "
+                  f"{stats.duration:.1f}s, {stats.average_mbps:.2f} MB/s, 重试 {stats.retries}")
+
+    # ---------------------------
+    # Inspection
+    # ---------------------------
+    def stats(self, identifier: str) -> Optional[TransferStats]:
+        with self._lock:
+            stats = self._active.get(identifier)
+        if stats:
+            return stats
+        for stats in reversed(self.history):
+            if stats.identifier == identifier:
+                return stats
+        return None
+
+    def snapshot(self) -> List[dict]:
+        """Stats of the running transfers followed by the finished ones."""
+        with self._lock:
+            active = list(self._active.values())
+        return [s.to_dict() for s in active] + [s.to_dict() for s in self.history]
+
+    # ---------------------------
+    # GUI side
+    # ---------------------------
+    def _flush(self):
+        now = time.monotonic()
+        batch = []
+        with self._lock:
+            for stats in self._active.values():
+                stats.sample(now)
+            for identifier in self._dirty:
+                stats = self._active.get(identifier)
+                if stats is None:
+                    continue
+                eta = stats.eta
+                batch.append((identifier, stats.mode, stats.percent, stats.bytes, stats.total,
+                              stats.speed, -1 if eta is None else eta))
+            self._dirty.clear()
+        if batch:
+            self.progress_batch.emit(batch)
+
+    def stop(self):
+        self.timer.stop()
@@ -7,6 +7,9 @@ import tarfile
 import tempfile
 from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
 import time
+from tools.sftp_engine import PipelinedSFTP, SFTPSessionPool
+from tools.tar_stream import download_tar_stream, upload_tar_stream
+from tools.delta_upload import DeltaUnsupported, delta_upload
 
 
 class TransferSignals(QObject):
@@ -28,8 +31,9 @@ class TransferWorker(QRunnable):
     A QRunnable worker for performing a single file/directory transfer operation (upload or download)
     in a separate thread from the QThreadPool.
     """
+    MAX_RECONNECTS = 5
 
-    def __init__(self, connection, action, local_path, remote_path, compression, download_context=None, upload_context=None, task_id=None, session_id=None):
+    def __init__(self, connection, action, local_path, remote_path, compression, download_context=None, upload_context=None, task_id=None, session_id=None, sftp_pool: SFTPSessionPool = None, known_dirs: set = None, stream_tar=False, journal_host=None, reconnect=None, resume_target=None, delta=False, sync_mtime=None):
         super().__init__()
         self.conn = connection  # Now receives an active connection
         self.action = action
@@ -40,10 +44,46 @@ class TransferWorker(QRunnable):
         self.upload_context = upload_context
         self.task_id = task_id
         self.session_id = session_id
+        # Shared SFTP sessions of the worker threads, and remote directories
+        # already known to exist in this batch (shared between its workers)
+        self.sftp_pool = sftp_pool
+        self.known_dirs = known_dirs
+        # Transfer the whole tree as one tar stream over an exec channel
+        self.stream_tar = stream_tar
+        # Resumable transfers: journal key of the host, callable returning a
+        # fresh (connection, sftp_pool) after the link dropped, and the local
+        # file of a download continued from a journal
+        self.journal_host = journal_host
+        self.reconnect = reconnect
+        self.resume_target = resume_target
+        # Re-upload of an edited file: send only the changed blocks
+        self.delta = delta
+        # Directory sync: copy the source mtime so the next sync sees it unchanged
+        self.sync_mtime = sync_mtime
+        # Set by the TransferScheduler: throttle(nbytes) per block (bandwidth caps, pause)
+        self.throttle = None
+        # TransferTelemetry collecting progress (sampled at UI rate); without
+        # it every block is emitted as a progress signal
+        self.telemetry = None
         self.signals = TransferSignals()
         self.sftp = None
+        self.engine = None
         self.is_stopped = False
 
+    def _report_progress(self, identifier, progress, bytes_so_far=0, total_bytes=0):
+        if self.telemetry:
+            self.telemetry.update(
+                identifier, self.action, progress, bytes_so_far, total_bytes)
+        else:
+            self.signals.progress.emit(
+                identifier, progress, bytes_so_far, total_bytes)
+
+    def _report_finished(self, identifier, success, msg):
+        if self.telemetry:
+            # before the signal: no progress update may follow the result
+            self.telemetry.finish(identifier, success)
+        self.signals.finished.emit(identifier, success, msg)
+
     def stop(self):
         self.is_stopped = True
         if self.sftp:
@@ -56,14 +96,16 @@ class TransferWorker(QRunnable):
         """The main work of the thread. Uses a pre-established SSH connection to perform the transfer."""
         retry_delay = 1  # Delay in seconds between retries
         attempts = 0
+        reconnects = 0
         if self.task_id:
             identifier = self.task_id
         else:
             identifier = str(
                 self.local_path if self.action == 'upload' else self.remote_path)
-        self.signals.progress.emit(identifier, -1, 0, 0)
+        self._report_progress(identifier, -1, 0, 0)
 
         while not self.is_stopped:
+            failed = True
             try:
                 if self.is_stopped:
                     break
@@ -71,9 +113,20 @@ class TransferWorker(QRunnable):
                     raise Exception(
                         "SSH connection is not active or provided.")
                 self.conn.get_transport().set_keepalive(30)
-                self.sftp = self.conn.open_sftp()
-
-                if self.action == 'upload':
+                if self.sftp_pool:
+                    self.sftp = self.sftp_pool.get()
+                    self.engine = self.sftp_pool.engine(
+                        self.sftp, is_stopped=lambda: self.is_stopped, journal_host=self.journal_host,
+                        throttle=self.throttle)
+                else:
+                    self.sftp = self.conn.open_sftp()
+                    self.engine = PipelinedSFTP(
+                        self.sftp, is_stopped=lambda: self.is_stopped, journal_host=self.journal_host,
+                        throttle=self.throttle)
+
+                if self.stream_tar:
+                    self._stream_tar_task(identifier)
+                elif self.action == 'upload':
                     self._handle_upload_task(
                         identifier, self.local_path, self.remote_path, self.compression, self.upload_context)
                 elif self.action == 'download':
@@ -81,6 +134,7 @@ class TransferWorker(QRunnable):
                         identifier, self.remote_path, self.compression)
 
                 # If we reach here, the operation was successful
+                failed = False
                 return
 
             except paramiko.ssh_exception.ChannelException as e:
@@ -88,6 +142,8 @@ class TransferWorker(QRunnable):
                 tb = traceback.format_exc()
                 print(
                     f"⚠️ ChannelException encountered (attempt {attempts}): {e}\n{tb}")
+                if self.telemetry:
+                    self.telemetry.retry(identifier)
                 print(
                     f"Retrying {identifier} in {retry_delay} second(s)...")
                 time.sleep(retry_delay)
@@ -95,15 +151,33 @@ class TransferWorker(QRunnable):
             except Exception as e:
                 if self.is_stopped:
                     break
+                if self.reconnect and self._connection_lost() and reconnects < self.MAX_RECONNECTS:
+                    # The journal keeps what was confirmed, the retry continues from there
+                    reconnects += 1
+                    if self.telemetry:
+                        self.telemetry.retry(identifier)
+                    delay = min(30, 2 ** reconnects)
+                    print(
+                        f"🔌 连接已断开, {delay}s 后重连并继续传输 {identifier} ({reconnects}/{self.MAX_RECONNECTS}): {e}")
+                    time.sleep(delay)
+                    try:
+                        self.conn, self.sftp_pool = self.reconnect()
+                    except Exception as reconnect_error:
+                        print(f"❌ 重连失败: {reconnect_error}")
+                    continue
                 tb = traceback.format_exc()
                 error_msg = f"TransferWorker Error: {e}\n{tb}"
                 print(f"❌ {error_msg}")
-                self.signals.finished.emit(identifier, False, error_msg)
+                self._report_finished(identifier, False, error_msg)
                 # For non-recoverable errors, break the loop
                 return
             finally:
                 if self.sftp:
-                    self.sftp.close()
+                    if not self.sftp_pool:
+                        self.sftp.close()
+                    elif failed:
+                        # the pooled session may be broken, open a fresh one next time
+                        self.sftp_pool.discard()
                     self.sftp = None  # Reset sftp for next retry
 
         if self.is_stopped:
@@ -111,7 +185,11 @@ class TransferWorker(QRunnable):
                 self.local_path if self.action == 'upload' else self.remote_path)
             error_msg = "Transfer was cancelled by user."
             print(f"🛑 {error_msg} [{identifier}]")
-            self.signals.finished.emit(identifier, False, error_msg)
+            self._report_finished(identifier, False, error_msg)
+
+    def _connection_lost(self) -> bool:
+        transport = self.conn.get_transport() if self.conn else None
+        return transport is None or not transport.is_active()
 
     # ==================================================================================
     # == The following methods are adapted from RemoteFileManager for standalone execution ==
@@ -152,6 +230,8 @@ class TransferWorker(QRunnable):
                                         self._upload_file(
                                             local_file, local_file, remote_path, upload_context)
                         except Exception as e:
+                            if self._connection_lost():
+                                raise
                             tb = traceback.format_exc()
                             all_successful = False
                             error_messages.append(
@@ -160,26 +240,28 @@ class TransferWorker(QRunnable):
                     # Emit a single finished signal for the whole batch
                     final_msg = "; ".join(error_messages)
                     print(f"发送上传钩子:{all_successful}")
-                    self.signals.finished.emit(
+                    self._report_finished(
                         identifier, all_successful, final_msg)
 
             elif isinstance(local_path, str):
                 # Single file or directory
                 status, msg = self._upload_item(identifier, local_path,
                                                 remote_path, compression, upload_context)
-                self.signals.finished.emit(
+                self._report_finished(
                     identifier, status, msg)
         except Exception as e:
+            if self._connection_lost():
+                raise
             tb = traceback.format_exc()
             error_msg = f"Error during upload task: {e}\n{tb}"
             print(f"❌ {error_msg}")
-            self.signals.finished.emit(identifier, False, error_msg)
+            self._report_finished(identifier, False, error_msg)
 
     def _upload_item(self, identifier, item_path, remote_path, compression, upload_context=None):
         """Returns (bool, str) for success status and message, and also emits signals."""
         if not os.path.exists(item_path):
             error_msg = f"Local path does not exist: {item_path}"
-            self.signals.finished.emit(item_path, False, error_msg)
+            self._report_finished(item_path, False, error_msg)
             return False, error_msg
 
         try:
@@ -196,11 +278,59 @@ class TransferWorker(QRunnable):
 
             return True, ""
         except Exception as e:
+            if self._connection_lost():
+                raise
             traceback.print_exc()
             error_msg = f"Failed to upload {item_path}: {e}"
-            self.signals.finished.emit(item_path, False, error_msg)
+            self._report_finished(item_path, False, error_msg)
             return False, error_msg
 
+    def _stream_tar_task(self, identifier):
+        """Upload/download a tree of small files as a single tar stream, no temp archive."""
+        sent = [0]
+
+        def progress_callback(progress, bytes_so_far, total_bytes):
+            if self.throttle and bytes_so_far > sent[0]:
+                self.throttle(bytes_so_far - sent[0])
+            sent[0] = bytes_so_far
+            self._report_progress(
+                identifier, progress, bytes_so_far, total_bytes)
+
+        is_stopped = lambda: self.is_stopped
+        if self.action == 'upload':
+            try:
+                upload_tar_stream(self.conn, self.local_path, self.remote_path,
+                                  progress_callback, is_stopped)
+                self._report_finished(identifier, True, "")
+            except Exception as e:
+                if self.is_stopped or self._connection_lost():
+                    raise
+                tb = traceback.format_exc()
+                self._report_finished(
+                    identifier, False, f"Tar stream upload error: {e}\n{tb}")
+            return
+
+        if hasattr(self, '_open_it') and self._open_it and self.session_id:
+            # 双击编辑：镜像远程路径结构
+            local_base = os.path.join(
+                "tmp", "edit", self.session_id,
+                os.path.dirname(self.remote_path.rstrip('/')).lstrip('/'))
+        else:
+            local_base = "_ssh_download"
+        try:
+            local_target = download_tar_stream(self.conn, self.remote_path, local_base,
+                                               progress_callback, is_stopped)
+            success, msg = True, local_target
+        except Exception as e:
+            if self.is_stopped or self._connection_lost():
+                raise
+            tb = traceback.format_exc()
+            success, msg = False, f"Tar stream download error: {e}\n{tb}"
+        if hasattr(self, '_download_callback'):
+            self._download_callback(identifier, success, msg)
+        else:
+            self._report_finished(identifier, success, msg)
+
     def _upload_list_compressed(self, identifier, path_list, remote_path):
         tmp_dir = "tmp"
         os.makedirs(tmp_dir, exist_ok=True)
@@ -220,11 +350,11 @@ class TransferWorker(QRunnable):
                 identifier, tmp_tar_path, remote_path)
             remote_zip_path = f"{remote_path.rstrip('/')}/{os.path.basename(tmp_tar_path)}"
             self._remote_untar(remote_zip_path, remote_path)
-            self.signals.finished.emit(identifier, True, "")
+            self._report_finished(identifier, True, "")
         except Exception as e:
             tb = traceback.format_exc()
             error_msg = f"Compressed list upload error: {e}\n{tb}"
-            self.signals.finished.emit(identifier, False, error_msg)
+            self._report_finished(identifier, False, error_msg)
             raise e
         finally:
             if os.path.exists(tmp_tar_path):
@@ -247,11 +377,11 @@ class TransferWorker(QRunnable):
                 identifier, tmp_tar_path, remote_path, emit_finish_signal=False)
             remote_zip_path = f"{remote_path.rstrip('/')}/{os.path.basename(tmp_tar_path)}"
             self._remote_untar(remote_zip_path, remote_path)
-            self.signals.finished.emit(identifier, True, "")
+            self._report_finished(identifier, True, "")
         except Exception as e:
             tb = traceback.format_exc()
             error_msg = f"Compressed upload error: {e}\n{tb}"
-            self.signals.finished.emit(identifier, False, error_msg)
+            self._report_finished(identifier, False, error_msg)
             raise e
         finally:
             if os.path.exists(tmp_tar_path):
@@ -279,11 +409,22 @@ class TransferWorker(QRunnable):
             def progress_callback(bytes_so_far, total_bytes):
                 if total_bytes > 0:
                     progress = int((bytes_so_far / total_bytes) * 100)
-                    self.signals.progress.emit(
+                    self._report_progress(
                         identifier, progress, bytes_so_far, total_bytes)
 
-            self.sftp.put(local_path, full_remote_path,
-                          callback=progress_callback)
+            if self.delta:
+                try:
+                    delta_upload(self.conn, local_path, full_remote_path,
+                                 callback=progress_callback)
+                    return
+                except DeltaUnsupported as e:
+                    print(f"ℹ️ 增量上传不可用, 改为完整上传: {e}")
+
+            self.engine.put(local_path, full_remote_path,
+                            callback=progress_callback)
+            if self.sync_mtime is not None:
+                self.sftp.utime(full_remote_path,
+                                (self.sync_mtime, self.sync_mtime))
 
         except Exception as e:
             raise e
@@ -312,18 +453,19 @@ class TransferWorker(QRunnable):
                         current_remote_dir, file).replace('\\', '/')
 
                     file_size = os.path.getsize(local_file_path)
-                    self.sftp.put(local_file_path, remote_file_path)
+                    self.engine.put(local_file_path, remote_file_path)
                     uploaded_size += file_size
                     progress = int((uploaded_size / total_size)
                                    * 100) if total_size > 0 else 100
-                    self.signals.progress.emit(identifier, progress)
+                    self._report_progress(
+                        identifier, progress, uploaded_size, total_size)
 
-            self.signals.finished.emit(
+            self._report_finished(
                 identifier, True, "Directory upload completed.")
         except Exception as e:
             tb = traceback.format_exc()
             error_msg = f"Directory upload error: {e}\n{tb}"
-            self.signals.finished.emit(identifier, False, error_msg)
+            self._report_finished(identifier, False, error_msg)
 
     def _download_files(self, identifier, remote_path, compression):
         # 根据 open_it 标志决定本地基础路径
@@ -352,11 +494,11 @@ class TransferWorker(QRunnable):
                         progress = int((bytes_so_far / total_bytes) * 100)
                         # We can perhaps divide progress for different stages
                         # Assuming download is the main part
-                        self.signals.progress.emit(
+                        self._report_progress(
                             identifier, progress, bytes_so_far, total_bytes)
 
-                self.sftp.get(remote_tar, local_tar_path,
-                              callback=progress_callback)
+                self.engine.get(remote_tar, local_tar_path,
+                                callback=progress_callback)
 
                 with tarfile.open(local_tar_path, "r:gz") as tar:
                     tar.extractall(local_base)
@@ -364,7 +506,7 @@ class TransferWorker(QRunnable):
                 self._exec_remote_command(f'rm -f "{remote_tar}"')
                 os.remove(local_tar_path)
 
-                self.signals.finished.emit(identifier, True, local_base)
+                self._report_finished(identifier, True, local_base)
 
             else:  # Non-compressed
                 # For non-compressed, _download_item will handle its own signals.
@@ -374,16 +516,21 @@ class TransferWorker(QRunnable):
                 # A batch 'finished' signal is not sent here, to allow individual tracking.
 
         except Exception as e:
+            if self._connection_lost():
+                raise
             tb = traceback.format_exc()
             error_msg = f"Error during download task: {e}\n{tb}"
             print(f"❌ {error_msg}")
-            self.signals.finished.emit(identifier, False, error_msg)
+            self._report_finished(identifier, False, error_msg)
 
     def _download_item(self, identifier, remote_item_path, local_base_path):
         """Downloads a single item (file or directory) and emits a finished signal for it."""
         try:
             # 根据 open_it 标志决定本地路径构建方式
-            if hasattr(self, '_open_it') and self._open_it and self.session_id:
+            if self.resume_target:
+                # 继续上次未完成的下载
+                local_target = self.resume_target
+            elif hasattr(self, '_open_it') and self._open_it and self.session_id:
                 # 双击编辑模式：镜像远程路径结构
                 # 移除远程路径开头的斜杠，然后拼接到 local_base_path
                 remote_path_normalized = remote_item_path.lstrip('/')
@@ -425,24 +572,28 @@ class TransferWorker(QRunnable):
             if hasattr(self, '_download_callback'):
                 self._download_callback(identifier, True, local_target)
             else:
-                self.signals.finished.emit(identifier, True, local_target)
+                self._report_finished(identifier, True, local_target)
 
         except Exception as e:
+            if self._connection_lost():
+                raise
             tb = traceback.format_exc()
             error_msg = f"Failed to download {remote_item_path}: {e}\n{tb}"
             if hasattr(self, '_download_callback'):
                 self._download_callback(identifier, False, error_msg)
             else:
-                self.signals.finished.emit(identifier, False, error_msg)
+                self._report_finished(identifier, False, error_msg)
 
     def _download_file(self, identifier, remote_file, local_file):
         def progress_callback(bytes_so_far, total_bytes):
             if total_bytes > 0:
                 progress = int((bytes_so_far / total_bytes) * 100)
-                self.signals.progress.emit(
+                self._report_progress(
                     identifier, progress, bytes_so_far, total_bytes)
 
-        self.sftp.get(remote_file, local_file, callback=progress_callback)
+        self.engine.get(remote_file, local_file, callback=progress_callback)
+        if self.sync_mtime is not None:
+            os.utime(local_file, (self.sync_mtime, self.sync_mtime))
 
     def _download_directory(self, identifier, remote_dir, local_dir):
         os.makedirs(local_dir, exist_ok=True)
@@ -455,7 +606,7 @@ class TransferWorker(QRunnable):
                 self._download_directory(identifier, remote_item, local_item)
             else:
                 # No progress for individual files in a dir download for now
-                self.sftp.get(remote_item, local_item)
+                self.engine.get(remote_item, local_item)
 
     def _remote_tar(self, paths):
         if not paths:
@@ -474,14 +625,35 @@ class TransferWorker(QRunnable):
         return remote_tar_path
 
     def _ensure_remote_directory_exists(self, remote_dir):
+        known = self.known_dirs if self.known_dirs is not None else set()
+        if remote_dir in known:
+            return
         parts = remote_dir.strip('/').split('/')
+        paths = []
         current_path = ''
         for part in parts:
             current_path = f"{current_path}/{part}" if current_path else f"/{part}"
+            paths.append(current_path)
+
+        # Walk up from the deepest directory: usually it already exists and
+        # one stat is enough, otherwise only the missing tail is created.
+        missing = []
+        for path in reversed(paths):
+            if path in known:
+                break
             try:
-                self.sftp.stat(current_path)
+                self.sftp.stat(path)
+                break
             except FileNotFoundError:
-                self.sftp.mkdir(current_path)
+                missing.append(path)
+        for path in reversed(missing):
+            try:
+                self.sftp.mkdir(path)
+            except IOError:
+                # another worker of the batch may have created it meanwhile
+                self.sftp.stat(path)
+        known.update(paths)
+        known.add(remote_dir)
 
     def _remote_untar(self, remote_tar_path, target_dir):
         self.signals.start_to_uncompression.emit(remote_tar_path)
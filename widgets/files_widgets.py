@@ -2,15 +2,21 @@
 from PyQt5.QtWidgets import (QApplication, QWidget, QLayout, QSizePolicy,
                              QRubberBand,  QVBoxLayout, QTableView, QHeaderView, QAbstractItemDelegate, QStyledItemDelegate, QStyle, QFileDialog)
 from PyQt5.QtGui import QFont, QPainter, QColor, QStandardItemModel, QStandardItem
-from PyQt5.QtCore import Qt, QRect, QSize, QPoint, pyqtSignal
+from PyQt5.QtCore import Qt, QRect, QSize, QPoint, QTimer, pyqtSignal
 from qfluentwidgets import RoundMenu, Action, FluentIcon as FIF, LineEdit, ScrollArea, TableView, CheckableMenu
 import os
 import time
+from collections import deque
 from qfluentwidgets import isDarkTheme
 from tools.setting_config import SCM
 
 configer = SCM()
 
+# entries turned into widgets/rows per event loop turn while a listing is shown
+RENDER_CHUNK = 200
+# details view: directories first, then case-insensitive name
+SORT_ROLE = Qt.UserRole + 1
+
 
 def _format_size(size_bytes):
     """Format size in bytes to a human-readable string."""
@@ -89,6 +95,11 @@ class FlowLayout(QLayout):
     def takeAt(self, index):
         return self.itemList.pop(index) if 0 <= index < len(self.itemList) else None
 
+    def sort_items(self, key):
+        """Reorder the items by key(widget) without recreating them."""
+        self.itemList.sort(key=lambda item: key(item.widget()))
+        self.invalidate()
+
     def expandingDirections(self):
         return Qt.Orientations(Qt.Orientation(0))
 
@@ -148,6 +159,8 @@ class FileActionsManager:
         self.copy_path = self.actions["copy_path"]
         self.info = self.actions["info"]
         self.rename = self.actions["rename"]
+        self.sync_upload = self.actions["sync_upload"]
+        self.sync_download = self.actions["sync_download"]
 
         self.pick.triggered.connect(lambda: action_emitter('pick'))
         self.copy.triggered.connect(lambda: action_emitter('copy'))
@@ -160,6 +173,10 @@ class FileActionsManager:
             lambda: action_emitter('copy_path'))
         self.info.triggered.connect(lambda: action_emitter('info'))
         self.rename.triggered.connect(rename_handler)
+        self.sync_upload.triggered.connect(
+            lambda: action_emitter('sync_upload'))
+        self.sync_download.triggered.connect(
+            lambda: action_emitter('sync_download'))
 
     def get_all_actions(self):
         """Returns a list of all managed actions for menu creation."""
@@ -172,7 +189,9 @@ class FileActionsManager:
             self.download_compression,
             self.copy_path,
             self.info,
-            self.rename
+            self.rename,
+            self.sync_upload,
+            self.sync_download
         ]
 # ---------------- FileItem ----------------
 
@@ -553,7 +572,9 @@ class DetailItem(QWidget):
         entries = _normalize_files_data(files)
         # Sort by name, with directories first
         entries.sort(key=lambda x: (not x[1], x[0].lower()))
+        self._append_rows(entries)
 
+    def _append_rows(self, entries):
         for name, is_dir, size, mod_time, perms, owner in entries:
             # For files, always format size (even if 0 or empty)
             # For directories, show empty string
@@ -561,6 +582,7 @@ class DetailItem(QWidget):
             item_name = QStandardItem(name)
             # Store is_dir flag in the item itself for later retrieval
             item_name.setData(is_dir, Qt.UserRole)
+            item_name.setData(("0" if is_dir else "1") + name.lower(), SORT_ROLE)
 
             row = [
                 item_name,
@@ -572,6 +594,11 @@ class DetailItem(QWidget):
 
             self.details_model.appendRow(row)
 
+    def sort_rows(self):
+        """Directories first, then by name (rows that arrived unsorted)."""
+        self.details_model.setSortRole(SORT_ROLE)
+        self.details_model.sort(0)
+
     def rename_selected_item(self):
         """Make the selected file name editable"""
         indexes = self.details_view.selectionModel().selectedRows()
@@ -695,6 +722,14 @@ class FileExplorer(QWidget):
         self.cut_ = False
         self.path = path
         self._is_loading = False
+        # Listing rendered a chunk per event loop turn (begin/append/finish_files)
+        self._pending_entries = deque()
+        self._listing_done = True
+        self._listing_unsorted = False
+        self._render_start = None
+        self._render_timer = QTimer(self)
+        self._render_timer.setInterval(0)
+        self._render_timer.timeout.connect(self._render_pending)
 
         # Icon view
         self.scroll_area = ScrollArea(self)
@@ -880,6 +915,8 @@ class FileExplorer(QWidget):
             "copy_path": Action(FIF.FLAG, self.tr("Copy Path")),
             "info": Action(FIF.INFO, self.tr("File permissions settings")),
             "rename": Action(FIF.LABEL, self.tr("Rename")),
+            "sync_upload": Action(FIF.SYNC, self.tr("Sync from local folder")),
+            "sync_download": Action(FIF.SYNC, self.tr("Mirror to local folder")),
         }
 
     def switch_view(self, view_type):
@@ -913,18 +950,95 @@ class FileExplorer(QWidget):
         end_time = time.perf_counter()
         print(f"渲染文件列表到视图耗时: {end_time - start_time:.4f} 秒")
 
+    def begin_files(self):
+        """
+        Clear the view for a listing that arrives in batches: append_files()
+        for each batch, then finish_files(). Entries are rendered a chunk per
+        event loop turn, so the first ones can be used while the rest load.
+        """
+        self._render_timer.stop()
+        self._pending_entries.clear()
+        self._listing_done = False
+        self._listing_unsorted = False
+        self._is_loading = True
+        self._render_start = time.perf_counter()
+        if self.view_mode == "icon":
+            self.container.setUpdatesEnabled(False)
+            self._clear_icon_view()
+            self.container.setUpdatesEnabled(True)
+        else:
+            self.details.details_model.setRowCount(0)
+
+    def append_files(self, files):
+        """Add a batch of a listing started with begin_files (any order)."""
+        self._pending_entries.extend(_normalize_files_data(files))
+        self._listing_unsorted = True
+        if not self._render_timer.isActive():
+            self._render_pending()
+
+    def finish_files(self):
+        """The listing is complete: sort what was appended once it is rendered."""
+        self._listing_done = True
+        if not self._render_timer.isActive():
+            self._render_pending()
+
+    def show_files(self, files):
+        """Replace the view with a complete listing, rendered progressively."""
+        entries = _normalize_files_data(files)
+        entries.sort(key=lambda x: (not x[1], x[0].lower()))
+        self.begin_files()
+        self._pending_entries.extend(entries)
+        self.finish_files()
+
+    def _render_pending(self):
+        count = min(RENDER_CHUNK, len(self._pending_entries))
+        chunk = [self._pending_entries.popleft() for _ in range(count)]
+        if chunk:
+            if self.view_mode == "icon":
+                self.container.setUpdatesEnabled(False)
+                self._append_icon_items(chunk)
+                self.container.setUpdatesEnabled(True)
+                self.container.update()
+            else:
+                self.details._append_rows(chunk)
+        if self._pending_entries:
+            if not self._render_timer.isActive():
+                self._render_timer.start()
+            return
+        self._render_timer.stop()
+        if self._listing_done and self._render_start is not None:
+            if self._listing_unsorted:
+                if self.view_mode == "icon":
+                    self.flow_layout.sort_items(
+                        lambda w: (not w.is_dir, w.name.lower()))
+                else:
+                    self.details.sort_rows()
+                self._listing_unsorted = False
+            self._is_loading = False
+            self.dataRefreshed.emit()
+            print(f"渲染文件列表到视图耗时: {time.perf_counter() - self._render_start:.4f} 秒")
+            self._render_start = None
+
+    def _clear_icon_view(self):
+        while self.flow_layout.count():
+            item = self.flow_layout.takeAt(0)
+            if item and item.widget():
+                item.widget().deleteLater()
+        self.selected_items.clear()
+
     def _add_files_to_icon_view(self, files, clear_old=True):
         self.container.setUpdatesEnabled(False)
         if clear_old:
-            while self.flow_layout.count():
-                item = self.flow_layout.takeAt(0)
-                if item and item.widget():
-                    item.widget().deleteLater()
-            self.selected_items.clear()
+            self._clear_icon_view()
 
         entries = _normalize_files_data(files)
         entries.sort(key=lambda x: (not x[1], x[0].lower()))
+        self._append_icon_items(entries)
+
+        self.container.setUpdatesEnabled(True)
+        self.container.update()
 
+    def _append_icon_items(self, entries):
         for name, is_dir, *_ in entries:
             item_widget = FileItem(
                 name, is_dir, parent=self.container, explorer=self)
@@ -943,9 +1057,6 @@ class FileExplorer(QWidget):
             item_widget.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
             self.flow_layout.addWidget(item_widget)
 
-        self.container.setUpdatesEnabled(True)
-        self.container.update()
-
     def select_item(self, item, ctrl=False):
         if ctrl:
             if item in self.selected_items:
@@ -1010,6 +1121,12 @@ class FileExplorer(QWidget):
                 self.copy_file_path = []  # Reset after paste
             return
 
+        if action_type in ("sync_upload", "sync_download"):
+            # Only directories can be synchronised
+            if is_dir:
+                self.file_action.emit(action_type, full_path, "", False)
+            return
+
         if action_type in ["rename", "mkdir", "mkfile"]:
             full_path = full_path
             if action_type == "rename" and new_name:
@@ -1,4 +1,6 @@
 import time
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
 from PyQt5.QtWidgets import (
     QWidget, QHBoxLayout, QLabel, QProgressBar, QFrame, QSizePolicy
 )
@@ -59,6 +61,36 @@ class ThinProgressBar(QProgressBar):
     def set_chunk_color(self, color: str):
         self.setStyleSheet(self._base_style % color)
 
+# ---------- History sparkline ----------
+
+
+class Sparkline(QWidget):
+    """Tiny line chart of a 0-100 percentage history."""
+
+    def __init__(self, color="#00bcd4", width=60, height=18):
+        super().__init__()
+        self._color = QColor(color)
+        self._values = []
+        self.setFixedSize(width, height)
+        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+
+    def set_values(self, values):
+        self._values = list(values)
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self._values) < 2:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(self._color, 1.2))
+        w, h = self.width() - 1, self.height() - 2
+        step = w / (len(self._values) - 1)
+        points = [QPointF(i * step, 1 + h - max(0.0, min(100.0, v)) / 100 * h)
+                  for i, v in enumerate(self._values)]
+        painter.drawPolyline(QPolygonF(points))
+        painter.end()
+
 # ---------- Main monitor bar ----------
 
 
@@ -88,6 +120,7 @@ class MonitorBar(QWidget):
         self.cpu_text = QLabel("-")
         self.cpu_text.setStyleSheet(
             "color:#cfcfcf; font-size:12px; min-width:44px;")
+        self.cpu_spark = Sparkline(color="#00bcd4")
 
         # RAM
         self.ram_dot = small_dot("#ff9800")
@@ -97,6 +130,7 @@ class MonitorBar(QWidget):
         self.ram_text = QLabel("-")
         self.ram_text.setStyleSheet(
             "color:#cfcfcf; font-size:12px; min-width:44px;")
+        self.ram_spark = Sparkline(color="#ff9800")
 
         # Disk
         # self.disk_dot = small_dot("#4caf50")
@@ -125,6 +159,7 @@ class MonitorBar(QWidget):
         layout.addWidget(self.cpu_label)
         layout.addWidget(self.cpu_bar)
         layout.addWidget(self.cpu_text)
+        layout.addWidget(self.cpu_spark)
         layout.addWidget(vline())
 
         # RAM block
@@ -132,6 +167,7 @@ class MonitorBar(QWidget):
         layout.addWidget(self.ram_label)
         layout.addWidget(self.ram_bar)
         layout.addWidget(self.ram_text)
+        layout.addWidget(self.ram_spark)
         layout.addWidget(vline())
 
         # # Disk block
@@ -163,6 +199,63 @@ class MonitorBar(QWidget):
             "net_down_kbps": 0.0
         }
 
+        # 历史数据: callable(metric_name, span_seconds) -> (timestamps, values)
+        self._history_source = None
+        self._net_interface = None
+        self._history_drawn_at = 0
+        self.history_span = 3600
+        self.history_refresh_interval = 10
+        self.cpu_spark.hide()
+        self.ram_spark.hide()
+
+    def set_history_source(self, source, net_interface=None):
+        """
+        设置历史数据来源 (MetricsStore.history), 启用迷你曲线和历史统计提示。
+        net_interface 为网速提示使用的网卡。
+        """
+        self._history_source = source
+        self._net_interface = net_interface
+        self.cpu_spark.setVisible(source is not None)
+        self.ram_spark.setVisible(source is not None)
+        self._history_drawn_at = 0
+
+    def _history_summary(self, metric: str, fmt) -> str:
+        lines = []
+        for label, span in (("1h", 3600), ("24h", 24 * 3600)):
+            _, values = self._history_source(metric, span)
+            if values:
+                lines.append(f"{label}  min {fmt(min(values))}  avg {fmt(sum(values) / len(values))}"
+                             f"  max {fmt(max(values))}")
+        return "\n".join(lines)
+
+    def _refresh_history(self):
+        now = time.time()
+        if now - self._history_drawn_at < self.history_refresh_interval:
+            return
+        self._history_drawn_at = now
+        source = self._history_source
+        self.cpu_spark.set_values(source("cpu", self.history_span)[1])
+        self.ram_spark.set_values(source("mem", self.history_span)[1])
+
+        def pct(v):
+            return f"{v:.0f}%"
+        for widget, title, metric, fmt in (
+                (self.cpu_spark, "CPU", "cpu", pct),
+                (self.ram_spark, "内存", "mem", pct),
+                (self.load_lbl, "Load 1m", "load1", lambda v: f"{v:.2f}")):
+            summary = self._history_summary(metric, fmt)
+            widget.setToolTip(f"{title}\n{summary}" if summary else "")
+        iface = self._net_interface
+        if iface:
+            up = self._history_summary(f"net:{iface}:tx", nice_speed_from_kb)
+            down = self._history_summary(f"net:{iface}:rx", nice_speed_from_kb)
+            self.net_text.setToolTip(f"{iface} ↑\n{up}\n{iface} ↓\n{down}")
+
+    def set_net_interface(self, iface: str):
+        if iface != self._net_interface:
+            self._net_interface = iface
+            self._history_drawn_at = 0
+
     def update_metrics(self, metrics: dict):
         """
         更新 UI 的 API。
@@ -239,6 +332,9 @@ class MonitorBar(QWidget):
         #     f"background:{disk_color}; border-radius:5px;")
         # net dot purple stays constant for clarity
 
+        if self._history_source is not None:
+            self._refresh_history()
+
     def set_font_family(self, font_family: str):
         if font_family and font_family != self._font_family:
             self._font_family = font_family
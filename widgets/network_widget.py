@@ -1,9 +1,16 @@
+import time
+
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtWidgets import QVBoxLayout, QLabel, QHBoxLayout, QFrame
 from qfluentwidgets import CardWidget, ComboBox
 import pyqtgraph as pg
 
 
+# 历史范围 (显示名, 秒), 0 为实时
+HISTORY_RANGES = (("实时", 0), ("1 小时", 3600),
+                  ("6 小时", 6 * 3600), ("24 小时", 24 * 3600))
+
+
 class NetMonitor(CardWidget):
     clicked = pyqtSignal()
     interface_changed = pyqtSignal(str)  # 网卡切换信号
@@ -59,6 +66,12 @@ class NetMonitor(CardWidget):
         self.min_y_range = 100
         self.max_y_range = 1000000
 
+        # 历史数据来源: callable(metric_name, span_seconds) -> (timestamps, values)
+        self.history_source = None
+        self.history_span = 0
+        self._history_drawn_at = 0
+        self.history_refresh_interval = 5
+
     def _create_interface_selector(self, parent_layout):
         """创建网卡选择器"""
         interface_layout = QHBoxLayout()
@@ -74,6 +87,12 @@ class NetMonitor(CardWidget):
         interface_layout.addWidget(self.interface_combo)
 
         interface_layout.addStretch()
+
+        self.range_combo = ComboBox()
+        self.range_combo.addItems([name for name, _ in HISTORY_RANGES])
+        self.range_combo.setEnabled(False)
+        self.range_combo.currentIndexChanged.connect(self._on_range_changed)
+        interface_layout.addWidget(self.range_combo)
         parent_layout.addLayout(interface_layout)
 
     def _create_speed_labels(self, parent_layout):
@@ -164,12 +183,15 @@ class NetMonitor(CardWidget):
             self.download_data = self.all_interfaces_data[interface_name]['download_data']
 
             # 更新图表
-            x = list(range(len(self.upload_data)))
-            self.upload_curve.setData(x, self.upload_data)
-            self.download_curve.setData(x, self.download_data)
+            if self.history_span:
+                self._show_history()
+            else:
+                x = list(range(len(self.upload_data)))
+                self.upload_curve.setData(x, self.upload_data)
+                self.download_curve.setData(x, self.download_data)
 
-            # 自动调整Y轴范围
-            self._auto_adjust_y_range()
+                # 自动调整Y轴范围
+                self._auto_adjust_y_range()
 
             # 更新标签显示最新速度
             if self.upload_data:
@@ -185,13 +207,15 @@ class NetMonitor(CardWidget):
 
             self.interface_changed.emit(interface_name)
 
-    def _auto_adjust_y_range(self):
+    def _auto_adjust_y_range(self, upload_data=None, download_data=None):
         """自动调整Y轴范围到最佳比例"""
-        if not self.auto_adjust_enabled or not self.upload_data:
+        upload_data = self.upload_data if upload_data is None else upload_data
+        download_data = self.download_data if download_data is None else download_data
+        if not self.auto_adjust_enabled or not upload_data:
             return
 
-        max_upload = max(self.upload_data) if self.upload_data else 0
-        max_download = max(self.download_data) if self.download_data else 0
+        max_upload = max(upload_data) if upload_data else 0
+        max_download = max(download_data) if download_data else 0
         max_speed = max(max_upload, max_download)
 
         if max_speed == 0:
@@ -232,7 +256,13 @@ class NetMonitor(CardWidget):
             target_download_data.pop(0)
 
         # 如果是当前选中的网卡，更新显示
-        if target_interface == self.current_interface:
+        if target_interface == self.current_interface and self.history_span:
+            self.upload_label.setText(f"{self.format_speed(upload_kbps)}")
+            self.download_label.setText(f"{self.format_speed(download_kbps)}")
+            # 历史曲线按低频刷新即可
+            if time.time() - self._history_drawn_at >= self.history_refresh_interval:
+                self._show_history()
+        elif target_interface == self.current_interface:
             x = list(range(len(target_upload_data)))
             self.upload_curve.setData(x, target_upload_data)
             self.download_curve.setData(x, target_download_data)
@@ -248,6 +278,50 @@ class NetMonitor(CardWidget):
             self.plot_widget.update()
             self.plot_widget.repaint()
 
+    def set_history_source(self, source):
+        """
+        设置历史数据来源, 启用范围选择
+
+        Args:
+            source: callable(metric_name, span_seconds) -> (timestamps, values),
+                    metric_name 形如 "net:eth0:tx"
+        """
+        self.history_source = source
+        self.range_combo.setEnabled(source is not None)
+        if source is None and self.history_span:
+            self.range_combo.setCurrentIndex(0)
+
+    def _on_range_changed(self, index):
+        """切换实时 / 历史显示"""
+        if index < 0 or index >= len(HISTORY_RANGES):
+            return
+        self.history_span = HISTORY_RANGES[index][1] if self.history_source else 0
+        if self.history_span:
+            self._show_history()
+        else:
+            self.plot_widget.setXRange(0, self.max_points)
+            x = list(range(len(self.upload_data)))
+            self.upload_curve.setData(x, self.upload_data)
+            self.download_curve.setData(x, self.download_data)
+            self._auto_adjust_y_range()
+
+    def _show_history(self):
+        """从历史数据绘制当前网卡最近 history_span 秒的曲线, x 轴为距现在的秒数"""
+        if not self.history_source or not self.current_interface:
+            return
+        now = time.time()
+        self._history_drawn_at = now
+        prefix = f"net:{self.current_interface}"
+        up_t, up_v = self.history_source(f"{prefix}:tx", self.history_span)
+        down_t, down_v = self.history_source(f"{prefix}:rx", self.history_span)
+        self.upload_curve.setData([t - now for t in up_t], up_v)
+        self.download_curve.setData([t - now for t in down_t], down_v)
+        self.plot_widget.setXRange(-self.history_span, 0)
+        if up_v or down_v:
+            self._auto_adjust_y_range(up_v or [0], down_v or [0])
+        else:
+            self.plot_widget.setYRange(0, 1000)
+
     def format_speed(self, value: float) -> str:
         """根据 KB/s 数值自动选择单位显示"""
         if value >= 1_000_000:  # GB/s
@@ -18,6 +18,7 @@ from qfluentwidgets import (
 
 from tools.font_config import font_config
 from tools.setting_config import SCM
+from tools.transfer_scheduler import TransferScheduler
 from tools.image_color_extractor import ImageColorExtractor
 
 
@@ -642,6 +643,43 @@ class SettingPage(ScrollArea):
         self._register_searchable(self.cd_follow, self.tr("Follow CD Directory"), [
                                   "cd", "directory", "follow", "file manager"])
 
+        self.fast_forward_card = SwitchSettingCard(
+            icon=FluentIcon.SPEED_HIGH,
+            title=self.tr("Terminal Fast-Forward"),
+            content=self.tr(
+                "Skip intermediate output of noisy commands and only render the latest screen"),
+            parent=self
+        )
+        self.fast_forward_card.checkedChanged.connect(self._set_fast_forward)
+        layout.addWidget(self.fast_forward_card)
+        self._register_searchable(self.fast_forward_card, self.tr("Terminal Fast-Forward"), [
+                                  "fast", "forward", "terminal", "output", "快进"])
+
+        self.monitor_agent_card = SwitchSettingCard(
+            icon=FluentIcon.DEVELOPER_TOOLS,
+            title=self.tr("Native Monitor Agent"),
+            content=self.tr(
+                "Collect server resources with a single python3 process instead of the shell script (applies to new connections)"),
+            parent=self
+        )
+        self.monitor_agent_card.checkedChanged.connect(self._set_monitor_agent)
+        layout.addWidget(self.monitor_agent_card)
+        self._register_searchable(self.monitor_agent_card, self.tr("Native Monitor Agent"), [
+                                  "monitor", "agent", "python", "resources", "监控"])
+
+        self.metrics_persist_card = SwitchSettingCard(
+            icon=FluentIcon.HISTORY,
+            title=self.tr("Keep Resource History"),
+            content=self.tr(
+                "Save CPU / memory / disk / network history of each host to disk so it survives restarts (applies to new connections)"),
+            parent=self
+        )
+        self.metrics_persist_card.checkedChanged.connect(
+            self._set_metrics_persist)
+        layout.addWidget(self.metrics_persist_card)
+        self._register_searchable(self.metrics_persist_card, self.tr("Keep Resource History"), [
+                                  "history", "metrics", "resources", "persist", "历史"])
+
         self.font_select = PushSettingCard(
             self.tr("Set Font"),
             FluentIcon.FONT,
@@ -760,6 +798,42 @@ class SettingPage(ScrollArea):
         self._register_searchable(self.transfer_card, self.tr("Max Concurrent Transfers"), [
                                   "transfer", "concurrent", "uploads", "downloads", "concurrency"])
 
+        self.sftp_window_card = SettingCard(
+            FluentIcon.SYNC,
+            self.tr("SFTP Request Window"),
+            self.tr(
+                "Number of SFTP requests kept in flight per file; raise it for high-latency links (1-1024)"),
+        )
+        self.sftp_window_edit = LineEdit(self.sftp_window_card)
+        self.sftp_window_edit.setValidator(QIntValidator(1, 1024))
+        self.sftp_window_edit.setFixedWidth(150)
+        self.sftp_window_edit.editingFinished.connect(
+            self._save_sftp_window_from_edit)
+        self.sftp_window_card.hBoxLayout.addWidget(
+            self.sftp_window_edit, 0, Qt.AlignRight)
+        layout.addWidget(self.sftp_window_card)
+
+        self._register_searchable(self.sftp_window_card, self.tr("SFTP Request Window"), [
+                                  "sftp", "window", "pipeline", "latency", "transfer", "传输"])
+
+        self.rate_limit_card = SettingCard(
+            FluentIcon.SPEED_OFF,
+            self.tr("Transfer Bandwidth Limit"),
+            self.tr(
+                "Total upload/download speed of all sessions in KB/s (0 = unlimited)"),
+        )
+        self.rate_limit_edit = LineEdit(self.rate_limit_card)
+        self.rate_limit_edit.setValidator(QIntValidator(0, 10000000))
+        self.rate_limit_edit.setFixedWidth(150)
+        self.rate_limit_edit.editingFinished.connect(
+            self._save_rate_limit_from_edit)
+        self.rate_limit_card.hBoxLayout.addWidget(
+            self.rate_limit_edit, 0, Qt.AlignRight)
+        layout.addWidget(self.rate_limit_card)
+
+        self._register_searchable(self.rate_limit_card, self.tr("Transfer Bandwidth Limit"), [
+                                  "bandwidth", "speed", "limit", "rate", "transfer", "限速"])
+
         # External Editor Setting Card
         self.external_editor_card = SettingCard(
             FluentIcon.EDIT,
@@ -854,6 +928,20 @@ class SettingPage(ScrollArea):
             value = int(text)
             if value > 0:
                 configer.revise_config("max_concurrent_transfers", value)
+                TransferScheduler.instance().reload_config()
+
+    def _save_rate_limit_from_edit(self):
+        text = self.rate_limit_edit.text()
+        if text.isdigit():
+            configer.revise_config("transfer_rate_limit_kb", int(text))
+            TransferScheduler.instance().reload_config()
+
+    def _save_sftp_window_from_edit(self):
+        text = self.sftp_window_edit.text()
+        if text.isdigit():
+            value = int(text)
+            if 0 < value <= 1024:
+                configer.revise_config("sftp_window", value)
 
     def _on_default_view_changed(self, index: int):
         view_map = {0: ("icon", "图标"), 1: ("details", "详情")}
@@ -895,6 +983,18 @@ class SettingPage(ScrollArea):
         self.follow_ = self.cd_follow.switchButton.isChecked()
         configer.revise_config("follow_cd", self.follow_)
 
+    def _set_fast_forward(self):
+        configer.revise_config(
+            "terminal_fast_forward", self.fast_forward_card.switchButton.isChecked())
+
+    def _set_monitor_agent(self):
+        configer.revise_config(
+            "monitor_agent", self.monitor_agent_card.switchButton.isChecked())
+
+    def _set_metrics_persist(self):
+        configer.revise_config(
+            "metrics_persist", self.metrics_persist_card.switchButton.isChecked())
+
     def _clear_bg_pic_to_config(self):
         configer.revise_config("bg_pic", None)
         configer.revise_config("bg_theme_color", None)
@@ -946,6 +1046,12 @@ class SettingPage(ScrollArea):
         self.cfg.sizes.value = self.config["font_size"]
         self.lock_ratio_card.setChecked(self.config["locked_ratio"])
         self.cd_follow.setChecked(self.config["follow_cd"])
+        self.fast_forward_card.setChecked(
+            self.config.get("terminal_fast_forward", False))
+        self.monitor_agent_card.setChecked(
+            self.config.get("monitor_agent", True))
+        self.metrics_persist_card.setChecked(
+            self.config.get("metrics_persist", False))
         self.single_click_card.setChecked(
             self.config.get("file_tree_single_click", False))
         self.parent_class.set_global_background(self.config["bg_pic"])
@@ -954,6 +1060,10 @@ class SettingPage(ScrollArea):
             "default_view", "icon") == "icon" else "Info"
         self.transfer_edit.setText(
             str(self.config.get("max_concurrent_transfers", 4)))
+        self.sftp_window_edit.setText(
+            str(self.config.get("sftp_window", 64)))
+        self.rate_limit_edit.setText(
+            str(self.config.get("transfer_rate_limit_kb", 0)))
         self.external_editor_edit.setText(
             self.config.get("external_editor", ""))
         # Achieve results
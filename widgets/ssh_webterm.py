@@ -24,13 +24,14 @@ import base64
 import json
 import html
 from collections import deque
-from PyQt5.QtCore import Qt, QObject, pyqtSignal, pyqtSlot, QUrl
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, pyqtSlot, QUrl, QTimer
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QSizePolicy, QHBoxLayout, QApplication
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from PyQt5.QtWebChannel import QWebChannel
 import PyQt5.QtCore as qc
 from tools.setting_config import SCM
+from tools.scrollback_buffer import ScrollbackBuffer
 import re
 import os
 from PyQt5.QtWidgets import QShortcut
@@ -54,35 +55,68 @@ class TerminalBridge(QObject):
     """
     Bridge object exposed to JavaScript via QWebChannel.
 
+    Output from the SSHWorker is coalesced into one message per animation frame.
+    JS acknowledges every frame after xterm has parsed it (ackOutput); while more
+    than HIGH_WATER bytes are unacknowledged the worker stops reading the channel,
+    or, in fast-forward mode, intermediate output is not rendered, only the tail
+    (Python-side consumers still receive all of it).
+
     Signals:
         output(str) : emits base64-encoded bytes from SSHWorker to JS.
+        raw_output(bytes) : every byte of output, for Python-side consumers
+            (scrollback, command capture), including what fast-forward skips.
         ready() : emits when frontend is ready.
         scrollPositionChanged(int) : emits scroll position from JS to Python.
         directoryChanged(str) : emits directory change events.
     """
     output = pyqtSignal(str)
+    raw_output = pyqtSignal(bytes)
     ready = pyqtSignal()
     directoryChanged = pyqtSignal(str)
 
+    FRAME_INTERVAL_MS = 16
+    HIGH_WATER = 512 * 1024
+    LOW_WATER = 128 * 1024
+    FAST_FORWARD_KEEP = 64 * 1024
+
     def __init__(self, parent=None, user_name=None, home_path=None):
         super().__init__(parent)
         self.worker = None
         self.current_directory = "/"
         self._input_buffer = ""  # 用户输入缓冲
         self.username = user_name
+
+        # Output pipeline state
+        self._pending = bytearray()
+        self._in_flight = 0  # bytes sent to JS but not yet acknowledged
+        self._frontend_ready = False
+        self._reading_paused = False
+        self.fast_forward = configer.read_config().get(
+            "terminal_fast_forward", False)
+        # output was skipped by fast-forward: the next frame starts clean
+        self._skipped = False
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.setInterval(self.FRAME_INTERVAL_MS)
+        self._frame_timer.timeout.connect(self._flush_frame)
         # self.home_path = home_path
         # print(home_path)
 
     def set_worker(self, worker):
         """Attach an SSHWorker. The worker must emit bytes via result_ready signal."""
         if self.worker is not None:
+            # don't leave the detached worker blocked
+            self._set_reading_paused(False)
             try:
                 self.worker.result_ready.disconnect(self._on_worker_output)
             except Exception:
                 pass
         self.worker = worker
+        self.reset_flow_control()
         if worker:
             worker.result_ready.connect(self._on_worker_output)
+            if hasattr(worker, "attach_output"):
+                worker.attach_output()
 
     def _process_user_input(self, data: bytes):
         """
@@ -189,13 +223,81 @@ class TerminalBridge(QObject):
             print(f"_process_command error: {e}")
 
     def _on_worker_output(self, chunk: bytes):
-        """Encode bytes -> base64 and emit to JS."""
+        """Queue worker bytes; they are sent to JS once per frame."""
+        self._pending += chunk
+        backlog = self._in_flight >= self.HIGH_WATER or not self._frontend_ready
+        if backlog and len(self._pending) > self.HIGH_WATER:
+            if self.fast_forward:
+                self._drop_intermediate_frames()
+            else:
+                self._set_reading_paused(True)
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def _drop_intermediate_frames(self):
+        """
+        Fast-forward: render only the newest output, starting at a line boundary.
+        The skipped bytes still go to raw_output, only xterm doesn't see them.
+        """
+        tail = self._pending[-self.FAST_FORWARD_KEEP:]
+        newline = tail.find(b"\n")
+        if 0 <= newline < len(tail) - 1:
+            tail = tail[newline + 1:]
+        skipped = bytes(self._pending[:len(self._pending) - len(tail)])
+        self._pending = bytearray(tail)
+        self._skipped = True
         try:
-            b64 = base64.b64encode(chunk).decode("ascii")
-            self.output.emit(b64)
+            self.raw_output.emit(skipped)
         except Exception as e:
             print(f"处理输出时出错: {e}")
 
+    def _flush_frame(self):
+        """Encode the coalesced frame -> base64 and emit to JS."""
+        if not self._pending:
+            return
+        if not self._frontend_ready or self._in_flight >= self.HIGH_WATER:
+            # xterm is still busy, ackOutput() will reschedule the flush
+            return
+        frame = bytes(self._pending)
+        self._pending.clear()
+        rendered = b"\x1b[0m\r\n" + frame if self._skipped else frame
+        self._skipped = False
+        self._in_flight += len(rendered)
+        try:
+            self.raw_output.emit(frame)
+            self.output.emit(base64.b64encode(rendered).decode("ascii"))
+        except Exception as e:
+            print(f"处理输出时出错: {e}")
+
+    def reset_flow_control(self):
+        """New (or no) worker: nothing is in flight or paused, settings are re-read."""
+        self._in_flight = 0
+        self._reading_paused = False
+        self.fast_forward = configer.read_config().get(
+            "terminal_fast_forward", False)
+
+    def _set_reading_paused(self, paused: bool):
+        if paused == self._reading_paused or not self.worker:
+            return
+        self._reading_paused = paused
+        try:
+            if paused:
+                self.worker.pause_output()
+            else:
+                self.worker.resume_output()
+        except Exception as e:
+            print(f"切换终端读取状态失败: {e}")
+
+    @pyqtSlot(int)
+    def ackOutput(self, nbytes: int):
+        """JS -> Python: xterm finished parsing nbytes of output"""
+        self._in_flight = max(0, self._in_flight - nbytes)
+        if self._in_flight <= self.LOW_WATER:
+            if len(self._pending) <= self.HIGH_WATER:
+                self._set_reading_paused(False)
+            if self._pending and not self._frame_timer.isActive():
+                self._frame_timer.start()
+
     @pyqtSlot(str)
     def sendInput(self, b64: str):
         """JS -> Python: base64-encoded user input"""
@@ -221,6 +323,10 @@ class TerminalBridge(QObject):
 
     @pyqtSlot()
     def notifyReady(self):
+        self._frontend_ready = True
+        self._in_flight = 0
+        if self._pending:
+            self._frame_timer.start()
         self.ready.emit()
 
     @pyqtSlot(str)
@@ -342,11 +448,12 @@ class WebTerminal(QWidget):
 
         self.view.page().loadFinished.connect(self._on_page_loaded)
 
-        self.terminal_texts = ""
+        self.scrollback = ScrollbackBuffer(
+            max_lines=config.get("terminal_scrollback_lines", 5000))
         self._terminal_texts_max = 1500
         if config["aigc_open"]:
             try:
-                self.bridge.output.connect(self._on_bridge_output)
+                self.bridge.raw_output.connect(self._on_bridge_output)
             except Exception:
                 pass
 
@@ -568,7 +675,7 @@ class WebTerminal(QWidget):
         except Exception:
             pass
         try:
-            self.terminal_texts = ""
+            self.scrollback.clear()
         except Exception:
             pass
         # 2️⃣ 注销 worker
@@ -578,9 +685,13 @@ class WebTerminal(QWidget):
                     self.bridge._on_worker_output)
             except Exception:
                 pass
+            self.bridge._set_reading_paused(False)
             self.bridge.worker = None
 
-        # 3️⃣ 清空输入缓冲
+        # 3️⃣ 清空输入/输出缓冲
+        self.bridge._frame_timer.stop()
+        self.bridge._pending.clear()
+        self.bridge.reset_flow_control()
         self.bridge._input_buffer = ""
         self.bridge.current_directory = "/"
 
@@ -610,24 +721,19 @@ class WebTerminal(QWidget):
             parent_layout.removeWidget(self)
         self.setParent(None)
 
-    def _on_bridge_output(self, b64: str):
+    @property
+    def terminal_texts(self) -> str:
+        """Most recent plain terminal text, used as context for the AI prompt."""
+        return self.scrollback.tail(self._terminal_texts_max)
+
+    def _on_bridge_output(self, chunk_bytes: bytes):
         """
-        Slot connected to TerminalBridge.output (base64-encoded bytes).
-        Decode -> strip ANSI -> append to self.terminal_texts, trimming from head if needed.
+        Slot connected to TerminalBridge.raw_output (one coalesced frame).
+        The scrollback decodes and strips ANSI incrementally, so the cost only
+        depends on the size of the frame.
         """
         try:
-            # decode base64 -> bytes -> text
-            chunk_bytes = base64.b64decode(b64)
-            text = chunk_bytes.decode('utf-8', errors='ignore')
-            # strip ANSI sequences to keep plain terminal text (optional but usually desired)
-            plain = _strip_ansi_sequences(text)
-
-            # append and trim to max length (keep newest chars)
-            self.terminal_texts += plain
-            if len(self.terminal_texts) > self._terminal_texts_max:
-                # keep the last _terminal_texts_max characters
-                self.terminal_texts = self.terminal_texts[-self._terminal_texts_max:]
-
+            self.scrollback.feed(chunk_bytes)
         except Exception as e:
             # Don't crash the app for logging reasons; print for debug
             print(f"_on_bridge_output error: {e}")
@@ -637,31 +743,11 @@ class WebTerminal(QWidget):
             self.bridge.worker.execute_command_and_capture(command)
 
     def get_latest_output(self, count=1):
-        if not self.terminal_texts:
+        blocks = self.scrollback.get_command_blocks(count)
+        if not blocks:
             return "<results></results>"
-        prompt_re = re.compile(r"[\w\d\._-]+@[\w\d\.-]+:.*[#\$]")
-        lines = self.terminal_texts.splitlines()
-        prompt_indices = [i for i, line in enumerate(
-            lines) if prompt_re.search(line)]
         results_xml = "<results>"
-        num_possible_outputs = len(prompt_indices) - 1
-        if num_possible_outputs < 1:
-            return "<results></results>"
-        actual_count = min(count, num_possible_outputs)
-        for i in range(actual_count):
-            end_prompt_index = prompt_indices[-(i + 1)]
-            start_prompt_index = prompt_indices[-(i + 2)]
-            start_prompt_line = lines[start_prompt_index]
-            cleaned_start_line = _strip_ansi_sequences(start_prompt_line)
-            command = ""
-            last_hash_pos = cleaned_start_line.rfind('#')
-            last_dollar_pos = cleaned_start_line.rfind('$')
-            split_pos = max(last_hash_pos, last_dollar_pos)
-            if split_pos != -1:
-                command = cleaned_start_line[split_pos + 1:].strip()
-            output_lines = lines[start_prompt_index + 1: end_prompt_index]
-            full_output = "\n".join(output_lines)
-            plain_output = _strip_ansi_sequences(full_output)
-            results_xml += f"""<command_{i + 1}><cmd>{command}</cmd><output>{plain_output}</output></command_{i + 1}>"""
+        for i, (command, output) in enumerate(blocks):
+            results_xml += f"""<command_{i + 1}><cmd>{command}</cmd><output>{output}</output></command_{i + 1}>"""
         results_xml += "\n</results>"
         return results_xml
@@ -143,6 +143,8 @@ class SSHPage(QWidget):
 
 
 class SSHWidget(QWidget):
+    # router name of the right panel now shown
+    panelChanged = pyqtSignal(str)
 
     def __init__(self, name: str,  parent=None, font_name=None, user_name=None):
         super().__init__(parent=parent)
@@ -732,6 +734,17 @@ class SSHWidget(QWidget):
         elif router == "diff" and self.now_ui != "diff":
             self.diff_widget.show()
             self.now_ui = "diff"
+        self.panelChanged.emit(self.now_ui)
+
+    def monitor_categories(self) -> set:
+        """Telemetry categories the visible panels need (see tools.telemetry)."""
+        # Left side (system resources, network speed, disks) is always visible
+        categories = {"top", "disks", "net"}
+        if self.now_ui == "task":
+            categories.add("processes")
+        elif self.now_ui == "net":
+            categories.add("connections")
+        return categories
 
     def _clear_history(self):
         session_manager.clear_history(self.parentkey)
@@ -857,6 +870,8 @@ class SSHWidget(QWidget):
                 self.file_manager.get_file_type(new_path)
 
     def _update_file_explorer(self, path: str = None):
+        # navigation may be served from the listing cache, a refresh may not
+        use_cache = bool(path)
         if path:
             self.file_explorer.path = path
         else:
@@ -872,17 +887,35 @@ class SSHWidget(QWidget):
                 parent = parent.parent()
             self.file_manager.list_dir_finished.connect(
                 self._on_list_dir_finished, type=Qt.QueuedConnection)
+            self.file_manager.list_dir_batch.connect(
+                self._on_list_dir_batch, type=Qt.QueuedConnection)
         if self.file_manager:
             # print(f"添加：{path} 到任务")
             self.start_loading_animation("file_explorer")
-            self.file_manager.list_dir_async(path)
+            self.file_manager.list_dir_async(path, use_cache=use_cache)
+
+    def _on_list_dir_batch(self, path: str, entries: list, first: bool):
+        # Large listings arrive in batches, shown while the rest is loading
+        if path != self.file_explorer.path:
+            return
+        if first:
+            self._streaming_path = path
+            self.file_explorer.begin_files()
+        elif getattr(self, '_streaming_path', None) != path:
+            return
+        self.file_explorer.append_files(entries)
 
     def _on_list_dir_finished(self, path: str, file_dict: dict):
         # if path != self.file_explorer.path:
         #     return
 
         try:
-            self.file_explorer.add_files(file_dict)
+            if getattr(self, '_streaming_path', None) == path:
+                # everything arrived through _on_list_dir_batch already
+                self.file_explorer.finish_files()
+            else:
+                self.file_explorer.show_files(file_dict)
+            self._streaming_path = None
             if hasattr(self, '_perf_counter_start') and self._perf_counter_start:
                 end_time = time.perf_counter()
                 total_duration = end_time - self._perf_counter_start
@@ -1,8 +1,10 @@
+import time
 from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEvent, pyqtSignal
 from PyQt5.QtGui import QColor, QFont
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QScrollArea, QToolTip
 from qfluentwidgets import FluentIcon as FIF, IconWidget, ToolButton
 from tools.font_config import font_config
+from tools.transfer_scheduler import TransferScheduler
 
 
 class TransferProgressWidget(QWidget):
@@ -44,8 +46,17 @@ class TransferProgressWidget(QWidget):
         icon_widget.setToolTip(self.tr("Clean finished"))
         icon_widget.clicked.connect(lambda: self.clear_completed_items())
 
+        # Pause / resume all transfers (shared by every session)
+        self.scheduler = TransferScheduler.instance()
+        self.pause_button = ToolButton(FIF.PAUSE)
+        self.pause_button.setFixedSize(32, 32)
+        self.pause_button.clicked.connect(self._toggle_pause)
+        self.scheduler.paused_changed.connect(self._on_paused_changed)
+        self._on_paused_changed(self.scheduler.paused)
+
         self.header_layout.addWidget(self.title_label, 0, Qt.AlignLeft)
         self.header_layout.addStretch(1)
+        self.header_layout.addWidget(self.pause_button)
         self.header_layout.addWidget(icon_widget)
         self.header_layout.addWidget(self.count_label, 0, Qt.AlignRight)
 
@@ -203,6 +214,17 @@ class TransferProgressWidget(QWidget):
 
         self.update_transfer_item(file_id, data)
 
+    def _toggle_pause(self):
+        if self.scheduler.paused:
+            self.scheduler.resume()
+        else:
+            self.scheduler.pause()
+
+    def _on_paused_changed(self, paused: bool):
+        self.pause_button.setIcon(FIF.PLAY if paused else FIF.PAUSE)
+        self.pause_button.setToolTip(
+            self.tr("Resume transfers") if paused else self.tr("Pause transfers"))
+
     def stop_transmission(self, file_id):
         if file_id:
             self.cancelRequested.emit(file_id)
@@ -239,8 +261,16 @@ class TransferProgressWidget(QWidget):
                 # Convert bytes to MB and format the string
                 transferred_mb = bytes_so_far / (1024 * 1024)
                 total_mb = total_bytes / (1024 * 1024)
-                filename_label.setText(
-                    f"{filename} ({transferred_mb:.2f}/{total_mb:.2f} MB)")
+                speed = data.get("speed")
+                eta = data.get("eta", -1)
+                if speed and 0 <= progress < 100:
+                    eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta >= 0 else "--"
+                    filename_label.setText(
+                        f"{filename} ({transferred_mb:.2f}/{total_mb:.2f} MB, "
+                        f"{speed / (1024 * 1024):.2f} MB/s, {eta_text})")
+                else:
+                    filename_label.setText(
+                        f"{filename} ({transferred_mb:.2f}/{total_mb:.2f} MB)")
             elif filename:
                 filename_label.setText(filename)
             item_widget.setToolTip(filename_label.text())